@@ -3,4 +3,9 @@ from django.contrib import admin
 from .models import User
 
 
-admin.site.register(User)
+@admin.register(User)
+class UserAdmin(admin.ModelAdmin):
+    list_display = ('username', 'email', 'is_staff', 'is_active')
+    # 问题和答案的用户输入框使用自动补全,按用户名或邮箱前缀查找
+    search_fields = ('^username', '^email')
+    ordering = ('username',)
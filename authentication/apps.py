@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class AuthenticationConfig(AppConfig):
     name = 'authentication'
+
+    def ready(self):
+        # 导入模块时连接信号,用户和个人简介修改后删除缓存的用户对象
+        from . import signals  # noqa
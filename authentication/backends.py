@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+from .models import User
+
+
+# 每个请求的用户对象在缓存中保存的时间(秒),0 表示不缓存
+USER_CACHE_TIMEOUT = getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 60)
+
+
+def user_cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def invalidate_user(user_id):
+    """删除缓存的用户对象,用户或个人简介修改后调用
+    """
+    cache.delete(user_cache_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    """从缓存中读取已登录用户的认证后端
+
+    AuthenticationMiddleware 在每个请求中调用 get_user 读取当前用户
+    这里将用户连同个人简介(通过 JOIN 一起查询)缓存一段时间
+    User 和 Profile 保存或删除时由 authentication.signals 删除缓存
+    直接执行 QuerySet.update 不会发送信号,需要手动调用 invalidate_user
+    修改密码也会保存 User ,旧密码对应的会话在下一个请求中失效
+    """
+
+    def get_user(self, user_id):
+        if USER_CACHE_TIMEOUT <= 0:
+            return super().get_user(user_id)
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = User._default_manager.select_related('profile').filter(
+                pk=user_id).first()
+            if user is None:
+                return None
+            cache.set(key, user, USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
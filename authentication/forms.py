@@ -42,7 +42,7 @@ def unique_email_validator(value):
     """验证邮箱唯一性
     """
 
-    if User.objects.filter(email__iexact=value).exists():
+    if User.objects.filter_iexact('email', value).exists():
         msg = _('User with this email already exists.')
         raise ValidationError(msg)
 
@@ -51,7 +51,7 @@ def unique_username_validator(value):
     """验证用户名唯一性
     """
 
-    if User.objects.filter(username__iexact=value).exists():
+    if User.objects.filter_iexact('username', value).exists():
         msg = _('User with this username already exists.')
         raise ValidationError(msg)
 
@@ -1,4 +1,7 @@
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import BaseUserManager
+from django.db import connections, transaction
+from django.db.models.functions import Lower
 
 
 # BaseUserManager 是 django.db.models.base 模块中的 Manager 类的子类
@@ -9,6 +12,61 @@ from django.contrib.auth.models import BaseUserManager
 # 是为了增加一些新的属性或方法
 class UserManager(BaseUserManager):
 
+    # 字段名 -> 迁移文件 authentication/0002 中创建的表达式索引 LOWER(字段)
+    lower_indexes = {
+        'username': 'user_username_lower_idx',
+        'email': 'user_email_lower_idx',
+    }
+
+    def filter_iexact(self, field, value):
+        """不区分大小写地按字段查找用户,查询可以使用索引
+
+        field__iexact 在 SQLite 上是 LIKE 查询,无法使用唯一索引
+        这里改为 LOWER(字段) = 小写的值,对应迁移文件中创建的表达式索引
+        MySQL 的默认排序规则本身不区分大小写,直接比较即可使用唯一索引
+        """
+        queryset = self.get_queryset()
+        if connections[queryset.db].vendor == 'mysql':
+            return queryset.filter(**{field: value})
+        return queryset.annotate(**{f'{field}_lower': Lower(field)}).filter(
+            **{f'{field}_lower': value.lower()})
+
+    def get_or_create_many(self, users):
+        """按用户名批量查找用户,不存在的用户批量创建,用于导入数据
+
+        参数 users 是 {用户名: 邮箱} 字典,邮箱可以为空
+        返回 ({用户名: 主键}, 新建用户的主键列表)
+        新建的用户没有可用的密码,需要通过找回密码设置
+        邮箱为空或已被其他用户使用时,使用 用户名@users.invalid 代替
+        bulk_create 不会触发 post_save 信号,调用者负责创建关联的数据
+        """
+        queryset = self.get_queryset()
+        ids = dict(queryset.filter(username__in=users).values_list(
+            'username', 'pk'))
+        missing = {name: email for name, email in users.items()
+                   if name not in ids}
+        if not missing:
+            return ids, []
+        emails = {name: self.normalize_email(email) or ''
+                  for name, email in missing.items()}
+        taken = set(queryset.filter(
+            email__in=[e for e in emails.values() if e]).values_list(
+                'email', flat=True))
+        objects = []
+        for name, email in emails.items():
+            if not email or email in taken:
+                email = f'{name}@users.invalid'
+            taken.add(email)
+            objects.append(self.model(
+                username=name, email=email, password=make_password(None)))
+        with transaction.atomic(using=queryset.db):
+            queryset.bulk_create(objects)
+        # SQLite 和 MySQL 上 bulk_create 不会回填主键,重新查询一次
+        created = dict(queryset.filter(username__in=missing).values_list(
+            'username', 'pk'))
+        ids.update(created)
+        return ids, list(created.values())
+
     def create_user(self, username, email, password, gender=None, **kwargs):
         """给映射类增加一个创建普通用户的方法
         
@@ -0,0 +1,41 @@
+from django.db import migrations
+
+
+# 不区分大小写查找用户名和邮箱时使用的表达式索引
+# 对应 authentication.manager.UserManager.filter_iexact 中的 LOWER(字段) 查询
+# Django 3.1 的 Index 不支持表达式,所以直接执行 SQL
+# MySQL 的默认排序规则不区分大小写,查询直接使用唯一索引,不需要创建
+INDEXES = (
+    ('user_username_lower_idx', 'username'),
+    ('user_email_lower_idx', 'email'),
+)
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor not in ('sqlite', 'postgresql'):
+        return
+    table = apps.get_model('authentication', 'User')._meta.db_table
+    quote = schema_editor.quote_name
+    for name, column in INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX {quote(name)} ON {quote(table)} '
+            f'(LOWER({quote(column)}))')
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor not in ('sqlite', 'postgresql'):
+        return
+    for name, _ in INDEXES:
+        schema_editor.execute(
+            f'DROP INDEX IF EXISTS {schema_editor.quote_name(name)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete, post_save
+
+from .backends import invalidate_user
+from .models import User
+
+
+def user_changed(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+
+
+def profile_changed(sender, instance, **kwargs):
+    invalidate_user(instance.user_id)
+
+
+# 缓存的用户对象中包含个人简介,两者任何一个修改都要删除缓存
+post_save.connect(user_changed, sender=User)
+post_delete.connect(user_changed, sender=User)
+post_save.connect(profile_changed, sender='user_profile.Profile')
+post_delete.connect(profile_changed, sender='user_profile.Profile')
@@ -1,3 +1,94 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 
-# Create your tests here.
+from monitoring.explain import QueryPlanAssertions
+from .forms import SignUpForm
+from .backends import CachedModelBackend
+from .models import User
+
+
+@override_settings(PASSWORD_HASHERS=[
+    'django.contrib.auth.hashers.MD5PasswordHasher'])
+class CaseInsensitiveLookupTest(QueryPlanAssertions, TestCase):
+    """注册表单中不区分大小写的用户名和邮箱检查
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create_user('Alice', 'Alice@Example.com', 'pw')
+
+    def test_lookups_ignore_case(self):
+        self.assertTrue(User.objects.filter_iexact('username', 'aLICE').exists())
+        self.assertTrue(
+            User.objects.filter_iexact('email', 'alice@example.COM').exists())
+        form = SignUpForm(data={
+            'username': 'ALICE', 'email': 'ALICE@example.com',
+            'password': 'password', 'confirm_password': 'password'})
+        self.assertFalse(form.is_valid())
+        self.assertIn('username', form.errors)
+        self.assertIn('email', form.errors)
+
+    def test_lookups_use_index(self):
+        for field in ('username', 'email'):
+            with self.subTest(field=field):
+                if connection.vendor == 'mysql':
+                    # 唯一索引,索引名与字段名相同
+                    index = field
+                else:
+                    index = User.objects.lower_indexes[field]
+                self.assertUsesIndex(
+                    User.objects.filter_iexact(field, 'alice'), index)
+
+
+@override_settings(PASSWORD_HASHERS=[
+    'django.contrib.auth.hashers.MD5PasswordHasher'])
+class CachedUserTest(TestCase):
+    """已登录的用户从缓存中读取,修改后缓存失效
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alice', 'alice@example.com', 'pw')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def user_queries(self):
+        """请求问题列表页,返回查询用户表的次数
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('questions:questions_list'))
+        self.assertEqual(response.context['user'], self.user)
+        return sum('"authentication_user"' in q['sql'] for q in queries)
+
+    def test_user_is_cached(self):
+        self.assertEqual(self.user_queries(), 1)
+        self.assertEqual(self.user_queries(), 0)
+        # 个人简介和用户一起缓存
+        user = CachedModelBackend().get_user(self.user.pk)
+        with self.assertNumQueries(0):
+            user.profile.job
+
+    def test_save_invalidates(self):
+        self.user_queries()
+        user = User.objects.get(pk=self.user.pk)
+        user.profile.job = 'Engineer'
+        user.profile.save()
+        self.assertEqual(
+            CachedModelBackend().get_user(user.pk).profile.job, 'Engineer')
+
+        user.set_password('new')
+        user.save()
+        response = self.client.get(reverse('questions:questions_list'))
+        self.assertFalse(response.context['user'].is_authenticated)
+
+    def test_inactive_user(self):
+        CachedModelBackend().get_user(self.user.pk)
+        user = User.objects.get(pk=self.user.pk)
+        user.is_active = False
+        user.save()
+        self.assertIsNone(CachedModelBackend().get_user(user.pk))
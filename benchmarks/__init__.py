@@ -0,0 +1,4 @@
+"""性能测试套件
+
+使用方法:python -m benchmarks --help
+"""
@@ -0,0 +1,101 @@
+import argparse
+import json
+import os
+import sys
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks',
+        description='Run micro and request-level benchmarks against a '
+                    'freshly created test database.')
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--questions', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--iterations', type=int, default=1000,
+                        help='Iterations per micro-benchmark.')
+    parser.add_argument('--requests', type=int, default=200,
+                        help='Requests per load scenario.')
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--asgi', action='store_true',
+                        help='Also compare the WSGI and ASGI deployments '
+                             'with simulated database latency.')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='WSGI worker threads in the ASGI comparison.')
+    parser.add_argument('--asgi-concurrency', type=int, default=50,
+                        help='Concurrent requests in the ASGI comparison.')
+    parser.add_argument('--db-latency', type=float, default=20.0,
+                        help='Milliseconds added to every query in the '
+                             'ASGI comparison, default 20.')
+    parser.add_argument('--auth', action='store_true',
+                        help='Also compare session engines and cached user '
+                             'loading on a logged-in question list request.')
+    parser.add_argument('--output', help='Write the results to this file.')
+    parser.add_argument('--baseline',
+                        help='Compare the results with this JSON file.')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='Overwrite the baseline file with the results.')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Allowed relative regression, default 0.2.')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'community.settings')
+    import django
+    django.setup()
+
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    from . import asgi, auth, compare, data, load, micro
+
+    # 使用独立的测试数据库,不会影响开发数据
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        cache.clear()
+        users, questions = data.populate(
+            args.users, args.questions, seed=args.seed)
+        results = {
+            'parameters': {
+                'users': args.users, 'questions': args.questions,
+                'seed': args.seed, 'concurrency': args.concurrency,
+            },
+            'micro': micro.run(args.iterations),
+            'load': load.run(users, questions, args.requests,
+                             args.concurrency, seed=args.seed),
+        }
+        if args.asgi:
+            results['asgi'] = asgi.run(
+                questions, args.requests, args.asgi_concurrency,
+                args.workers, args.db_latency, seed=args.seed)
+        if args.auth:
+            results['auth'] = auth.run(users, args.requests)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        compare.save(args.output, results)
+
+    status = 0
+    if args.baseline and os.path.exists(args.baseline) and not args.save_baseline:
+        regressions = compare.compare(
+            compare.load(args.baseline), results, args.threshold)
+        for group, name, metric, before, after in regressions:
+            print(f'REGRESSION {group}.{name}.{metric}: {before} -> {after}',
+                  file=sys.stderr)
+        status = 1 if regressions else 0
+    elif args.baseline:
+        compare.save(args.baseline, results)
+        print(f'Baseline written to {args.baseline}', file=sys.stderr)
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
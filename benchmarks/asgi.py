@@ -0,0 +1,127 @@
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import close_old_connections, connections
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+from .load import skewed_choice
+from .stats import summarize
+
+
+# 对比同步视图(WSGI 部署)和异步视图(ASGI 部署)在数据库较慢时的并发能力
+# WSGI 部署的并发数受工作线程数限制,用固定大小的线程池模拟
+# ASGI 部署在一个事件循环中同时处理全部请求
+# 为了让结果反映数据库的延迟,测试期间关闭片段缓存并给每次查询增加固定的延迟
+
+NO_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+class Latency:
+    """给每次查询增加固定延迟的 execute_wrapper ,模拟较慢的数据库
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def __call__(self, execute, sql, params, many, context):
+        time.sleep(self.seconds)
+        return execute(sql, params, many, context)
+
+    def install(self, connection, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+    def __enter__(self):
+        # 新线程中创建的连接也需要加上延迟
+        connection_created.connect(self.install)
+        for connection in connections.all():
+            self.install(connection)
+        return self
+
+    def __exit__(self, *exc_info):
+        connection_created.disconnect(self.install)
+        for connection in connections.all():
+            if self in connection.execute_wrappers:
+                connection.execute_wrappers.remove(self)
+
+
+def urls(questions, requests, seed=0):
+    """生成请求地址列表,两种部署使用相同的请求序列
+    """
+    rng = random.Random(seed)
+    questions = sorted(questions, key=lambda q: -q.answer_count)
+    words = ('django', 'query', 'cache', 'signal', 'index', 'session')
+    return {
+        'question_list': [
+            reverse('questions:questions_list') + f'?page={rng.randint(1, 5)}'
+            for _ in range(requests)],
+        'question_detail': [
+            reverse('questions:question_detail',
+                    args=[skewed_choice(rng, questions).pk])
+            for _ in range(requests)],
+        'search': [
+            reverse('search:search') + f'?q={rng.choice(words)}'
+            for _ in range(requests)],
+    }
+
+
+def drive_wsgi(paths, workers):
+    """同步视图,最多 workers 个请求同时处理
+    """
+    def get(path):
+        t = time.perf_counter()
+        try:
+            response = Client().get(path)
+        finally:
+            close_old_connections()
+        return time.perf_counter() - t, response.status_code >= 400
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(workers) as pool:
+        results = list(pool.map(get, paths))
+    elapsed = time.perf_counter() - start
+    return summarize([r[0] for r in results], elapsed,
+                     sum(r[1] for r in results))
+
+
+def drive_asgi(paths, concurrency, threads=None):
+    """异步视图,最多 concurrency 个请求同时处理
+
+    参数 threads 为执行同步代码的线程池大小,默认与 concurrency 相同
+    """
+    async def main():
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(threads or concurrency))
+        semaphore = asyncio.Semaphore(concurrency)
+        client = AsyncClient()
+
+        async def get(path):
+            async with semaphore:
+                t = time.perf_counter()
+                response = await client.get(path)
+                return time.perf_counter() - t, response.status_code >= 400
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*[get(path) for path in paths])
+        return results, time.perf_counter() - start
+
+    results, elapsed = asyncio.run(main())
+    return summarize([r[0] for r in results], elapsed,
+                     sum(r[1] for r in results))
+
+
+def run(questions, requests=200, concurrency=50, workers=4, latency_ms=20.0,
+        seed=0):
+    """返回 {'wsgi:场景名': 统计结果, 'asgi:场景名': 统计结果}
+    """
+    results = {}
+    with override_settings(CACHES=NO_CACHE), Latency(latency_ms / 1000):
+        for name, paths in urls(questions, requests, seed).items():
+            results[f'wsgi:{name}'] = drive_wsgi(paths, workers)
+            with override_settings(ROOT_URLCONF='community.urls_asgi'):
+                results[f'asgi:{name}'] = drive_asgi(paths, concurrency)
+    return results
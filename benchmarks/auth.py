@@ -0,0 +1,67 @@
+import time
+
+from django.core.cache import cache
+from django.db import connection, reset_queries
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .stats import summarize
+
+
+# 已登录用户请求问题列表页时,会话和用户的不同加载方式
+# 列表页本身的片段缓存保持开启,每个请求剩下的查询主要来自会话和认证
+CONFIGURATIONS = {
+    'db_session': {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+        'AUTHENTICATION_BACKENDS': ['django.contrib.auth.backends.ModelBackend'],
+    },
+    'db_session_cached_user': {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+        'AUTHENTICATION_BACKENDS': [
+            'authentication.backends.CachedModelBackend'],
+    },
+    'cache_session_cached_user': {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.cache',
+        'AUTHENTICATION_BACKENDS': [
+            'authentication.backends.CachedModelBackend'],
+    },
+    'signed_cookies_cached_user': {
+        'SESSION_ENGINE': 'django.contrib.sessions.backends.signed_cookies',
+        'AUTHENTICATION_BACKENDS': [
+            'authentication.backends.CachedModelBackend'],
+    },
+}
+
+
+def measure(user, requests):
+    client = Client()
+    client.force_login(user)
+    path = reverse('questions:questions_list')
+    # 第一个请求填充片段缓存和用户缓存
+    client.get(path)
+    # DEBUG 为 True 时查询日志可能已经写满,先清空才能得到准确的结果
+    reset_queries()
+    with CaptureQueriesContext(connection) as queries:
+        client.get(path)
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(requests):
+        t = time.perf_counter()
+        client.get(path)
+        latencies.append(time.perf_counter() - t)
+    result = summarize(latencies, time.perf_counter() - start)
+    result['queries'] = len(queries)
+    result['query_sql'] = [q['sql'] for q in queries]
+    return result
+
+
+def run(users, requests=200):
+    """返回 {配置名: 统计结果},统计结果中的 queries 为每个请求的查询次数
+    """
+    results = {}
+    for name, options in CONFIGURATIONS.items():
+        with override_settings(**options):
+            cache.clear()
+            results[name] = measure(users[0], requests)
+    return results
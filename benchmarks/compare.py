@@ -0,0 +1,38 @@
+import json
+
+
+# 比较的指标及其方向:1 表示越大越好,-1 表示越小越好
+METRICS = {'throughput': 1, 'p50_ms': -1, 'p95_ms': -1}
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save(path, results):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+
+def compare(baseline, current, threshold=0.2):
+    """比较两次运行的结果,返回变差超过 threshold 比例的指标列表
+
+    每个元素为 (分组, 测试名, 指标名, 基准值, 当前值)
+    """
+    regressions = []
+    for group, cases in current.items():
+        if not isinstance(cases, dict):
+            continue
+        for name, result in cases.items():
+            old = baseline.get(group, {}).get(name)
+            if not isinstance(result, dict) or not isinstance(old, dict):
+                continue
+            for metric, direction in METRICS.items():
+                before, after = old.get(metric), result.get(metric)
+                if not before or after is None:
+                    continue
+                change = (after - before) / before * direction
+                if change < -threshold:
+                    regressions.append((group, name, metric, before, after))
+    return regressions
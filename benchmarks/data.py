@@ -0,0 +1,16 @@
+from authentication.models import User
+from questions.models import Question
+from questions.seeding import Seeder
+from search.backends import get_backend
+
+
+def populate(users=50, questions=200, seed=0, alpha=1.2):
+    """生成确定的测试数据,参数 seed 相同时生成的数据相同
+
+    返回值为 (用户列表, 问题列表)
+    """
+    user_ids, question_ids = Seeder(
+        users, questions, seed=seed, alpha=alpha, prefix='bench').run()
+    get_backend().rebuild()
+    return (list(User.objects.filter(pk__in=user_ids).order_by('pk')),
+            list(Question.objects.filter(pk__in=question_ids).order_by('pk')))
@@ -0,0 +1,97 @@
+import itertools
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import close_old_connections
+from django.test import Client
+from django.urls import reverse
+
+from .stats import summarize
+
+
+def skewed_choice(rng, items):
+    """热门问题被访问得更多,按位置的倒数加权
+    """
+    index = min(int(rng.paretovariate(1.0)) - 1, len(items) - 1)
+    return items[index]
+
+
+class Scenarios:
+    """请求级别的测试场景,每个方法发送一个请求并返回响应
+
+    问题列表按答案数降序排列,skewed_choice 会更多地选中前面的热门问题
+    """
+
+    def __init__(self, users, questions, seed=0):
+        self.users = users
+        self.questions = sorted(
+            questions, key=lambda q: -q.answer_count)
+        self.rng = random.Random(seed)
+        self.counter = itertools.count()
+
+    def question_list(self, client):
+        page = self.rng.randint(1, 5)
+        return client.get(reverse('questions:questions_list'), {'page': page})
+
+    def question_detail(self, client):
+        question = skewed_choice(self.rng, self.questions)
+        return client.get(
+            reverse('questions:question_detail', args=[question.pk]))
+
+    def search(self, client):
+        words = ('django', 'query', 'cache', 'signal', 'index', 'session')
+        return client.get(
+            reverse('search:search'), {'q': self.rng.choice(words)})
+
+    def create_answer(self, client):
+        client.force_login(self.rng.choice(self.users))
+        question = skewed_choice(self.rng, self.questions)
+        return client.post(
+            reverse('questions:create_answer', args=[question.pk]),
+            {'description': 'Benchmark answer'})
+
+    def signup(self, client):
+        n = next(self.counter)
+        return client.post(reverse('authentication:signup'), {
+            'username': f'signup{n}', 'email': f'signup{n}@example.com',
+            'password': 'benchmark', 'confirm_password': 'benchmark'})
+
+    names = ('question_list', 'question_detail', 'search',
+             'create_answer', 'signup')
+
+
+def drive(scenario, requests, concurrency=1):
+    """使用 Django 测试客户端发送请求,每个线程使用独立的客户端
+    """
+    def worker(count):
+        client = Client()
+        latencies, errors = [], 0
+        try:
+            for _ in range(count):
+                t = time.perf_counter()
+                response = scenario(client)
+                latencies.append(time.perf_counter() - t)
+                if response.status_code >= 400:
+                    errors += 1
+        finally:
+            close_old_connections()
+        return latencies, errors
+
+    shares = [requests // concurrency + (i < requests % concurrency)
+              for i in range(concurrency)]
+    start = time.perf_counter()
+    if concurrency == 1:
+        results = [worker(requests)]
+    else:
+        with ThreadPoolExecutor(concurrency) as pool:
+            results = list(pool.map(worker, shares))
+    elapsed = time.perf_counter() - start
+    latencies = [value for result in results for value in result[0]]
+    return summarize(latencies, elapsed, sum(result[1] for result in results))
+
+
+def run(users, questions, requests=200, concurrency=1, seed=0):
+    scenarios = Scenarios(users, questions, seed)
+    return {name: drive(getattr(scenarios, name), requests, concurrency)
+            for name in Scenarios.names}
@@ -0,0 +1,34 @@
+import time
+
+from questions import rendering
+from questions.models import Question
+from search.backends import get_backend
+from search.query import parse_query
+from .stats import summarize
+
+
+def bench(func, iterations):
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        t = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - t)
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def run(iterations=1000):
+    """模型方法和工具函数的微基准测试
+    """
+    question = Question.objects.order_by('-answer_count').first()
+    backend = get_backend()
+    groups = parse_query('django query OR "model view"')
+    cases = {
+        'render_markdown': lambda: rendering.render_markdown(
+            question.description),
+        'get_description_as_markdown': question.get_description_as_markdown,
+        'get_answers_count': question.get_answers_count,
+        'parse_query': lambda: parse_query('django query OR "model view"'),
+        'search_backend': lambda: backend.search(groups),
+    }
+    return {name: bench(func, iterations) for name, func in cases.items()}
@@ -0,0 +1,17 @@
+from monitoring.metrics import percentile
+
+
+def summarize(latencies, elapsed, errors=0):
+    """根据每次调用的耗时(秒)计算吞吐量和延迟百分位数(毫秒)
+    """
+    values = sorted(latencies)
+    count = len(values)
+    return {
+        'count': count,
+        'errors': errors,
+        'throughput': round(count / elapsed, 2) if elapsed else 0.0,
+        'mean_ms': round(sum(values) / count * 1000, 3) if count else 0.0,
+        'p50_ms': round(percentile(values, 50) * 1000, 3),
+        'p95_ms': round(percentile(values, 95) * 1000, 3),
+        'p99_ms': round(percentile(values, 99) * 1000, 3),
+    }
@@ -2,6 +2,8 @@
 ASGI config for community project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+The ASGI profile (community.settings_asgi) serves the question and search
+pages with the async views in questions.async_views and search.async_views.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.1/howto/deployment/asgi/
@@ -11,6 +13,6 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'community.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'community.settings_asgi')
 
 application = get_asgi_application()
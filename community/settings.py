@@ -44,12 +44,17 @@ INSTALLED_APPS = [
     'user_profile',
     'questions',
     'search',
+    'monitoring',
+    'tasks',
+    'notifications',
     'django.contrib.humanize'
 ]
 
 CRISPY_TEMPLATE_PACK = 'bootstrap4'
 
 MIDDLEWARE = [
+    # 放在第一位,记录的耗时包含其它中间件
+    'monitoring.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -74,6 +79,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'notifications.context_processors.notifications',
             ],
         },
     },
@@ -149,3 +155,112 @@ LOGOUT_REDIRECT_URL = '/'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media').replace('\\', '/')
+
+# 问题列表页的分页方式:'offset' 为页码分页,'cursor' 为游标分页
+# 页码分页模式下也可以通过请求参数 ?cursor= 切换到游标分页
+QUESTIONS_PAGINATION = 'offset'
+# 列表页总数的缓存时间(秒)
+QUESTIONS_COUNT_CACHE_TIMEOUT = 300
+
+# 问题详情页直接渲染的答案数量,其余答案点击 "加载更多" 后分批获取
+QUESTIONS_ANSWERS_PER_PAGE = 30
+
+# 管理后台搜索问题和答案时,从搜索后端取回的最大问题数
+QUESTIONS_ADMIN_SEARCH_LIMIT = 1000
+
+# 问题详情页显示的相似问题数,由 python manage.py build_related_questions 计算
+RELATED_QUESTIONS_COUNT = 5
+# 相似问题的向量化结果文件,为空时保存在 var/related 目录
+RELATED_QUESTIONS_MODEL_PATH = None
+
+# 搜索后端类的导入路径,为空时根据数据库类型自动选择
+# 可选值见 search.backends 包
+SEARCH_BACKEND = None
+# InProcessBM25Backend 使用的索引文件路径,为空时保存在 var/search 目录
+SEARCH_INDEX_PATH = None
+# 搜索框输入提示使用的进程内前缀索引中的问题数(按答案数选取最多的)
+# 以及每个进程缓存的前缀数和读取其它进程写入的间隔(秒)
+TYPEAHEAD_SIZE = 100000
+TYPEAHEAD_CACHE_SIZE = 10000
+TYPEAHEAD_REFRESH_INTERVAL = 30
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.1/topics/cache/
+
+# 缓存后端通过环境变量 CACHE_BACKEND 选择
+# locmem 为进程内缓存,用于开发环境
+# file 和 db 可以在多个进程间共享,db 需要先执行 python manage.py createcachetable
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'community',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'var', 'cache'),
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'community_cache',
+    },
+}
+
+CACHES = {
+    'default': CACHE_BACKENDS[os.environ.get('CACHE_BACKEND', 'locmem')],
+}
+
+# 会话的存储方式通过环境变量 SESSION_BACKEND 选择,默认保存在数据库中
+# cache 只使用缓存,每个请求不再查询会话表,需要多个进程共享的缓存后端
+# cached_db 优先读取缓存,写入时同时写数据库
+# signed_cookies 将会话数据签名后保存在 Cookie 中,服务器端不保存任何数据
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_ENGINE = SESSION_ENGINES[os.environ.get('SESSION_BACKEND', 'db')]
+
+# 认证后端从缓存中读取已登录的用户及其个人简介,不再每个请求都查询用户表
+AUTHENTICATION_BACKENDS = ['authentication.backends.CachedModelBackend']
+# 缓存的用户对象的有效期(秒),0 表示每个请求都查询数据库
+AUTH_USER_CACHE_TIMEOUT = 60
+
+# 问题列表页和详情页片段缓存的有效期(秒)
+FRAGMENT_CACHE_TIMEOUT = 600
+
+# 请求性能指标的采样比例,0 表示关闭,1 表示记录全部请求
+METRICS_SAMPLE_RATE = 1.0
+# 每个视图保留最近多少次请求的指标
+METRICS_BUFFER_SIZE = 1000
+
+# 异步视图中互相独立的查询是否在不同线程中并发执行
+# 每个线程使用独立的数据库连接,关闭时所有查询在同一个线程中依次执行
+ASYNC_CONCURRENT_QUERIES = True
+
+# 头像上传的大小限制,以及生成缩略图的方式
+# AVATAR_PROCESSING 为 'thread' 时在后台线程池中生成,'sync' 时在请求中生成
+AVATAR_MAX_BYTES = 5 * 1024 * 1024
+AVATAR_MAX_PIXELS = 4096 * 4096
+AVATAR_PROCESSING = 'thread'
+AVATAR_WORKERS = 2
+
+# 任务队列,用于搜索索引更新等不需要在请求中完成的工作
+# TASKS_EAGER 为真时任务在写入队列时直接执行,不需要启动 worker ,用于开发和测试
+# 生产环境设置环境变量 TASKS_EAGER=0 ,并运行 python manage.py run_worker
+TASKS_EAGER = os.environ.get('TASKS_EAGER', '1') != '0'
+# 任务最多执行的次数,以及失败重试前等待的秒数(每次翻倍)
+TASKS_MAX_ATTEMPTS = 5
+TASKS_BACKOFF_BASE = 5
+TASKS_BACKOFF_MAX = 3600
+
+# 答案通知:每批写入的通知数,以及摘要邮件合并通知的时间窗口(秒)
+NOTIFICATIONS_BATCH_SIZE = 500
+NOTIFICATIONS_DIGEST_WINDOW = 600
+
+# 邮件默认写入 var/mail 目录下的文件,生产环境改为 SMTP 后端
+# 测试中 Django 自动使用内存后端,邮件保存在 django.core.mail.outbox
+EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'var', 'mail')
+DEFAULT_FROM_EMAIL = 'Community <noreply@example.com>'
@@ -0,0 +1,15 @@
+"""ASGI 部署使用的配置
+
+问题列表、问题详情和搜索页面使用 questions.async_views 和 search.async_views
+中的异步视图,其它页面与 WSGI 部署相同
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES
+
+
+ROOT_URLCONF = 'community.urls_asgi'
+
+# 异步视图的并发查询在线程池中执行,保持连接可以避免每次查询重新建立连接
+DATABASES = {
+    'default': dict(DATABASES['default'], CONN_MAX_AGE=60),
+}
@@ -16,12 +16,18 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from monitoring.views import metrics_report
+
 
 urlpatterns = [
+    # 性能指标页面放在管理后台中,只有管理员可以访问
+    path('admin/metrics/', admin.site.admin_view(metrics_report),
+         name='admin_metrics'),
     path('admin/', admin.site.urls),
     path('', include('home.urls')),
     path('', include('authentication.urls')),
     path('', include('user_profile.urls')),
     path('', include('questions.urls')),
     path('', include('search.urls')),
+    path('', include('notifications.urls')),
 ]
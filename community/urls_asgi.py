@@ -0,0 +1,21 @@
+"""ASGI 部署的路由配置
+
+与 community.urls 相同,只是问题和搜索的路由换成了异步视图版本
+"""
+from django.contrib import admin
+from django.urls import path, include
+
+from monitoring.views import metrics_report
+
+
+urlpatterns = [
+    path('admin/metrics/', admin.site.admin_view(metrics_report),
+         name='admin_metrics'),
+    path('admin/', admin.site.urls),
+    path('', include('home.urls')),
+    path('', include('authentication.urls')),
+    path('', include('user_profile.urls')),
+    path('', include('questions.urls_async')),
+    path('', include('search.urls_async')),
+    path('', include('notifications.urls')),
+]
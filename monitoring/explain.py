@@ -0,0 +1,126 @@
+import json
+import re
+
+from django.db import connections
+
+
+# 查询计划检查工具,用于在测试中断言热点查询使用了预期的索引
+# 支持 SQLite(EXPLAIN QUERY PLAN)和 MySQL(EXPLAIN FORMAT=JSON)
+SUPPORTED_VENDORS = ('sqlite', 'mysql')
+
+# SQLite 查询计划中的一行,例如:
+# SEARCH questions_answer USING INDEX answer_question_date_idx (question_id=?)
+# SCAN TABLE questions_question USING INDEX question_hot_score_id_idx
+SQLITE_STEP_RE = re.compile(
+    r'\b(?P<op>SCAN|SEARCH)(?: TABLE)? (?P<table>\w+)(?: AS \w+)?'
+    r'(?: USING (?:COVERING )?INDEX (?P<index>\w+)'
+    r'| USING (?P<pk>INTEGER PRIMARY KEY|PRIMARY KEY))?')
+
+
+class Step:
+    """查询计划中对一张表的访问
+    """
+
+    def __init__(self, table, index=None, full_scan=False):
+        self.table = table
+        self.index = index
+        # 没有使用任何索引,逐行读取整张表
+        self.full_scan = full_scan
+
+    def __repr__(self):
+        return f'<Step {self.table} index={self.index} full_scan={self.full_scan}>'
+
+
+class Plan:
+    """数据库返回的查询计划的简化表示
+    """
+
+    def __init__(self, vendor, text, steps, sorts):
+        self.vendor = vendor
+        self.text = text
+        self.steps = steps
+        # 是否需要额外排序(SQLite 的 TEMP B-TREE 或 MySQL 的 filesort)
+        self.sorts = sorts
+
+    @property
+    def indexes(self):
+        return {step.index for step in self.steps if step.index}
+
+    @property
+    def full_scans(self):
+        return [step.table for step in self.steps if step.full_scan]
+
+    def uses_index(self, name):
+        return name in self.indexes
+
+    def __str__(self):
+        return self.text
+
+
+def parse_sqlite(text):
+    steps = []
+    for match in SQLITE_STEP_RE.finditer(text):
+        index = match.group('index') or (match.group('pk') and 'PRIMARY')
+        # SEARCH 总是通过索引或主键定位,SCAN 没有索引时才是全表扫描
+        steps.append(Step(
+            match.group('table'), index,
+            full_scan=match.group('op') == 'SCAN' and not index))
+    return Plan('sqlite', text, steps, 'USE TEMP B-TREE' in text)
+
+
+def parse_mysql(text):
+    steps = []
+    sorts = False
+
+    def walk(node):
+        nonlocal sorts
+        if isinstance(node, dict):
+            if node.get('using_filesort'):
+                sorts = True
+            if 'table_name' in node and 'access_type' in node:
+                steps.append(Step(
+                    node['table_name'], node.get('key'),
+                    full_scan=node['access_type'] == 'ALL'))
+            for value in node.values():
+                walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                walk(value)
+
+    walk(json.loads(text))
+    return Plan('mysql', text, steps, sorts)
+
+
+def explain(queryset):
+    """返回查询集的查询计划
+    """
+    vendor = connections[queryset.db].vendor
+    if vendor == 'sqlite':
+        return parse_sqlite(queryset.explain())
+    if vendor == 'mysql':
+        return parse_mysql(queryset.explain(format='json'))
+    raise NotImplementedError(f'EXPLAIN is not supported on {vendor}.')
+
+
+def is_supported(using='default'):
+    return connections[using].vendor in SUPPORTED_VENDORS
+
+
+class QueryPlanAssertions:
+    """测试类的混入类,提供查询计划相关的断言方法
+    """
+
+    def assertUsesIndex(self, queryset, index, allow_sort=False):
+        """断言查询使用了指定的索引、没有全表扫描
+        并且(除非 allow_sort 为真)不需要额外排序
+        """
+        if not is_supported(queryset.db):
+            self.skipTest('EXPLAIN is not supported on this database.')
+        plan = explain(queryset)
+        self.assertTrue(
+            plan.uses_index(index),
+            f'Query does not use index {index}:\n{queryset.query}\n{plan}')
+        self.assertFalse(
+            plan.full_scans, f'Query scans a whole table:\n{plan}')
+        if not allow_sort:
+            self.assertFalse(plan.sorts, f'Query needs a sort:\n{plan}')
@@ -0,0 +1,148 @@
+import contextvars
+import functools
+import math
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+
+# 每个视图保留最近多少次请求的数据
+BUFFER_SIZE = getattr(settings, 'METRICS_BUFFER_SIZE', 1000)
+
+# 每个请求记录的指标,单位除 queries 外均为毫秒
+FIELDS = ('wall_ms', 'queries', 'db_ms', 'template_ms', 'markdown_ms')
+PERCENTILES = (50, 95, 99)
+
+# 当前请求的数据收集器,未采样的请求为 None
+_current = contextvars.ContextVar('metrics_collector', default=None)
+
+
+class Collector:
+    """收集一个请求的指标
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.timings = {}
+        # 异步视图中同一个请求的查询可能在多个线程中同时执行
+        self.lock = threading.Lock()
+
+    def add(self, name, seconds):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    # 作为 connection.execute_wrapper 的参数,记录每条 SQL 语句的耗时
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.db_time += elapsed
+                self.queries += 1
+
+    def activate(self):
+        return _current.set(self)
+
+    @staticmethod
+    def deactivate(token):
+        _current.reset(token)
+
+
+def track_queries(execute, sql, params, many, context):
+    """所有数据库连接共用的 execute_wrapper ,将查询记录到当前请求的收集器
+
+    异步视图的查询在线程池的其它线程中执行,中间件无法给这些线程的连接加上包装
+    所以在连接创建时统一加上,通过 contextvar 找到当前请求
+    """
+    collector = _current.get()
+    if collector is None:
+        return execute(sql, params, many, context)
+    return collector(execute, sql, params, many, context)
+
+
+def install_query_tracking(connection, **kwargs):
+    """connection_created 信号的接收函数
+    """
+    if track_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(track_queries)
+
+
+def measure(name):
+    """装饰器,将函数的耗时累计到当前请求的指标 name 中
+
+    当前请求未被采样时直接调用原函数
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            collector = _current.get()
+            if collector is None:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                collector.add(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def percentile(values, p):
+    """最近秩法计算百分位数,参数 values 需已排序
+    """
+    if not values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(values)))
+    return values[rank - 1]
+
+
+class Registry:
+    """按 URL 名称保存最近若干次请求的指标
+
+    每个 URL 名称对应一个定长的环形缓冲区,写满后自动丢弃最早的数据
+    """
+
+    def __init__(self, size=BUFFER_SIZE):
+        self.size = size
+        self.lock = threading.Lock()
+        self.buffers = {}
+        self.totals = {}
+
+    def record(self, name, sample):
+        with self.lock:
+            buffer = self.buffers.get(name)
+            if buffer is None:
+                buffer = self.buffers[name] = deque(maxlen=self.size)
+            buffer.append(sample)
+            self.totals[name] = self.totals.get(name, 0) + 1
+
+    def reset(self):
+        with self.lock:
+            self.buffers.clear()
+            self.totals.clear()
+
+    def report(self):
+        """计算每个 URL 名称的各项指标的均值和百分位数
+        """
+        with self.lock:
+            snapshot = {name: list(buffer)
+                        for name, buffer in self.buffers.items()}
+            totals = dict(self.totals)
+        report = {}
+        for name, samples in sorted(snapshot.items()):
+            entry = {'requests': totals[name], 'sampled': len(samples)}
+            for index, field in enumerate(FIELDS):
+                values = sorted(sample[index] for sample in samples)
+                stats = {'mean': round(sum(values) / len(values), 3)}
+                for p in PERCENTILES:
+                    stats[f'p{p}'] = round(percentile(values, p), 3)
+                entry[field] = stats
+            report[name] = entry
+        return report
+
+
+registry = Registry()
@@ -0,0 +1,95 @@
+import asyncio
+import random
+import time
+
+from django.conf import settings
+
+from .metrics import Collector, registry
+
+
+class MetricsMiddleware:
+    """记录每个请求的耗时、SQL 查询次数和耗时、模板渲染和 Markdown 渲染耗时
+
+    数据按 URL 名称(例如 questions:question_detail)汇总到 metrics.registry
+    settings.METRICS_SAMPLE_RATE 为采样比例,0 表示关闭
+    未被采样的请求只多一次随机数比较
+
+    同时支持同步和异步两种模式,ASGI 部署中不会让请求占用一个线程
+    SQL 查询由 metrics.track_queries 记录,它在 MonitoringConfig.ready 中安装
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'METRICS_SAMPLE_RATE', 1.0)
+        if asyncio.iscoroutinefunction(get_response):
+            # 告诉 Django 当前中间件是异步的
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def sampled(self):
+        return self.sample_rate > 0 and (
+            self.sample_rate >= 1 or random.random() < self.sample_rate)
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+
+        collector = Collector()
+        request._metrics = collector
+        token = collector.activate()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            collector.deactivate(token)
+        self.record(request, collector, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+
+        collector = Collector()
+        request._metrics = collector
+        token = collector.activate()
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            collector.deactivate(token)
+        self.record(request, collector, time.perf_counter() - start)
+        return response
+
+    def record(self, request, collector, wall):
+        match = getattr(request, 'resolver_match', None)
+        name = match.view_name if match else '<unresolved>'
+        registry.record(name, (
+            wall * 1000,
+            collector.queries,
+            collector.db_time * 1000,
+            collector.timings.get('template', 0.0) * 1000,
+            collector.timings.get('markdown', 0.0) * 1000,
+        ))
+
+    # 视图返回 TemplateResponse 时,模板在此方法之后才渲染
+    # 这里包装 render 方法以记录渲染耗时
+    # 直接调用 render 函数的视图,模板渲染耗时计入视图本身
+    def process_template_response(self, request, response):
+        collector = getattr(request, '_metrics', None)
+        if collector is None:
+            return response
+        render = response.render
+
+        def timed_render():
+            start = time.perf_counter()
+            try:
+                return render()
+            finally:
+                collector.add('template', time.perf_counter() - start)
+
+        response.render = timed_render
+        return response
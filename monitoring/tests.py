@@ -0,0 +1,93 @@
+import json
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from authentication.models import User
+from questions.models import Question
+from . import explain
+from .metrics import Registry, percentile, registry
+
+
+class RegistryTest(TestCase):
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([], 95), 0.0)
+
+    def test_buffer_is_bounded(self):
+        metrics = Registry(size=3)
+        for i in range(5):
+            metrics.record('view', (i, i, 0, 0, 0))
+        entry = metrics.report()['view']
+        self.assertEqual(entry['requests'], 5)
+        self.assertEqual(entry['sampled'], 3)
+        self.assertEqual(entry['wall_ms']['p50'], 3)
+
+
+@override_settings(PASSWORD_HASHERS=[
+    'django.contrib.auth.hashers.MD5PasswordHasher'])
+class MetricsMiddlewareTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            'boss', 'boss@example.com', 'pw')
+        cls.question = Question.objects.create(
+            user=cls.admin, title='Title', description='**Description**')
+
+    def setUp(self):
+        registry.reset()
+
+    def test_records_view_metrics(self):
+        self.client.get(
+            reverse('questions:question_detail', args=[self.question.pk]))
+        entry = registry.report()['questions:question_detail']
+        self.assertEqual(entry['requests'], 1)
+        self.assertGreater(entry['queries']['p50'], 0)
+        self.assertGreater(entry['template_ms']['p50'], 0)
+
+    def test_report_requires_staff_and_dumps_json(self):
+        url = reverse('admin_metrics')
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(self.admin)
+        self.assertContains(self.client.get(url), 'Request metrics')
+        response = self.client.get(url, {'format': 'json'})
+        self.assertIn('admin_metrics', response.json())
+
+
+class ExplainTest(TestCase):
+    """查询计划解析
+    """
+
+    def test_parse_sqlite(self):
+        plan = explain.parse_sqlite(
+            '3 0 0 SEARCH questions_answer USING INDEX '
+            'answer_question_date_idx (question_id=?)\n'
+            '7 0 0 SCAN TABLE authentication_user\n'
+            '9 0 0 USE TEMP B-TREE FOR ORDER BY')
+        self.assertTrue(plan.uses_index('answer_question_date_idx'))
+        self.assertEqual(plan.full_scans, ['authentication_user'])
+        self.assertTrue(plan.sorts)
+
+    def test_parse_mysql(self):
+        plan = explain.parse_mysql(json.dumps({'query_block': {
+            'ordering_operation': {
+                'using_filesort': True,
+                'table': {'table_name': 'questions_question',
+                          'access_type': 'ALL'}},
+            'nested_loop': [{'table': {
+                'table_name': 'questions_answer', 'access_type': 'ref',
+                'key': 'answer_question_date_idx'}}],
+        }}))
+        self.assertTrue(plan.uses_index('answer_question_date_idx'))
+        self.assertEqual(plan.full_scans, ['questions_question'])
+        self.assertTrue(plan.sorts)
+
+    def test_detects_unindexed_query(self):
+        if not explain.is_supported():
+            self.skipTest('EXPLAIN is not supported on this database.')
+        plan = explain.explain(User.objects.filter(gender=True))
+        self.assertEqual(plan.full_scans, [User._meta.db_table])
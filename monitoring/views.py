@@ -0,0 +1,41 @@
+import json
+
+from django.contrib import admin
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import redirect, render
+
+from .metrics import FIELDS, PERCENTILES, registry
+
+
+def metrics_report(request):
+    """在管理后台展示各视图的性能指标
+
+    请求参数 format=json 返回 JSON 格式,download=1 时作为文件下载
+    使用 POST 请求并提交 reset 参数时清空已记录的数据
+    """
+    if request.method == 'POST' and 'reset' in request.POST:
+        registry.reset()
+        return redirect('admin_metrics')
+
+    report = registry.report()
+    if request.GET.get('format') == 'json':
+        if 'download' in request.GET:
+            response = HttpResponse(
+                json.dumps(report, indent=2), content_type='application/json')
+            response['Content-Disposition'] = (
+                'attachment; filename="metrics.json"')
+            return response
+        return JsonResponse(report)
+
+    columns = ['mean'] + [f'p{p}' for p in PERCENTILES]
+    views = [
+        (name, entry, [(field, [entry[field][c] for c in columns])
+                       for field in FIELDS])
+        for name, entry in report.items()]
+    context = dict(
+        admin.site.each_context(request),
+        title='Request metrics',
+        views=views,
+        columns=columns,
+    )
+    return render(request, 'monitoring/report.html', context)
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class NotificationsConfig(AppConfig):
+    name = 'notifications'
+
+    def ready(self):
+        # 导入模块时连接信号,答案创建后通知提问者和其他回答者
+        from . import signals  # noqa
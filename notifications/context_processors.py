@@ -0,0 +1,21 @@
+from django.utils.functional import SimpleLazyObject
+
+from .models import UnreadCount
+
+
+def unread_count(user):
+    row = UnreadCount.objects.filter(pk=user.pk).values_list(
+        'count', flat=True).first()
+    return row or 0
+
+
+def notifications(request):
+    """模板变量 unread_notifications ,当前用户的未读通知数
+
+    模板用到时才按主键查询一次,匿名用户和不显示导航栏的页面不查询
+    """
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {'unread_notifications': 0}
+    return {'unread_notifications': SimpleLazyObject(
+        lambda: unread_count(user))}
@@ -0,0 +1,20 @@
+# Generated by Django 3.1.14 on 2026-10-17 18:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0009_simhash_bands'),
+        ('notifications', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='answer',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='questions.answer'),
+        ),
+    ]
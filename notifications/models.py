@@ -0,0 +1,54 @@
+from django.db import models
+from django.utils import timezone
+
+from authentication.models import User
+from questions.models import Question, Answer
+
+
+class Notification(models.Model):
+    """发给一个用户的通知:他参与的问题有了新的答案
+
+    每个用户每个问题最多一条未读通知,新答案累加到已有的未读通知上
+    热门问题短时间内的大量答案只产生一条通知
+    """
+
+    recipient = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='notifications')
+    question = models.ForeignKey(Question, on_delete=models.CASCADE)
+    # 最新的答案及其作者,一条通知合并了多个答案,答案删除后通知保留
+    # 页面上的链接指向问题,不依赖这个字段
+    answer = models.ForeignKey(Answer, on_delete=models.SET_NULL, null=True)
+    actor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    # 上次阅读之后新增的答案数
+    count = models.PositiveIntegerField(default=1)
+    update_date = models.DateTimeField(default=timezone.now)
+    read = models.BooleanField(default=False)
+    # 最新的答案是否已经包含在发出的摘要邮件中
+    emailed = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ('-update_date', '-id')
+        indexes = [
+            # 通知列表页和摘要邮件都按接收者查询,最近更新的在前
+            models.Index(fields=['recipient', 'update_date'],
+                         name='notification_recipient_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.count} new answers to {self.question_id}'
+
+
+class UnreadCount(models.Model):
+    """用户的未读通知数
+
+    每个用户一行,导航栏按主键读取,不需要在通知表上执行 COUNT
+    写入新的通知时加一,未读的通知被删除时(例如问题被删除)减一
+    打开通知列表页时清零
+    """
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE,
+                                primary_key=True, related_name='unread_count')
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'notification_unread_count'
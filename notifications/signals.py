@@ -0,0 +1,26 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+
+from questions.models import Answer
+from . import tasks
+from .models import Notification, UnreadCount
+
+
+# 答案创建后通过任务队列写入通知,幂等键保证每个答案只通知一次
+def answer_created(sender, instance, created, **kwargs):
+    if created:
+        tasks.fan_out.enqueue(instance.pk, key=f'fan_out:{instance.pk}')
+
+
+post_save.connect(answer_created, sender=Answer)
+
+
+# 问题或用户被删除时级联删除的未读通知也要从未读数中减去
+def notification_deleted(sender, instance, **kwargs):
+    if not instance.read:
+        UnreadCount.objects.filter(
+            pk=instance.recipient_id, count__gt=0).update(
+                count=F('count') - 1)
+
+
+post_delete.connect(notification_deleted, sender=Notification)
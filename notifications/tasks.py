@@ -0,0 +1,99 @@
+import time
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db.models import F
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from authentication.models import User
+from questions.bulk import chunked
+from questions.models import Answer
+from tasks.queue import task
+from .models import Notification, UnreadCount
+
+
+# 每批写入的通知数
+BATCH_SIZE = getattr(settings, 'NOTIFICATIONS_BATCH_SIZE', 500)
+# 摘要邮件的时间窗口(秒),同一个窗口内的通知合并为一封邮件
+DIGEST_WINDOW = getattr(settings, 'NOTIFICATIONS_DIGEST_WINDOW', 600)
+
+
+def participants(answer):
+    """问题的提问者和所有回答者,不包括这个答案的作者
+    """
+    yield answer.question.user_id
+    yield from Answer.objects.filter(question_id=answer.question_id).exclude(
+        user_id=answer.user_id).order_by().values_list(
+            'user_id', flat=True).distinct().iterator()
+
+
+@task('notifications.fan_out')
+def fan_out(answer_id):
+    """答案创建后通知问题的每个参与者,返回通知的人数
+
+    参与者按 BATCH_SIZE 个一组处理,每组的查询次数固定:
+    已有这个问题的未读通知的用户,用一条 UPDATE 累加到原来的通知上
+    其余用户用一条 INSERT 写入新通知,并用一条 UPDATE 增加未读数
+    摘要邮件任务也用一条 INSERT 写入,同一个用户在同一个时间窗口内只有一个
+    整个任务在一个事务中执行,失败重试时不会重复通知
+    """
+    answer = Answer.objects.select_related('question').filter(
+        pk=answer_id).first()
+    if answer is None:
+        return 0
+    seen = {answer.user_id}
+    window = int(time.time() // DIGEST_WINDOW)
+    count = 0
+    for batch in chunked(participants(answer), BATCH_SIZE):
+        recipients = [pk for pk in dict.fromkeys(batch) if pk not in seen]
+        seen.update(recipients)
+        if not recipients:
+            continue
+        unread = Notification.objects.filter(
+            recipient__in=recipients, question_id=answer.question_id,
+            read=False)
+        existing = set(unread.values_list('recipient_id', flat=True))
+        unread.update(
+            answer_id=answer.pk, actor_id=answer.user_id,
+            count=F('count') + 1, update_date=timezone.now(), emailed=False)
+        created = [pk for pk in recipients if pk not in existing]
+        Notification.objects.bulk_create([
+            Notification(recipient_id=pk, question_id=answer.question_id,
+                         answer_id=answer.pk, actor_id=answer.user_id)
+            for pk in created])
+        UnreadCount.objects.bulk_create(
+            [UnreadCount(user_id=pk) for pk in created],
+            ignore_conflicts=True)
+        UnreadCount.objects.filter(user__in=created).update(
+            count=F('count') + 1)
+        send_digest.enqueue_many(
+            [((pk,), f'digest:{pk}:{window}') for pk in recipients],
+            delay=DIGEST_WINDOW)
+        count += len(recipients)
+    return count
+
+
+@task('notifications.send_digest')
+def send_digest(user_id):
+    """将用户尚未发送的通知合并为一封邮件
+
+    发送后才标记为已发送,发送失败时任务重试,不会丢失通知
+    """
+    user = User.objects.filter(pk=user_id, is_active=True).first()
+    if user is None:
+        return 0
+    notifications = list(
+        Notification.objects.filter(recipient=user, emailed=False).
+        select_related('actor', 'question'))
+    if not notifications:
+        return 0
+    context = {'user': user, 'notifications': notifications,
+               'count': sum(n.count for n in notifications)}
+    send_mail(
+        render_to_string('notifications/digest_subject.txt', context).strip(),
+        render_to_string('notifications/digest.txt', context),
+        None, [user.email])
+    Notification.objects.filter(
+        pk__in=[n.pk for n in notifications]).update(emailed=True)
+    return len(notifications)
@@ -0,0 +1,118 @@
+from unittest import mock
+
+from django.core import mail
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from authentication.models import User
+from questions.models import Question, Answer
+from tasks import queue
+from tasks.models import Task
+from .models import Notification, UnreadCount
+from .tasks import fan_out
+
+
+@override_settings(PASSWORD_HASHERS=[
+    'django.contrib.auth.hashers.MD5PasswordHasher'])
+class NotificationTest(TestCase):
+    """新答案通知问题的参与者,同一个问题的通知合并,摘要邮件按时间窗口合并
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.asker, cls.bob, cls.carol = [
+            User.objects.create_user(name, f'{name}@example.com', 'pw')
+            for name in ('asker', 'bob', 'carol')]
+        cls.question = Question.objects.create(
+            user=cls.asker, title='Notify me', description='Description')
+
+    def answer(self, user):
+        return Answer.objects.create(
+            user=user, question=self.question, description='Answer')
+
+    def unread(self, user):
+        return UnreadCount.objects.get(user=user).count
+
+    def test_participants_are_notified(self):
+        self.answer(self.bob)
+        self.answer(self.carol)
+        self.answer(self.bob)
+        # 同一个问题的未读通知只有一条,累加新答案的数量
+        notification = Notification.objects.get(recipient=self.asker)
+        self.assertEqual((notification.count, notification.actor),
+                         (3, self.bob))
+        self.assertEqual(
+            Notification.objects.get(recipient=self.bob).count, 1)
+        self.assertEqual(
+            Notification.objects.get(recipient=self.carol).count, 1)
+        self.assertEqual(
+            [self.unread(u) for u in (self.asker, self.bob, self.carol)],
+            [1, 1, 1])
+
+    def test_fan_out_in_batches(self):
+        for i in range(5):
+            self.answer(User.objects.create_user(
+                f'user{i}', f'user{i}@example.com', 'pw'))
+        answer = self.answer(self.bob)
+        Notification.objects.all().delete()
+        with mock.patch('notifications.tasks.BATCH_SIZE', 2), \
+                self.assertNumQueries(20):
+            # 查询答案和参与者,然后 3 批,每批 6 条查询
+            # 这些用户的摘要任务在这个时间窗口内已经存在,不再写入
+            self.assertEqual(fan_out(answer.pk), 6)
+        self.assertEqual(Notification.objects.count(), 6)
+
+    def test_read_resets_count(self):
+        self.answer(self.bob)
+        self.client.force_login(self.asker)
+        response = self.client.get(reverse('questions:questions_list'))
+        self.assertContains(response, 'badge')
+        response = self.client.get(reverse('notifications:list'))
+        self.assertContains(response, 'Notify me')
+        self.assertEqual(self.unread(self.asker), 0)
+        self.assertTrue(Notification.objects.get(recipient=self.asker).read)
+        # 已读之后的新答案产生新的通知
+        self.answer(self.carol)
+        self.assertEqual(Notification.objects.filter(
+            recipient=self.asker).count(), 2)
+        self.assertEqual(self.unread(self.asker), 1)
+
+    def test_deleted_answers_and_questions(self):
+        answer = self.answer(self.bob)
+        self.answer(self.carol)
+        # 通知合并了两个答案,删除最新的答案后通知仍然保留
+        Answer.objects.filter(user=self.carol).delete()
+        notification = Notification.objects.get(recipient=self.asker)
+        self.assertIsNone(notification.answer)
+        self.assertEqual(self.unread(self.asker), 1)
+        self.client.force_login(self.asker)
+        self.assertContains(
+            self.client.get(reverse('notifications:list')), 'Notify me')
+
+        # 删除问题时级联删除的未读通知不再计入未读数
+        self.answer(self.carol)
+        self.assertEqual(
+            [self.unread(u) for u in (self.asker, self.bob)], [1, 1])
+        question = Question.objects.get(pk=answer.question_id)
+        question.delete()
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(
+            [self.unread(u) for u in (self.asker, self.bob)], [0, 0])
+
+    def test_digest_coalesces_window(self):
+        self.answer(self.bob)
+        self.answer(self.carol)
+        self.answer(self.bob)
+        # 每个用户在一个时间窗口内只有一个摘要任务
+        digests = Task.objects.filter(name='notifications.send_digest')
+        self.assertEqual(digests.count(), 3)
+        self.assertEqual(mail.outbox, [])
+        digests.update(run_at=timezone.now())
+        with self.settings(TASKS_EAGER=False):
+            self.assertEqual(queue.run_pending(), 3)
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), [
+            'asker@example.com', 'bob@example.com', 'carol@example.com'])
+        message = next(m for m in mail.outbox if m.to == ['asker@example.com'])
+        self.assertIn('3 new answers, the latest by bob', message.body)
+        self.assertFalse(Notification.objects.filter(emailed=False).exists())
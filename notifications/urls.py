@@ -0,0 +1,9 @@
+from django.urls import path
+
+from .views import notification_list
+
+app_name = 'notifications'
+
+urlpatterns = [
+    path('notifications/', notification_list, name='list'),
+]
@@ -0,0 +1,26 @@
+from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.shortcuts import render
+
+from .models import Notification, UnreadCount
+
+
+# 通知列表页展示的最近通知数量
+NOTIFICATIONS_PER_PAGE = 50
+
+
+@login_required
+def notification_list(request):
+    """最近的通知,打开页面后全部标记为已读
+    """
+    notifications = list(
+        Notification.objects.filter(recipient=request.user).select_related(
+            'actor', 'question')[:NOTIFICATIONS_PER_PAGE])
+    with transaction.atomic():
+        Notification.objects.filter(
+            recipient=request.user, read=False).update(read=True)
+        UnreadCount.objects.filter(user=request.user).update(count=0)
+    return render(request, 'notifications/list.html', {
+        'notifications': notifications,
+        'unread_notifications': 0,
+    })
@@ -1,7 +1,114 @@
+from django.conf import settings
 from django.contrib import admin
+from django.urls import reverse
+from django.utils.html import format_html
+from django.utils.text import Truncator
 
+from search.backends import get_backend
+from search.query import parse_query
 from .models import Question, Answer
+from .pagination import EstimatedCountPaginator
 
 
-admin.site.register(Question)
-admin.site.register(Answer)
+# 管理后台搜索时从搜索后端取回的最大问题数,按相关度排序
+ADMIN_SEARCH_LIMIT = getattr(settings, 'QUESTIONS_ADMIN_SEARCH_LIMIT', 1000)
+# 列表页中正文和标题显示的字符数
+ADMIN_TRUNCATE = 80
+
+
+class UnansweredFilter(admin.SimpleListFilter):
+    """按是否有答案筛选问题,使用索引 question_unanswered_idx
+    """
+
+    title = 'answers'
+    parameter_name = 'answered'
+
+    def lookups(self, request, model_admin):
+        return (('no', 'Unanswered'), ('yes', 'Answered'))
+
+    def queryset(self, request, queryset):
+        if self.value() == 'no':
+            return queryset.filter(answer_count=0)
+        if self.value() == 'yes':
+            return queryset.filter(answer_count__gt=0)
+        return queryset
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """数据量很大的表使用的 ModelAdmin 基类
+
+    总数使用估算值,不显示未经筛选的总数,每次打开列表页不会执行 COUNT(*)
+    搜索通过搜索后端完成,不使用逐行扫描的 icontains ,纯数字按主键查找
+    用户列显示为链接,点击后按用户筛选(外键上有索引)
+    不使用 list_filter = ('user',) ,它会查询并列出全部用户
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    date_hierarchy = 'create_date'
+    ordering = ('-id',)
+    autocomplete_fields = ('user',)
+    # 非空时才显示搜索框,实际的搜索由 get_search_results 完成
+    search_fields = ('id',)
+    # 搜索后端以问题为单位返回结果,用这个查找条件筛选匹配的问题的主键
+    search_lookup = 'pk__in'
+
+    def search_question_ids(self, search_term):
+        groups = parse_query(search_term)
+        if not groups:
+            return []
+        ids, _ = get_backend().search_ids(
+            groups, offset=0, limit=ADMIN_SEARCH_LIMIT)
+        return ids
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        if search_term.isdigit():
+            return queryset.filter(pk=int(search_term)), False
+        return queryset.filter(**{
+            self.search_lookup: self.search_question_ids(search_term)}), False
+
+    def user_link(self, obj):
+        url = reverse(
+            f'admin:{obj._meta.app_label}_{obj._meta.model_name}_changelist')
+        return format_html('<a href="{}?user__id__exact={}">{}</a>',
+                           url, obj.user_id, obj.user.username)
+    user_link.short_description = 'user'
+
+
+@admin.register(Question)
+class QuestionAdmin(LargeTableAdmin):
+    list_display = ('id', 'short_title', 'user_link', 'answer_count',
+                    'create_date', 'last_activity')
+    list_display_links = ('id', 'short_title')
+    list_select_related = ('user',)
+    list_filter = (UnansweredFilter,)
+
+    def short_title(self, obj):
+        return Truncator(obj.title).chars(ADMIN_TRUNCATE)
+    short_title.short_description = 'title'
+
+
+@admin.register(Answer)
+class AnswerAdmin(LargeTableAdmin):
+    list_display = ('id', 'short_description', 'question_link', 'user_link',
+                    'create_date')
+    list_display_links = ('id', 'short_description')
+    list_select_related = ('user', 'question')
+    # 下拉框会列出全部问题,改为直接填写主键
+    raw_id_fields = ('question',)
+    # 显示匹配的问题下的答案
+    search_lookup = 'question__in'
+
+    def short_description(self, obj):
+        return Truncator(obj.description).chars(ADMIN_TRUNCATE)
+    short_description.short_description = 'description'
+
+    def question_link(self, obj):
+        url = reverse('admin:questions_answer_changelist')
+        return format_html(
+            '<a href="{}?question__id__exact={}">{}</a>', url,
+            obj.question_id, Truncator(obj.question.title).chars(40))
+    question_link.short_description = 'question'
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class QuestionsConfig(AppConfig):
     name = 'questions'
+
+    def ready(self):
+        # 导入模块时连接信号,答案创建和删除后更新问题的冗余字段
+        from . import signals  # noqa
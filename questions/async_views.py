@@ -0,0 +1,98 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import Http404
+from django.shortcuts import render
+
+from . import caching
+from .forms import AnswerForm
+from .models import Question
+from .views import (
+    QuestionDetailView, QuestionListView, answer_page, related_questions)
+
+
+# 异步视图只在 ASGI 部署中使用,路由见 questions.urls_async 模块
+# Django 3.1 的 ORM 和缓存接口都是同步的,需要通过 sync_to_async 在线程中调用
+# 等待查询的过程中事件循环可以继续处理其它请求,不会占用工作进程
+
+
+def in_thread(func):
+    """返回在线程池中执行 func 的协程函数,结束后关闭过期的数据库连接
+
+    不使用 thread_sensitive 模式,否则所有请求的同步代码都在同一个线程中排队
+    """
+    def run(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(run, thread_sensitive=False)
+
+
+def rendered(view):
+    """在线程中调用同步视图,TemplateResponse 也在同一个线程中渲染
+    """
+    def run(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render') and callable(response.render):
+            response.render()
+        return response
+    return in_thread(run)
+
+
+async def run_queries(*funcs):
+    """执行若干个互相独立的查询函数,按顺序返回它们的返回值
+
+    settings.ASYNC_CONCURRENT_QUERIES 为真时每个函数在单独的线程中并发执行
+    每个线程使用独立的数据库连接,所以这些函数不能依赖当前事务中未提交的数据
+    """
+    if not getattr(settings, 'ASYNC_CONCURRENT_QUERIES', True):
+        return await sync_to_async(lambda: [func() for func in funcs])()
+    return list(await asyncio.gather(*[in_thread(func)() for func in funcs]))
+
+
+# 与同步视图一样,列表页的大部分工作是分页和读取片段缓存
+# 这里把整个同步视图放到线程中执行,等待期间事件循环可以处理其它请求
+_question_list = rendered(QuestionListView.as_view())
+
+
+async def question_list(request):
+    """问题列表页的异步视图
+    """
+    return await _question_list(request)
+
+
+_question_detail = rendered(QuestionDetailView.as_view())
+
+
+async def question_detail(request, pk):
+    """问题详情页的异步视图
+
+    问题、答案列表和相似问题的查询互不依赖,同时执行
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return await _question_detail(request, pk=pk)
+
+    fragment = await sync_to_async(
+        lambda: caching.lookup(caching.question_fragment_key(pk)))()
+    context = {'question_id': pk, 'fragment': fragment, 'form': AnswerForm()}
+    if not fragment.hit:
+        question, page, related = await run_queries(
+            lambda: Question.objects.select_related(
+                'user', 'user__profile').filter(pk=pk).first(),
+            lambda: answer_page(pk),
+            lambda: related_questions(pk),
+        )
+        if question is None:
+            raise Http404('No question found matching the query.')
+        context['question'] = question
+        context['answers'] = page.object_list
+        context['answers_cursor'] = page.next_cursor
+        context['answers_remaining'] = max(
+            question.answer_count - len(page.object_list), 0)
+        context['related_questions'] = related
+
+    return await in_thread(render)(
+        request, QuestionDetailView.template_name, context)
@@ -0,0 +1,40 @@
+from contextlib import contextmanager
+from itertools import islice
+
+from django.db.models import Max
+
+
+def chunked(iterable, size):
+    """将可迭代对象按 size 个一组切分
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def next_id(model):
+    """返回映射类下一个可用的主键值
+
+    Django 3.1 的 bulk_create 在 SQLite 和 MySQL 上不会回填主键
+    批量写入前先分配主键,后续数据(例如答案的外键)可以直接引用
+    此方法只适合没有其它进程同时写入的离线任务
+    """
+    return (model.objects.aggregate(max_id=Max('pk'))['max_id'] or 0) + 1
+
+
+@contextmanager
+def suspend_auto_now(model, *names):
+    """临时关闭字段的 auto_now_add ,使批量写入时保留给定的时间
+    """
+    fields = [model._meta.get_field(name) for name in names]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
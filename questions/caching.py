@@ -0,0 +1,176 @@
+import hashlib
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+# 页面片段缓存使用的缓存配置名和有效期(秒)
+CACHE_ALIAS = getattr(settings, 'FRAGMENT_CACHE_ALIAS', 'default')
+TIMEOUT = getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 600)
+
+# 命中率统计先记录在进程内,累计到一定次数后再写入共享缓存
+STATS_FLUSH_EVERY = 50
+STATS_KEYS = ('fragment-stats:hits', 'fragment-stats:misses')
+
+LIST_VERSION = 'questions:list'
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def question_version_key(question_id):
+    return f'question:{question_id}'
+
+
+# 缓存键由 "版本号" 组成,数据变化时只需要更换版本号
+# 旧版本的片段不再被读取,过期后由缓存后端自动清除
+def get_versions(*names):
+    """批量获取版本号,不存在的版本号会被创建
+    """
+    cache = get_cache()
+    keys = ['version:' + name for name in names]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, uuid.uuid4().hex[:12], None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def bump_versions(*names):
+    """更换版本号,使依赖这些版本号的片段全部失效
+
+    在事务中调用时,提交后会再更换一次
+    避免其它请求在提交前用旧数据生成了新版本的片段
+    """
+    if not names:
+        return
+
+    def bump():
+        get_cache().set_many({
+            'version:' + name: uuid.uuid4().hex[:12] for name in names}, None)
+
+    bump()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(bump)
+
+
+def make_key(name, versions, vary_on=()):
+    digest = hashlib.md5(
+        ':'.join([str(v) for v in versions] + [str(v) for v in vary_on])
+        .encode('utf-8')).hexdigest()
+    return f'fragment:{name}:{digest}'
+
+
+def question_fragment_key(question_id):
+    """问题详情页片段的缓存键,问题及其答案有变化时失效
+    """
+    versions = get_versions(question_version_key(question_id))
+    return make_key('question_detail', versions, [question_id])
+
+
+def answers_batch_key(question_id, cursor):
+    """问题详情页后续答案批次的缓存键,与详情页片段同时失效
+    """
+    versions = get_versions(question_version_key(question_id))
+    return make_key('answers_batch', versions, [question_id, cursor])
+
+
+def list_fragment_key(vary_on):
+    """问题列表页片段的缓存键,任何问题或答案有变化时失效
+    """
+    return make_key('questions_list', get_versions(LIST_VERSION), vary_on)
+
+
+class Fragment:
+    """视图类查询缓存得到的片段
+
+    html 为 None 表示未命中,模板标签 cachefragment 渲染后写入缓存
+    """
+
+    def __init__(self, key, html=None):
+        self.key = key
+        self.html = html
+
+    @property
+    def hit(self):
+        return self.html is not None
+
+    def store(self, html):
+        get_cache().set(self.key, html, TIMEOUT)
+        self.html = html
+
+
+class Stats:
+    """片段缓存的命中次数统计
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = [0, 0]
+
+    def record(self, hit):
+        with self.lock:
+            self.pending[0 if hit else 1] += 1
+            if sum(self.pending) < STATS_FLUSH_EVERY:
+                return
+            pending, self.pending = self.pending, [0, 0]
+        self._flush(pending)
+
+    def _flush(self, pending):
+        cache = get_cache()
+        for key, value in zip(STATS_KEYS, pending):
+            if not value:
+                continue
+            try:
+                cache.incr(key, value)
+            except ValueError:
+                cache.set(key, value, None)
+
+    def snapshot(self):
+        """返回全部进程累计的命中次数、未命中次数和命中率
+        """
+        with self.lock:
+            pending, self.pending = self.pending, [0, 0]
+        self._flush(pending)
+        found = get_cache().get_many(STATS_KEYS)
+        hits, misses = (found.get(key, 0) for key in STATS_KEYS)
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': hits / total if total else 0.0,
+        }
+
+
+stats = Stats()
+
+
+def lookup(key):
+    """查询片段缓存,返回 Fragment 实例
+    """
+    html = get_cache().get(key)
+    stats.record(html is not None)
+    return Fragment(key, html)
+
+
+# 以下函数由 questions.signals 模块中的信号接收函数调用
+def question_changed(question_id):
+    bump_versions(question_version_key(question_id), LIST_VERSION)
+
+
+def user_changed(user_id):
+    """用户名变化后,其提问或回答过的问题的详情页片段失效
+    """
+    from .models import Question, Answer
+
+    question_ids = set(
+        Question.objects.filter(user_id=user_id).values_list('id', flat=True))
+    question_ids.update(
+        Answer.objects.filter(user_id=user_id).values_list(
+            'question_id', flat=True).distinct())
+    bump_versions(*[question_version_key(pk) for pk in question_ids])
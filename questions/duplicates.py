@@ -0,0 +1,130 @@
+import hashlib
+
+from django.db import transaction
+
+from search.inverted_index import tokenize
+from .bulk import chunked
+from .models import Question, SimHashBand
+
+
+# 标题指纹的汉明距离不超过 MAX_DISTANCE 的问题视为重复
+MAX_DISTANCE = 3
+# 64 位指纹分为 BANDS 段,距离不超过 BANDS - 1 的两个指纹至少有一段完全相同
+# 所以查找时只需要按段精确匹配,每段是一次索引查找
+# 修改这两个参数后需要执行 python manage.py rebuild_duplicate_index
+BANDS = 4
+BAND_BITS = 16
+BAND_MASK = (1 << BAND_BITS) - 1
+# 一次最多比较的候选数,个别特别拥挤的段不会拖慢查询
+CANDIDATE_LIMIT = 1000
+
+# 这些词不影响问题的含义,不计入指纹
+STOP_WORDS = frozenset(
+    'a an and are as at be by can do does for from how i if in is it my of '
+    'on or should the to use using what when where which why with you'.split())
+
+
+def features(title):
+    """标题中的词和相邻两个词组成的短语
+    """
+    words = [word for word in tokenize(title) if word not in STOP_WORDS]
+    return words + [f'{a} {b}' for a, b in zip(words, words[1:])]
+
+
+def simhash(title):
+    """计算标题的 64 位 SimHash 指纹,没有有效词语时返回 None
+
+    每个特征哈希为 64 位,每一位按 0 或 1 给计数器减一或加一
+    最后计数器为正的位为 1 ,相似的标题只有少数几位不同
+    """
+    items = features(title)
+    if not items:
+        return None
+    counts = [0] * 64
+    for item in set(items):
+        value = int.from_bytes(hashlib.blake2b(
+            item.encode('utf-8'), digest_size=8).digest(), 'little')
+        for bit in range(64):
+            counts[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit, count in enumerate(counts) if count > 0)
+
+
+def to_signed(value):
+    """BigIntegerField 是有符号的 64 位整数
+    """
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def band_keys(value):
+    """指纹每一段的键,段号在高位
+    """
+    return [index << BAND_BITS | value >> (index * BAND_BITS) & BAND_MASK
+            for index in range(BANDS)]
+
+
+def build_bands(questions):
+    """生成问题的 SimHashBand 实例,用于 bulk_create
+    """
+    bands = []
+    for question in questions:
+        value = simhash(question.title)
+        if value is None:
+            continue
+        bands.extend(
+            SimHashBand(question_id=question.pk, key=key,
+                        simhash=to_signed(value))
+            for key in band_keys(value))
+    return bands
+
+
+def index(question):
+    """更新一个问题的指纹,由 questions.signals 在问题保存后调用
+    """
+    with transaction.atomic():
+        SimHashBand.objects.filter(question=question).delete()
+        SimHashBand.objects.bulk_create(build_bands([question]))
+
+
+def rebuild(batch_size=1000):
+    """按主键顺序分批重建全部问题的指纹,返回问题数
+    """
+    SimHashBand.objects.all().delete()
+    count = 0
+    queryset = Question.objects.order_by('pk').only('id', 'title')
+    last_pk = 0
+    while True:
+        questions = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+        if not questions:
+            return count
+        last_pk = questions[-1].pk
+        with transaction.atomic():
+            for bands in chunked(build_bands(questions), batch_size):
+                SimHashBand.objects.bulk_create(bands)
+        count += len(questions)
+
+
+def find(title, limit=5, exclude=None):
+    """查找标题相似的问题,按距离从近到远返回 [(距离, 问题), ...]
+
+    一次按段的键查询候选的指纹,在内存中计算汉明距离
+    再一次按主键查询相似问题的标题,查询次数与问题总数无关
+    """
+    value = simhash(title)
+    if value is None:
+        return []
+    candidates = SimHashBand.objects.filter(key__in=band_keys(value))
+    if exclude is not None:
+        candidates = candidates.exclude(question_id=exclude)
+    distances = {}
+    for question_id, other in candidates.values_list(
+            'question_id', 'simhash')[:CANDIDATE_LIMIT]:
+        distance = bin(value ^ (other & (1 << 64) - 1)).count('1')
+        if distance <= MAX_DISTANCE:
+            distances[question_id] = distance
+    if not distances:
+        return []
+    nearest = sorted(distances, key=lambda pk: (distances[pk], -pk))[:limit]
+    questions = Question.objects.only('id', 'title', 'answer_count').in_bulk(
+        nearest)
+    return [(distances[pk], questions[pk]) for pk in nearest
+            if pk in questions]
@@ -0,0 +1,101 @@
+import csv
+from datetime import datetime, time, timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Question, Answer
+
+
+# 导出的数据类型及其字段,user__username 通过 JOIN 查询
+EXPORTS = {
+    'questions': (Question, (
+        'id', 'user_id', 'user__username', 'title', 'description',
+        'create_date', 'update_date', 'answer_count', 'last_activity')),
+    'answers': (Answer, (
+        'id', 'question_id', 'user_id', 'user__username', 'description',
+        'create_date')),
+}
+FORMATS = ('csv', 'jsonl')
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+CHUNK_SIZE = 1000
+
+
+def parse_bound(value, end=False):
+    """解析日期范围的一端,可以是日期或日期时间,返回带时区的日期时间
+
+    参数 end 为 True 时,只有日期的值表示当天结束(即第二天零点,不包含)
+    """
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'Invalid date: {value!r}')
+        if end:
+            day += timedelta(days=1)
+        moment = datetime.combine(day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def iter_rows(kind, since=None, until=None, chunk_size=CHUNK_SIZE):
+    """按主键顺序分批读取数据,逐行返回字典
+
+    每批的查询条件是 "主键大于上一批最后一行的主键",不使用 OFFSET
+    任意时刻内存中最多只有一批数据,与表的大小无关
+    参数 since 和 until 按 create_date 过滤,包含 since 不包含 until
+    """
+    model, fields = EXPORTS[kind]
+    queryset = model.objects.order_by('pk')
+    if since is not None:
+        queryset = queryset.filter(create_date__gte=since)
+    if until is not None:
+        queryset = queryset.filter(create_date__lt=until)
+    last_pk = 0
+    while True:
+        rows = list(queryset.filter(pk__gt=last_pk).values(*fields)[:chunk_size])
+        if not rows:
+            return
+        last_pk = rows[-1]['id']
+        yield from rows
+
+
+class Echo:
+    """csv.writer 需要一个带 write 方法的文件对象,这里直接返回写入的内容
+    """
+
+    def write(self, value):
+        return value
+
+
+def header(kind):
+    return [name.replace('__', '_') for name in EXPORTS[kind][1]]
+
+
+def stream(kind, fmt, since=None, until=None, chunk_size=CHUNK_SIZE):
+    """生成导出文件的内容,每次返回一行文本
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f'Unknown format: {fmt!r}')
+    fields = EXPORTS[kind][1]
+    names = header(kind)
+    rows = iter_rows(kind, since, until, chunk_size)
+    if fmt == 'csv':
+        writer = csv.writer(Echo())
+        yield writer.writerow(names)
+        for row in rows:
+            yield writer.writerow([
+                row[field].isoformat() if isinstance(row[field], datetime)
+                else row[field] for field in fields])
+    else:
+        encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(',', ':'))
+        for row in rows:
+            yield encoder.encode(
+                {name: row[field] for name, field in zip(names, fields)}) + '\n'
@@ -1,6 +1,7 @@
 from django import forms
 from django.utils.translation import ugettext_lazy as _
 
+from . import duplicates
 from .models import Question, Answer
 
 
@@ -24,10 +25,32 @@ class QuestionForm(forms.ModelForm):
         help_text = _('Write the question\'s description...')
     )
 
+    # 标题与已有问题相似时显示为复选框,用户确认不是重复问题后才能提交
+    not_duplicate = forms.BooleanField(
+        required=False,
+        label=_('My question is not answered by the questions above'),
+        widget=forms.HiddenInput)
+
     class Meta:
         model = Question
         fields = ['title', 'description']
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.duplicates = []
+
+    def clean(self):
+        cleaned_data = super().clean()
+        title = cleaned_data.get('title')
+        if title and not cleaned_data.get('not_duplicate'):
+            self.duplicates = [question for distance, question in
+                               duplicates.find(title, exclude=self.instance.pk)]
+            if self.duplicates:
+                self.fields['not_duplicate'].widget = forms.CheckboxInput()
+                self.add_error('title', _(
+                    'A similar question has already been asked.'))
+        return cleaned_data
+
 
 class AnswerForm(forms.ModelForm):
     """答案表单类
@@ -0,0 +1,241 @@
+import json
+import time
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from authentication.models import User
+from user_profile.management.commands.rebuild_user_stats import (
+    rebuild as rebuild_user_stats)
+from user_profile.models import Profile, UserStats
+from . import caching, duplicates, rendering
+from .bulk import chunked, next_id, suspend_auto_now
+from .management.commands.rank_questions import rank
+from .management.commands.reconcile_question_counters import reconcile
+from .models import Question, Answer, SimHashBand
+
+
+class InvalidRecord(ValueError):
+    """导入文件的内容有误,异常信息包含行号
+    """
+
+
+class Importer:
+    """从 JSONL 文件批量导入用户、问题和答案
+
+    文件每行一个 JSON 对象,type 字段表示数据类型:
+    {"type": "user", "username": "alice", "email": "alice@example.com"}
+    {"type": "question", "id": 17, "user": "alice", "title": "...",
+     "description": "...", "create_date": "2019-05-01T08:00:00Z"}
+    {"type": "answer", "question": 17, "user": "bob", "description": "...",
+     "create_date": "2019-05-02T09:30:00Z"}
+    问题的 id 是原系统中的编号,答案通过它引用问题,答案必须出现在问题之后
+    用户不需要单独列出,问题和答案中出现的用户名不存在时自动创建
+
+    文件逐行读取两遍:第一遍只检查格式,有错误时不写入任何数据
+    第二遍每 batch_size 行为一批,每批一个事务
+    用户通过 UserManager.get_or_create_many 批量查找或创建
+    问题和答案预先分配主键后通过 bulk_create 写入,并保留原来的时间
+    问题的标题指纹与问题在同一个事务中写入
+    bulk_create 不会发送信号,问题的冗余字段、热度得分和用户统计数据
+    在全部写入后由 finish 方法统一计算,只计算新写入的问题和出现过的用户
+    搜索索引由调用者更新,相似问题需要之后执行 build_related_questions
+    标题前缀索引在每个进程下次重建时读到导入的问题
+    与 Seeder 相同,导入期间不能有其它进程写入问题和答案
+    所以新写入的问题和答案的主键都大于 first_question_id 和 first_answer_id
+    """
+
+    def __init__(self, batch_size=1000, log=None):
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+        self.now = timezone.now()
+        # 原系统中的用户名和问题编号 -> 当前系统中的主键
+        self.user_ids = {}
+        self.question_ids = {}
+        self.first_question_id = self.next_question_id = next_id(Question)
+        self.first_answer_id = self.next_answer_id = next_id(Answer)
+        self.counts = {'users': 0, 'questions': 0, 'answers': 0, 'skipped': 0}
+
+    def run(self, file):
+        """导入全部数据并更新冗余数据,返回各类数据的数量
+
+        参数 file 是可以 seek 的文本文件,检查完全部内容后从头读取并写入
+        已经写入的批次不会回滚,所以格式错误必须在写入前发现
+        """
+        started = time.perf_counter()
+        for number, record in self.parse(file):
+            self.validate(number, record)
+        file.seek(0)
+        with suspend_auto_now(Question, 'create_date', 'update_date'), \
+                suspend_auto_now(Answer, 'create_date'):
+            for chunk in chunked(self.parse(file), self.batch_size):
+                self.import_chunk(chunk)
+                self.log(self.progress(time.perf_counter() - started))
+        self.elapsed = time.perf_counter() - started
+        self.finish()
+        return self.counts
+
+    def progress(self, elapsed):
+        rows = self.counts['questions'] + self.counts['answers']
+        return (f"{self.counts['users']} users, "
+                f"{self.counts['questions']} questions, "
+                f"{self.counts['answers']} answers "
+                f"({rows / elapsed if elapsed else 0:.0f} rows/s)")
+
+    def parse(self, lines):
+        """逐行解析,返回 (行号, 数据) ,跳过空行
+        """
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                raise InvalidRecord(f'Line {number}: {e}')
+            if not isinstance(record, dict) or record.get('type') not in (
+                    'user', 'question', 'answer'):
+                raise InvalidRecord(f'Line {number}: unknown record type.')
+            yield number, record
+
+    def validate(self, number, record):
+        """检查一行数据的字段类型、长度和时间格式,写入时不会再出错
+        """
+        if record['type'] == 'user':
+            self.require(number, record, 'username')
+            self.fit(number, record, 'username', User, 'username')
+            email = record.get('email')
+            if email is not None and not isinstance(email, str):
+                raise InvalidRecord(f'Line {number}: email must be a string.')
+            self.fit(number, record, 'email', User, 'email')
+            return
+        self.require(number, record, 'user', 'description')
+        self.fit(number, record, 'user', User, 'username')
+        if record['type'] == 'question':
+            self.require(number, record, 'title')
+            self.fit(number, record, 'title', Question, 'title')
+            self.reference(number, record, 'id')
+            self.parse_date(number, record, 'update_date')
+        else:
+            self.reference(number, record, 'question')
+        self.parse_date(number, record, 'create_date')
+
+    def fit(self, number, record, name, model, field):
+        """字符串不能超过对应字段的 max_length
+        """
+        value = record.get(name)
+        limit = model._meta.get_field(field).max_length
+        if value and len(value) > limit:
+            raise InvalidRecord(
+                f'Line {number}: {name} is longer than {limit} characters.')
+
+    def reference(self, number, record, name):
+        """原系统中的问题编号作为字典的键,只能是字符串或整数
+        """
+        value = record.get(name)
+        if value is not None and (
+                isinstance(value, bool) or not isinstance(value, (str, int))):
+            raise InvalidRecord(
+                f'Line {number}: {name} must be a string or an integer.')
+
+    def parse_date(self, number, record, name, default=None):
+        value = record.get(name)
+        if not value:
+            return default or self.now
+        # 超出范围的日期引发 ValueError ,不是字符串时引发 TypeError
+        try:
+            moment = parse_datetime(value)
+        except (ValueError, TypeError):
+            moment = None
+        if moment is None:
+            raise InvalidRecord(f'Line {number}: invalid {name} {value!r}.')
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        return moment
+
+    def require(self, number, record, *names):
+        for name in names:
+            value = record.get(name)
+            if not value or not isinstance(value, str):
+                raise InvalidRecord(
+                    f'Line {number}: {name} must be a non-empty string.')
+
+    def resolve_users(self, chunk):
+        """查找或创建这一批数据中出现的全部用户
+        """
+        emails = {}
+        for number, record in chunk:
+            if record['type'] == 'user':
+                emails[record['username']] = record.get('email')
+            else:
+                emails.setdefault(record['user'], None)
+        missing = {name: email for name, email in emails.items()
+                   if name not in self.user_ids}
+        if not missing:
+            return
+        ids, created = User.objects.get_or_create_many(missing)
+        self.user_ids.update(ids)
+        # 信号接收函数 create_user_profile 不会被触发,这里批量创建
+        Profile.objects.bulk_create([Profile(user_id=pk) for pk in created])
+        UserStats.objects.bulk_create([UserStats(user_id=pk) for pk in created])
+        self.counts['users'] += len(created)
+
+    def import_chunk(self, chunk):
+        questions, answers = [], []
+        with transaction.atomic():
+            self.resolve_users(chunk)
+            for number, record in chunk:
+                if record['type'] == 'question':
+                    questions.append(self.build_question(number, record))
+                elif record['type'] == 'answer':
+                    answer = self.build_answer(number, record)
+                    if answer is None:
+                        self.counts['skipped'] += 1
+                    else:
+                        answers.append(answer)
+            Question.objects.bulk_create(questions)
+            SimHashBand.objects.bulk_create(duplicates.build_bands(questions))
+            Answer.objects.bulk_create(answers)
+        self.counts['questions'] += len(questions)
+        self.counts['answers'] += len(answers)
+
+    def build_question(self, number, record):
+        create_date = self.parse_date(number, record, 'create_date')
+        question = Question(
+            id=self.next_question_id, user_id=self.user_ids[record['user']],
+            title=record['title'], description=record['description'],
+            create_date=create_date,
+            update_date=self.parse_date(
+                number, record, 'update_date', create_date),
+            last_activity=create_date)
+        rendering.refresh(question)
+        if record.get('id') is not None:
+            self.question_ids[record['id']] = question.pk
+        self.next_question_id += 1
+        return question
+
+    def build_answer(self, number, record):
+        """问题不存在时返回 None ,这一行被跳过
+        """
+        question_id = self.question_ids.get(record.get('question'))
+        if question_id is None:
+            return None
+        answer = Answer(
+            id=self.next_answer_id, user_id=self.user_ids[record['user']],
+            question_id=question_id, description=record['description'],
+            create_date=self.parse_date(number, record, 'create_date'))
+        rendering.refresh(answer)
+        self.next_answer_id += 1
+        return answer
+
+    def finish(self):
+        """一次性计算导入过程中跳过的冗余数据
+
+        已有的问题不会增加答案,只需要计算新写入的问题
+        """
+        started = time.perf_counter()
+        reconcile(self.batch_size, after=self.first_question_id - 1)
+        rank(self.batch_size, after=self.first_question_id - 1)
+        rebuild_user_stats(self.batch_size, set(self.user_ids.values()))
+        caching.bump_versions(caching.LIST_VERSION)
+        self.log(f'counters rebuilt in {time.perf_counter() - started:.1f}s')
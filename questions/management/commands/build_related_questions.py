@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from questions.related import TOP_K, rebuild, update
+
+
+class Command(BaseCommand):
+    """计算问题详情页显示的相似问题
+
+    默认只计算上次执行之后新增的问题,作为定时任务执行,例如每 10 分钟一次:
+    */10 * * * * python manage.py build_related_questions
+    问题被编辑后向量不会更新,新词也不会进入词表,需要定期全量重建:
+    python manage.py build_related_questions --full
+    同一时间只能有一个进程执行此命令
+    """
+
+    help = 'Compute related questions for new questions, or all with --full.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Rebuild the vocabulary and the neighbours of every question.')
+        parser.add_argument(
+            '--count', type=int, default=TOP_K,
+            help='Number of related questions stored per question.')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of questions written per transaction.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        compute = rebuild if options['full'] else update
+        count, written = compute(
+            k=options['count'], batch_size=options['batch_size'])
+        self.stdout.write(
+            f'{count} questions processed, {written} related links written '
+            f'in {time.perf_counter() - started:.1f}s')
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from questions import export
+
+
+class Command(BaseCommand):
+    """以 CSV 或 JSONL 格式导出问题或答案
+
+    数据分批读取并逐行写出,内存占用与数据量无关
+    python manage.py export_qa answers --format jsonl --since 2021-01-01 -o answers.jsonl
+    """
+
+    help = 'Stream questions or answers to a CSV or JSONL file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('type', choices=sorted(export.EXPORTS))
+        parser.add_argument('--format', choices=export.FORMATS, default='csv')
+        parser.add_argument(
+            '--since', help='Only rows created at or after this date/time.')
+        parser.add_argument(
+            '--until', help='Only rows created before the end of this '
+                            'date, or before this date/time.')
+        parser.add_argument(
+            '-o', '--output', help='Output file, default standard output.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=export.CHUNK_SIZE,
+            help='Number of rows loaded per query.')
+
+    def handle(self, *args, **options):
+        try:
+            since = export.parse_bound(options['since'])
+            until = export.parse_bound(options['until'], end=True)
+        except ValueError as e:
+            raise CommandError(e)
+        lines = export.stream(options['type'], options['format'],
+                              since, until, options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8',
+                      newline='') as f:
+                count = self.write(f, lines)
+            # CSV 文件的第一行是表头
+            count -= options['format'] == 'csv'
+            self.stderr.write(f'{count} rows written to {options["output"]}')
+        else:
+            self.write(self.stdout, lines)
+
+    def write(self, f, lines):
+        count = 0
+        for line in lines:
+            f.write(line)
+            count += 1
+        return count
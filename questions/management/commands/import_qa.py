@@ -0,0 +1,86 @@
+import shutil
+import sys
+import tempfile
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from questions.importing import Importer, InvalidRecord
+from questions.models import Question, Answer
+from search.backends import get_backend
+
+
+class Command(BaseCommand):
+    """从 JSONL 文件批量导入其它论坛的用户、问题和答案
+
+    文件格式见 questions.importing.Importer
+    python manage.py import_qa dump.jsonl --batch-size 2000
+    导入完成后重新计算新数据的冗余字段,并将新的问题和答案逐条写入搜索索引
+    导入大量数据时使用 --rebuild-index 一次性重建整个索引更快
+    相似问题需要之后执行 python manage.py build_related_questions
+    """
+
+    help = 'Bulk import users, questions and answers from a JSONL file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='JSONL file to import, "-" for standard input.')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of lines written per transaction.')
+        parser.add_argument('--no-index', action='store_true',
+                            help='Skip updating the search index.')
+        parser.add_argument(
+            '--rebuild-index', action='store_true',
+            help='Rebuild the whole search index instead of adding the '
+                 'imported rows one by one.')
+
+    def handle(self, *args, **options):
+        importer = Importer(
+            batch_size=options['batch_size'],
+            log=self.stdout.write if options['verbosity'] > 1 else None)
+        started = time.perf_counter()
+        try:
+            if options['path'] == '-':
+                # 标准输入只能读取一遍,先复制到临时文件
+                with tempfile.TemporaryFile('w+', encoding='utf-8') as f:
+                    shutil.copyfileobj(sys.stdin, f)
+                    f.seek(0)
+                    counts = importer.run(f)
+            else:
+                with open(options['path'], encoding='utf-8') as f:
+                    counts = importer.run(f)
+        except (OSError, InvalidRecord) as e:
+            raise CommandError(e)
+        if options['rebuild_index']:
+            call_command('rebuild_search_index', stdout=self.stdout)
+        elif not options['no_index']:
+            self.index(importer)
+        elapsed = time.perf_counter() - started
+        writing = importer.elapsed or elapsed
+
+        rows = counts['questions'] + counts['answers']
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {counts['users']} new users, "
+            f"{counts['questions']} questions and {counts['answers']} "
+            f"answers in {elapsed:.1f}s ({rows / writing:.0f} rows/s "
+            f"while writing, {rows / elapsed:.0f} rows/s overall)"))
+        if counts['skipped']:
+            self.stderr.write(
+                f"{counts['skipped']} answers skipped: question not found")
+
+    def index(self, importer):
+        """将导入的问题和答案写入搜索索引
+        """
+        backend = get_backend()
+        questions = Question.objects.filter(
+            pk__gte=importer.first_question_id).order_by().only(
+                'id', 'title', 'description')
+        for question in questions.iterator():
+            backend.index_question(question)
+        answers = Answer.objects.filter(
+            pk__gte=importer.first_answer_id).order_by().only(
+                'id', 'question_id', 'description')
+        for answer in answers.iterator():
+            backend.index_answer(answer)
@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from questions import caching
+from questions.models import Question
+from questions.ranking import hot_score
+
+
+class Command(BaseCommand):
+    """重新计算全部问题的热度得分
+
+    得分在问题创建和答案数变化时自动更新,以下情况需要执行此命令:
+    修改 questions.ranking 的参数后、批量导入数据后、作为定时任务修复数据
+    例如在 crontab 中每小时执行一次:
+    0 * * * * python manage.py rank_questions
+    """
+
+    help = 'Recompute hot_score for all questions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of questions checked per batch.')
+
+    def handle(self, *args, **options):
+        changed = rank(options['batch_size'])
+        self.stdout.write(f'{changed} questions re-ranked')
+
+
+def rank(batch_size=1000, model=Question, after=0):
+    """按主键顺序分批计算得分,只更新有变化的行
+
+    参数 model 用于在数据迁移中传入历史版本的映射类
+    参数 after 只计算主键大于它的问题,批量导入后只计算新写入的问题
+    """
+    changed = 0
+    last_pk = after
+    while True:
+        questions = list(
+            model.objects.filter(pk__gt=last_pk).order_by('pk').only(
+                'id', 'answer_count', 'create_date', 'hot_score'
+            )[:batch_size])
+        if not questions:
+            break
+        last_pk = questions[-1].pk
+        stale = []
+        for question in questions:
+            score = hot_score(question.answer_count, question.create_date)
+            if question.hot_score != score:
+                question.hot_score = score
+                stale.append(question)
+        if stale:
+            with transaction.atomic():
+                model.objects.bulk_update(stale, ['hot_score'])
+            changed += len(stale)
+    if changed and model is Question:
+        caching.bump_versions(caching.LIST_VERSION)
+    return changed
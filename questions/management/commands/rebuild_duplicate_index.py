@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from questions.duplicates import rebuild
+
+
+class Command(BaseCommand):
+    """重新计算全部问题的标题指纹
+
+    指纹在问题保存时自动更新,以下情况需要执行此命令:
+    首次部署此功能后、修改 questions.duplicates 的参数后
+    python manage.py rebuild_duplicate_index
+    """
+
+    help = 'Recompute the title fingerprints used to find duplicate questions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of questions fingerprinted per transaction.')
+
+    def handle(self, *args, **options):
+        count = rebuild(options['batch_size'])
+        self.stdout.write(f'{count} questions fingerprinted')
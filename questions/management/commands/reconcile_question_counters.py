@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max
+
+from questions.models import Question, Answer
+
+
+class Command(BaseCommand):
+    """修复问题表中的冗余字段 answer_count 和 last_activity
+
+    信号接收函数在正常情况下保证数据一致
+    批量导入数据或直接修改数据库后执行:
+    python manage.py reconcile_question_counters
+    """
+
+    help = 'Recompute answer_count and last_activity for all questions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of questions checked per batch.')
+
+    def handle(self, *args, **options):
+        repaired = reconcile(options['batch_size'])
+        self.stdout.write(f'{repaired} questions repaired')
+
+
+def reconcile(batch_size=1000, after=0):
+    """按主键顺序分批比较冗余字段和实际值,只更新不一致的行
+
+    参数 after 只检查主键大于它的问题,批量导入后只检查新写入的问题
+    """
+    repaired = 0
+    last_pk = after
+    while True:
+        questions = list(
+            Question.objects.filter(pk__gt=last_pk).order_by('pk').only(
+                'id', 'create_date', 'answer_count', 'last_activity'
+            )[:batch_size])
+        if not questions:
+            break
+        last_pk = questions[-1].pk
+        stats = {
+            row['question']: row for row in
+            Answer.objects.filter(
+                question__in=[q.pk for q in questions]
+            ).order_by().values('question').annotate(
+                count=Count('pk'), latest=Max('create_date'))}
+
+        changed = []
+        for question in questions:
+            row = stats.get(question.pk)
+            count = row['count'] if row else 0
+            activity = question.create_date
+            if row and row['latest'] > activity:
+                activity = row['latest']
+            if (question.answer_count, question.last_activity) != (
+                    count, activity):
+                question.answer_count = count
+                question.last_activity = activity
+                changed.append(question)
+        if changed:
+            with transaction.atomic():
+                Question.objects.bulk_update(
+                    changed, ['answer_count', 'last_activity'])
+            repaired += len(changed)
+    return repaired
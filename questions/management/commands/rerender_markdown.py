@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from questions import rendering
+from questions.models import Question, Answer
+
+
+class Command(BaseCommand):
+    """批量重新渲染问题和答案的 Markdown 文本
+
+    修改 questions.rendering 中的扩展列表并增加 RENDERER_VERSION 后执行:
+    python manage.py rerender_markdown
+    """
+
+    help = 'Re-render stored Markdown HTML for questions and answers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of rows loaded and updated per batch.')
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Check the content hash of every row, not only rows '
+                 'rendered by an older renderer version.')
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Re-render every row even if it is up to date.')
+
+    def handle(self, *args, **options):
+        for model in (Question, Answer):
+            count = self.rerender(model, options['batch_size'],
+                                  options['all'] or options['force'],
+                                  options['force'])
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}: {count} re-rendered')
+
+    def rerender(self, model, batch_size, check_all, force):
+        """按主键顺序分批读取数据,只更新需要重新渲染的行
+        """
+        queryset = model.objects.only(
+            'id', 'description', 'description_hash', 'markdown_version'
+        ).order_by('pk')
+        if not check_all:
+            queryset = queryset.exclude(
+                markdown_version=rendering.RENDERER_VERSION)
+
+        count = 0
+        last_pk = 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            changed = [obj for obj in batch if rendering.refresh(obj, force)]
+            if changed:
+                with transaction.atomic():
+                    model.objects.bulk_update(changed, [
+                        'description_html', 'description_hash',
+                        'markdown_version'])
+                count += len(changed)
+        return count
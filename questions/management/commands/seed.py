@@ -0,0 +1,47 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from questions.seeding import Seeder
+
+
+class Command(BaseCommand):
+    """批量生成测试数据,用于在本地复现生产环境的数据规模
+
+    python manage.py seed --users 100000 --questions 300000
+    在空数据库上使用相同的 --seed 会生成相同的数据
+    """
+
+    help = 'Generate synthetic users, profiles, questions and answers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--questions', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Random seed, the same seed gives the same data.')
+        parser.add_argument('--alpha', type=float, default=1.2,
+                            help='Pareto shape of answers per question.')
+        parser.add_argument('--max-answers', type=int, default=500)
+        parser.add_argument('--days', type=int, default=365,
+                            help='Spread creation dates over this many days.')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--password', default='password',
+                            help='Password shared by all generated users.')
+        parser.add_argument('--prefix', default='user',
+                            help='Prefix of generated usernames.')
+        parser.add_argument('--no-index', action='store_true',
+                            help='Skip rebuilding the search index.')
+
+    def handle(self, *args, **options):
+        seeder = Seeder(
+            users=options['users'], questions=options['questions'],
+            seed=options['seed'], alpha=options['alpha'],
+            max_answers=options['max_answers'], days=options['days'],
+            batch_size=options['batch_size'], password=options['password'],
+            prefix=options['prefix'],
+            log=self.stdout.write if options['verbosity'] > 1 else None)
+        seeder.run()
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {options['users']} users and "
+            f"{options['questions']} questions"))
+        if not options['no_index']:
+            call_command('rebuild_search_index', stdout=self.stdout)
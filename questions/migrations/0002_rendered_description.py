@@ -0,0 +1,56 @@
+# Generated by Django 3.1.14 on 2026-10-17 17:36
+
+from django.db import migrations, models
+
+
+def render_descriptions(apps, schema_editor):
+    from questions import rendering
+
+    for name in ('Question', 'Answer'):
+        model = apps.get_model('questions', name)
+        changed = [obj for obj in model.objects.iterator()
+                   if rendering.refresh(obj)]
+        model.objects.bulk_update(changed, [
+            'description_html', 'description_hash', 'markdown_version'],
+            batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='answer',
+            name='description_hash',
+            field=models.CharField(blank=True, editable=False, max_length=40),
+        ),
+        migrations.AddField(
+            model_name='answer',
+            name='description_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='answer',
+            name='markdown_version',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='description_hash',
+            field=models.CharField(blank=True, editable=False, max_length=40),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='description_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='markdown_version',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(render_descriptions, migrations.RunPython.noop),
+    ]
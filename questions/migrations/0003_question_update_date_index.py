@@ -0,0 +1,17 @@
+# Generated by Django 3.1.14 on 2026-10-17 17:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0002_rendered_description'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['update_date', 'id'], name='question_update_date_id_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 3.1.14 on 2026-10-17 17:42
+
+from django.db import migrations, models
+from django.db.models import Count, F, IntegerField, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+import django.utils.timezone
+
+
+def fill_counters(apps, schema_editor):
+    Question = apps.get_model('questions', 'Question')
+    Answer = apps.get_model('questions', 'Answer')
+    answers = Answer.objects.filter(question=OuterRef('pk')).order_by()
+    Question.objects.update(
+        answer_count=Coalesce(Subquery(
+            answers.values('question').annotate(n=Count('pk')).values('n'),
+            output_field=IntegerField()), 0),
+        last_activity=Greatest(F('create_date'), Coalesce(Subquery(
+            answers.values('question').annotate(
+                latest=Max('create_date')).values('latest')),
+            F('create_date'))))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0003_question_update_date_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='answer_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='last_activity',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['last_activity', 'id'], name='question_activity_id_idx'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.1.14 on 2026-10-17 18:04
+
+from django.db import migrations, models
+
+
+def fill_scores(apps, schema_editor):
+    from questions.management.commands.rank_questions import rank
+
+    rank(model=apps.get_model('questions', 'Question'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0004_question_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='hot_score',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['hot_score', 'id'], name='question_hot_score_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['answer_count', 'create_date', 'id'], name='question_unanswered_idx'),
+        ),
+        migrations.RunPython(fill_scores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.1.14 on 2026-10-17 18:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0005_question_hot_score'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='answer',
+            index=models.Index(fields=['question', 'create_date'], name='answer_question_date_idx'),
+        ),
+    ]
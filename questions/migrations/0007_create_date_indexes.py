@@ -0,0 +1,21 @@
+# Generated by Django 3.1.14 on 2026-10-17 18:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0006_answer_question_date_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='answer',
+            index=models.Index(fields=['create_date'], name='answer_create_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['create_date'], name='question_create_date_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 3.1.14 on 2026-10-17 18:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0007_create_date_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedQuestion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='questions.question')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='questions.question')),
+            ],
+            options={
+                'db_table': 'question_related',
+                'ordering': ('question_id', 'rank'),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='relatedquestion',
+            constraint=models.UniqueConstraint(fields=('question', 'rank'), name='question_related_rank_uniq'),
+        ),
+    ]
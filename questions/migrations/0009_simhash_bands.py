@@ -0,0 +1,30 @@
+# Generated by Django 3.1.14 on 2026-10-17 18:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0008_related_questions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimHashBand',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.PositiveIntegerField()),
+                ('simhash', models.BigIntegerField()),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='questions.question')),
+            ],
+            options={
+                'db_table': 'question_simhash_band',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='simhashband',
+            index=models.Index(fields=['key'], name='question_simhash_band_idx'),
+        ),
+    ]
@@ -1,10 +1,45 @@
-import markdown
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
+from django.utils.text import Truncator
 
 from authentication.models import User
+from . import rendering
 
 
-class Question(models.Model):
+class RenderedDescriptionModel(models.Model):
+    """保存 description 字段渲染结果的抽象映射类
+
+    渲染后的 HTML 连同原文哈希值和渲染器版本号一起保存
+    每次调用 save 方法时,只有原文或渲染器发生变化才会重新渲染
+    """
+
+    description_html = models.TextField(blank=True, editable=False)
+    description_hash = models.CharField(
+        max_length=40, blank=True, editable=False)
+    markdown_version = models.PositiveSmallIntegerField(
+        default=0, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        rendered = rendering.refresh(self)
+        update_fields = kwargs.get('update_fields')
+        if rendered and update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {
+                'description_html', 'description_hash', 'markdown_version'}
+        super().save(*args, **kwargs)
+
+    def get_description_as_markdown(self):
+        """将文本渲染为 Markdown 格式
+
+        优先返回已保存的 HTML ,若已过期则在内存中重新渲染
+        """
+        rendering.refresh(self)
+        return self.description_html
+
+
+class Question(RenderedDescriptionModel):
     """问题映射类
     """
 
@@ -14,12 +49,36 @@ class Question(models.Model):
     # 参数 auto_now_add 作用是自动添加该字段的值为当前时间
     create_date = models.DateTimeField(auto_now_add=True)
     update_date = models.DateTimeField(auto_now_add=True)
+    # 以下两个字段是冗余数据,在答案创建和删除时由 questions.signals 维护
+    # 可以使用 python manage.py reconcile_question_counters 修复
+    answer_count = models.PositiveIntegerField(default=0, editable=False)
+    # 最后活跃时间,即提问时间和最新答案的创建时间中较晚的那个
+    last_activity = models.DateTimeField(default=timezone.now, editable=False)
+    # 热度得分,计算方法见 questions.ranking 模块
+    # 问题创建和答案数变化时由 questions.signals 更新
+    # 可以使用 python manage.py rank_questions 重新计算
+    hot_score = models.FloatField(default=0, editable=False)
 
     class Meta:
         verbose_name = 'Question'
         verbose_name_plural = 'Questions'
         # 按照 update_date 字段的值降序排列
         ordering = ('-update_date',)
+        # 列表页游标分页使用的复合索引
+        indexes = [
+            models.Index(fields=['update_date', 'id'],
+                         name='question_update_date_id_idx'),
+            models.Index(fields=['last_activity', 'id'],
+                         name='question_activity_id_idx'),
+            # 热门问题和未回答问题列表,每页数据是一次索引范围扫描
+            models.Index(fields=['hot_score', 'id'],
+                         name='question_hot_score_id_idx'),
+            models.Index(fields=['answer_count', 'create_date', 'id'],
+                         name='question_unanswered_idx'),
+            # 管理后台按日期筛选(date_hierarchy)
+            models.Index(fields=['create_date'],
+                         name='question_create_date_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -34,15 +93,15 @@ class Question(models.Model):
     def get_answers_count(self):
         """获取问题的答案总数
         """
-        return Answer.objects.filter(question=self).count()
+        return self.answer_count
 
-    def get_description_as_markdown(self):
-        """将问题文本渲染为 Markdown 格式
-        """
-        return markdown.markdown(self.description, safe_mode='escape')
-    
-    
-class Answer(models.Model):
+    # 问题的保存与用户统计数据的更新在同一个事务中完成
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+
+class Answer(RenderedDescriptionModel):
     """答案映射类
     """
 
@@ -55,11 +114,77 @@ class Answer(models.Model):
         verbose_name = 'Answer'
         verbose_name_plural = 'Answers'
         ordering = ('create_date',)
+        # 详情页按问题查询答案并按创建时间排序,使用这个复合索引不需要额外排序
+        indexes = [
+            models.Index(fields=['question', 'create_date'],
+                         name='answer_question_date_idx'),
+            # 管理后台按日期筛选(date_hierarchy)
+            models.Index(fields=['create_date'],
+                         name='answer_create_date_idx'),
+        ]
 
+    # 答案没有标题,管理后台和日志中只显示开头的一部分
     def __str__(self):
-        return self.description
+        return Truncator(self.description).chars(50)
 
-    def get_description_as_markdown(self):
-        """将问题文本渲染为 Markdown 格式
-        """
-        return markdown.markdown(self.description, safe_mode='escape')
\ No newline at end of file
+    # 答案的保存和删除与问题表中冗余字段的更新在同一个事务中完成
+    # 更新操作由 questions.signals 模块中的信号接收函数执行
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            return super().delete(*args, **kwargs)
+
+
+class RelatedQuestion(models.Model):
+    """问题的相似问题,每个问题最多保存 settings.RELATED_QUESTIONS_COUNT 个
+
+    由 python manage.py build_related_questions 离线计算(见 questions.related)
+    问题被删除时相关的行一并删除
+    """
+
+    question = models.ForeignKey(
+        Question, on_delete=models.CASCADE, related_name='+')
+    related = models.ForeignKey(
+        Question, on_delete=models.CASCADE, related_name='+')
+    # 按相似度从高到低的名次,从 0 开始
+    rank = models.PositiveSmallIntegerField()
+    # TF-IDF 向量的余弦相似度
+    score = models.FloatField()
+
+    class Meta:
+        db_table = 'question_related'
+        ordering = ('question_id', 'rank')
+        # 详情页按问题查询并按名次排序,只需要扫描这个唯一索引
+        constraints = [
+            models.UniqueConstraint(fields=['question', 'rank'],
+                                    name='question_related_rank_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.question_id} -> {self.related_id}'
+
+
+class SimHashBand(models.Model):
+    """问题标题的 SimHash 指纹,按段保存,用于提问时查找重复的问题
+
+    每个问题 questions.duplicates.BANDS 行,key 是段号和这一段的值
+    指纹相近的问题至少有一段相同,按 key 的索引查找即可得到候选
+    每行都保存完整的指纹,计算距离时不需要再查询问题表
+    """
+
+    question = models.ForeignKey(
+        Question, on_delete=models.CASCADE, related_name='+')
+    key = models.PositiveIntegerField()
+    simhash = models.BigIntegerField()
+
+    class Meta:
+        db_table = 'question_simhash_band'
+        indexes = [
+            models.Index(fields=['key'], name='question_simhash_band_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.question_id}: {self.key}'
@@ -0,0 +1,246 @@
+import base64
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+# 缓存总数的有效期(秒),列表页展示的总数允许有这么长时间的误差
+COUNT_CACHE_TIMEOUT = getattr(settings, 'QUESTIONS_COUNT_CACHE_TIMEOUT', 300)
+
+
+class InvalidCursor(ValueError):
+    """游标参数无法解析时抛出的异常
+    """
+
+
+def cached_count(queryset, timeout=COUNT_CACHE_TIMEOUT):
+    """获取查询集的总数,结果按 SQL 语句缓存一段时间
+    """
+    sql = str(queryset.query).encode('utf-8')
+    key = 'count:' + hashlib.md5(sql).hexdigest()
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, timeout)
+    return count
+
+
+def estimate_count(queryset, timeout=COUNT_CACHE_TIMEOUT):
+    """估算查询集的总数
+
+    对于 MySQL 上的整表查询,直接读取 information_schema 中的统计值
+    其它情况退回到 cached_count ,同样不会每次请求都执行 COUNT(*)
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == 'mysql' and not queryset.query.where:
+        key = 'estimate:' + queryset.model._meta.db_table
+        count = cache.get(key)
+        if count is None:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT TABLE_ROWS FROM information_schema.TABLES '
+                    'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s',
+                    [queryset.model._meta.db_table])
+                row = cursor.fetchone()
+            count = int(row[0] or 0) if row else 0
+            cache.set(key, count, timeout)
+        return count
+    return cached_count(queryset, timeout)
+
+
+class CachedCountPaginator(Paginator):
+    """总数来自缓存的分页器,用于普通的 OFFSET 分页
+    """
+
+    @cached_property
+    def count(self):
+        return cached_count(self.object_list)
+
+    def validate_number(self, number):
+        """缓存的总数可能偏小,允许比缓存的页数多一页
+        """
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            number = int(number)
+            if 1 < number <= self.num_pages + 1:
+                return number
+            raise
+
+    def page(self, number):
+        """缓存的总数可能与实际值不同,最后一页不按总数截断
+
+        第一页以外的页面没有数据时(总数偏大或者多出的一页)按页码超出范围处理
+        """
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        object_list = list(self.object_list[bottom:top])
+        if not object_list and number > 1:
+            raise EmptyPage('That page contains no results')
+        return self._get_page(object_list, number, self)
+
+
+class EstimatedCountPaginator(CachedCountPaginator):
+    """总数为估算值的分页器,用于管理后台中数据量很大的表
+
+    管理后台在总数不超过一页时不分页,直接查询全部结果
+    估算值偏小时会读取整张表,所以估算值较小时改为有上限的精确计数
+    """
+
+    # 估算值小于这个数时执行 SELECT COUNT(*) FROM (... LIMIT n)
+    exact_below = 1000
+
+    @cached_property
+    def count(self):
+        count = estimate_count(self.object_list)
+        if count < self.exact_below:
+            count = self.object_list[:self.exact_below].count()
+        return count
+
+
+def encode_cursor(direction, values):
+    """将翻页方向和排序键的值编码为不透明的字符串
+    """
+    data = json.dumps([direction] + list(values), separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """encode_cursor 的逆操作,返回值为 (方向, 排序键的值列表)
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError):
+        raise InvalidCursor(token)
+    if (not isinstance(data, list) or len(data) < 2 or
+            data[0] not in ('next', 'prev')):
+        raise InvalidCursor(token)
+    return data[0], data[1:]
+
+
+class CursorPage:
+    """游标分页的一页数据
+
+    与 django.core.paginator.Page 不同,这里没有页码
+    只有指向下一页和上一页的游标
+    """
+
+    def __init__(self, object_list, paginator, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """基于排序键的游标分页器(keyset pagination)
+
+    参数 ordering 为排序字段,最后一个字段必须唯一(通常是 id)
+    每一页的查询条件都是 "排序键大于(或小于)上一页最后一行的排序键"
+    配合相同字段的复合索引,任意深度的翻页都只是一次索引范围扫描
+    """
+
+    def __init__(self, queryset, per_page, ordering=('-update_date', '-id')):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.fields = [name.lstrip('-') for name in self.ordering]
+
+    @cached_property
+    def count(self):
+        """估算的总数,仅用于展示
+        """
+        return estimate_count(self.queryset)
+
+    def _key_values(self, obj):
+        opts = self.queryset.model._meta
+        return [opts.get_field(name).value_to_string(obj)
+                for name in self.fields]
+
+    def _parse_values(self, values):
+        if len(values) != len(self.fields):
+            raise InvalidCursor(values)
+        opts = self.queryset.model._meta
+        try:
+            return [opts.get_field(name).to_python(value)
+                    for name, value in zip(self.fields, values)]
+        except Exception:
+            raise InvalidCursor(values)
+
+    def _after(self, values, reverse=False):
+        """构造 "排在 values 之后" 的查询条件
+
+        对于 (a, b) 两个降序字段,条件为 a < x OR (a = x AND b < y)
+        参数 reverse 为 True 时构造 "排在 values 之前" 的条件
+        """
+        condition = Q()
+        for i, name in enumerate(self.ordering):
+            field = name.lstrip('-')
+            descending = name.startswith('-') != reverse
+            lookup = f'{field}__{"lt" if descending else "gt"}'
+            term = Q(**{lookup: values[i]})
+            for previous, value in zip(self.fields[:i], values[:i]):
+                term &= Q(**{previous: value})
+            condition |= term
+        return condition
+
+    def page(self, cursor=None):
+        """获取游标对应的一页数据,cursor 为空表示第一页
+        """
+        if not cursor:
+            direction, values = 'next', None
+        else:
+            direction, raw = decode_cursor(cursor)
+            values = self._parse_values(raw)
+
+        if direction == 'next':
+            queryset = self.queryset.order_by(*self.ordering)
+            if values is not None:
+                queryset = queryset.filter(self._after(values))
+        else:
+            reversed_ordering = [
+                name[1:] if name.startswith('-') else '-' + name
+                for name in self.ordering]
+            queryset = self.queryset.order_by(*reversed_ordering).filter(
+                self._after(values, reverse=True))
+
+        # 多取一行用于判断是否还有更多数据
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == 'prev':
+            rows.reverse()
+
+        next_cursor = previous_cursor = None
+        if rows:
+            if direction == 'prev' or has_more:
+                next_cursor = encode_cursor(
+                    'next', self._key_values(rows[-1]))
+            if (direction == 'next' and values is not None) or (
+                    direction == 'prev' and has_more):
+                previous_cursor = encode_cursor(
+                    'prev', self._key_values(rows[0]))
+        return CursorPage(rows, self, next_cursor, previous_cursor)
@@ -0,0 +1,34 @@
+import math
+
+from django.conf import settings
+
+
+# 热度的半衰期(秒),热度每经过这么长时间减半
+HALF_LIFE = getattr(settings, 'QUESTIONS_HOT_HALF_LIFE', 86400)
+# 答案数每增加一倍,热度相当于提前了多少个半衰期发布
+ANSWER_WEIGHT = getattr(settings, 'QUESTIONS_HOT_ANSWER_WEIGHT', 1.0)
+
+
+# 热度按指数衰减:hot = (1 + 答案数) ^ ANSWER_WEIGHT * 2 ^ (-(当前时间 - 提问时间) / HALF_LIFE)
+# 取以 2 为底的对数后,当前时间对所有问题是同一个常数,不影响排序
+# 所以保存的得分为 ANSWER_WEIGHT * log2(1 + 答案数) + 提问时间 / HALF_LIFE
+# 得分不随时间变化,只在答案数变化时更新,不需要定时重算全部问题
+# 修改上面两个参数后执行 python manage.py rank_questions 重新计算
+def hot_score(answer_count, create_date):
+    """根据答案数和提问时间计算问题的热度得分
+    """
+    return (ANSWER_WEIGHT * math.log2(1 + answer_count) +
+            create_date.timestamp() / HALF_LIFE)
+
+
+def update_scores(question_ids):
+    """重新计算指定问题的热度得分,答案创建或删除后由信号接收函数调用
+    """
+    from .models import Question
+
+    rows = Question.objects.filter(pk__in=question_ids).values_list(
+        'pk', 'answer_count', 'create_date', 'hot_score')
+    for pk, answer_count, create_date, old in rows:
+        score = hot_score(answer_count, create_date)
+        if score != old:
+            Question.objects.filter(pk=pk).update(hot_score=score)
@@ -0,0 +1,330 @@
+import math
+import os
+from array import array
+from collections import Counter
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from search.inverted_index import analyze
+from . import caching
+from .bulk import chunked
+from .models import Question, RelatedQuestion
+
+
+# 每个问题保存的相似问题数
+TOP_K = getattr(settings, 'RELATED_QUESTIONS_COUNT', 5)
+# 向量化结果的保存路径,增量计算时读取
+MODEL_PATH = getattr(settings, 'RELATED_QUESTIONS_MODEL_PATH', None) or \
+    os.path.join(settings.BASE_DIR, 'var', 'related', 'model.npz')
+# 只出现在一个问题中的词无法产生相似问题,出现在超过 MAX_DF 比例的问题中的词
+# 区分度太低,倒排列表又很长,两者都不计入词表
+MIN_DF = 2
+MAX_DF = 0.2
+# 查找候选时每个问题只使用权重最高的若干个词,计算量与问题长度无关
+QUERY_TERMS = 20
+# 查找候选时跳过倒排列表长于这个数的词,每个问题的计算量有上限,与问题总数无关
+# 这些词出现在很多问题中,权重低,对得分的影响很小
+MAX_POSTINGS = 5000
+# 一批计算的内存上限:展开的倒排列表元素数
+BATCH_POSTINGS = 2000000
+# 读取问题时每批的行数
+READ_CHUNK = 2000
+
+
+def iter_questions(after=0):
+    """按主键顺序分批读取主键大于 after 的问题,返回 (主键, 词频)
+    """
+    last_pk = after
+    while True:
+        rows = list(Question.objects.filter(pk__gt=last_pk).order_by(
+            'pk').values_list('id', 'title', 'description')[:READ_CHUNK])
+        if not rows:
+            return
+        last_pk = rows[-1][0]
+        for pk, title, description in rows:
+            yield pk, analyze(title, description)[0]
+
+
+class Corpus:
+    """全部问题的 TF-IDF 向量,按行压缩的稀疏矩阵
+
+    第 i 行是主键为 ids[i] 的问题,非零元素的列号和权重分别保存在
+    indices[indptr[i]:indptr[i + 1]] 和 data[indptr[i]:indptr[i + 1]]
+    每行都做了 L2 归一化,两行的点积就是余弦相似度
+    postings 是按列压缩的同一个矩阵(即倒排索引),查找候选时使用
+    """
+
+    def __init__(self, terms, idf, ids, indptr, indices, data):
+        self.terms = terms
+        self.vocabulary = {term: i for i, term in enumerate(terms.tolist())}
+        self.idf = idf
+        self.ids = ids
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self._postings = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def build(cls):
+        """读取两遍问题表:第一遍统计文档频率,第二遍计算向量
+
+        内存中只保存词表和稀疏矩阵,不保存问题的原文
+        """
+        df = Counter()
+        count = 0
+        for pk, counts in iter_questions():
+            df.update(counts.keys())
+            count += 1
+        terms = sorted(term for term, n in df.items()
+                       if MIN_DF <= n <= max(MAX_DF * count, MIN_DF))
+        idf = np.array([math.log((1 + count) / (1 + df[term])) + 1
+                        for term in terms], dtype=np.float32)
+        corpus = cls(np.array(terms, dtype=str), idf,
+                     *empty_rows())
+        corpus.extend(iter_questions())
+        return corpus
+
+    @classmethod
+    def load(cls, path=None):
+        """读取保存的向量化结果,文件不存在时返回 None
+        """
+        path = path or MODEL_PATH
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as f:
+            return cls(f['terms'], f['idf'], f['ids'], f['indptr'],
+                       f['indices'], f['data'])
+
+    def save(self, path=None):
+        """先写入临时文件再替换,与搜索索引文件相同
+        """
+        path = path or MODEL_PATH
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp.npz'
+        np.savez(tmp_path, terms=self.terms, idf=self.idf, ids=self.ids,
+                 indptr=self.indptr, indices=self.indices, data=self.data)
+        os.replace(tmp_path, path)
+
+    def vectorize(self, counts):
+        """计算一个问题的 TF-IDF 向量,返回 (列号数组, 权重数组)
+
+        词频取对数,不在词表中的词被忽略
+        """
+        pairs = sorted(
+            (self.vocabulary[term], (1 + math.log(tf)) * self.idf[
+                self.vocabulary[term]])
+            for term, tf in counts.items() if term in self.vocabulary)
+        indices = np.array([i for i, _ in pairs], dtype=np.int32)
+        weights = np.array([w for _, w in pairs], dtype=np.float32)
+        norm = np.linalg.norm(weights)
+        if norm:
+            weights /= norm
+        return indices, weights
+
+    def extend(self, questions):
+        """追加新问题的向量,返回追加的行号范围
+
+        增量计算时沿用原来的词表和 IDF ,新出现的词要等到全量重建时才计入
+        """
+        start = len(self)
+        ids, lengths = array('q'), array('q')
+        indices, data = [self.indices], [self.data]
+        for pk, counts in questions:
+            columns, weights = self.vectorize(counts)
+            ids.append(pk)
+            lengths.append(len(columns))
+            indices.append(columns)
+            data.append(weights)
+        if not ids:
+            return range(start, start)
+        self.ids = np.concatenate([self.ids, np.frombuffer(ids, np.int64)])
+        self.indptr = np.concatenate([
+            self.indptr,
+            self.indptr[-1] + np.cumsum(np.frombuffer(lengths, np.int64))])
+        self.indices = np.concatenate(indices)
+        self.data = np.concatenate(data)
+        self._postings = None
+        return range(start, len(self))
+
+    @property
+    def postings(self):
+        """按列号排序非零元素得到倒排索引:(每列的起始位置, 行号, 权重)
+        """
+        if self._postings is None:
+            rows = np.repeat(np.arange(len(self), dtype=np.int64),
+                             np.diff(self.indptr))
+            order = np.argsort(self.indices, kind='stable')
+            starts = np.zeros(len(self.terms) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self.indices, minlength=len(self.terms)),
+                      out=starts[1:])
+            self._postings = (starts, rows[order], self.data[order])
+        return self._postings
+
+    def query_terms(self, row):
+        """一行中倒排列表不超过 MAX_POSTINGS 的词里权重最高的 QUERY_TERMS 个
+        """
+        start, end = self.indptr[row], self.indptr[row + 1]
+        columns, weights = self.indices[start:end], self.data[start:end]
+        starts = self.postings[0]
+        short = starts[columns + 1] - starts[columns] <= MAX_POSTINGS
+        columns, weights = columns[short], weights[short]
+        if len(columns) > QUERY_TERMS:
+            top = np.argpartition(weights, -QUERY_TERMS)[-QUERY_TERMS:]
+            columns, weights = columns[top], weights[top]
+        return columns, weights
+
+    def batches(self, rows):
+        """将行号分批,每批展开的倒排列表不超过 BATCH_POSTINGS 个元素
+        """
+        starts = self.postings[0]
+        batch, size = [], 0
+        for row in rows:
+            columns, weights = self.query_terms(row)
+            length = int((starts[columns + 1] - starts[columns]).sum())
+            if batch and size + length > BATCH_POSTINGS:
+                yield batch
+                batch, size = [], 0
+            batch.append((row, columns, weights))
+            size += length
+        if batch:
+            yield batch
+
+    def neighbors(self, batch, k):
+        """计算一批行的前 k 个相似行,返回 (行, 相似行, 得分) 三个数组
+
+        用倒排索引只累加至少有一个共同词的行
+        一批中所有行的倒排列表拼接为一个数组,(批内序号, 候选行) 编码为一个整数
+        用 np.unique 合并相同的候选并累加得分,计算量只与展开的倒排列表长度有关
+        与问题总数无关,最后按 (批内序号, 得分) 排序取每行的前 k 个
+        """
+        starts, posting_rows, posting_data = self.postings
+        n = len(self)
+        selves = np.array([row for row, columns, weights in batch])
+        owners = np.concatenate([
+            np.full(len(columns), i, dtype=np.int64)
+            for i, (row, columns, weights) in enumerate(batch)])
+        columns = np.concatenate([columns for row, columns, weights in batch])
+        weights = np.concatenate([weights for row, columns, weights in batch])
+        lengths = starts[columns + 1] - starts[columns]
+        # 每个查询词对应倒排列表中的一段,展开为下标数组
+        ends = np.cumsum(lengths)
+        offsets = np.arange(ends[-1] if len(ends) else 0, dtype=np.int64) + \
+            np.repeat(starts[columns] - ends + lengths, lengths)
+        keys, inverse = np.unique(
+            np.repeat(owners, lengths) * n + posting_rows[offsets],
+            return_inverse=True)
+        scores = np.bincount(
+            inverse, weights=posting_data[offsets] * np.repeat(weights, lengths),
+            minlength=len(keys))
+        owners, others = np.divmod(keys, n)
+        keep = (others != selves[owners]) & (scores > 0)
+        owners, others, scores = owners[keep], others[keep], scores[keep]
+        # keys 已按批内序号排序,同一行的候选是连续的一段
+        order = np.lexsort((-scores, owners))
+        owners, others, scores = owners[order], others[order], scores[order]
+        firsts = np.searchsorted(owners, np.arange(len(batch)))
+        top = np.arange(len(owners)) - firsts[owners] < k
+        return selves[owners[top]], others[top], scores[top]
+
+    def top_k(self, rows, k):
+        """计算多行的相似行,返回 {问题主键: [(得分, 相似问题主键), ...]}
+
+        每个问题最多 k 个,列表没有排序
+        """
+        result = {int(self.ids[row]): [] for row in rows}
+        for batch in self.batches(rows):
+            for row, other, score in zip(*self.neighbors(batch, k)):
+                result[int(self.ids[row])].append(
+                    (float(score), int(self.ids[other])))
+        return result
+
+
+def empty_rows():
+    return (np.zeros(0, dtype=np.int64), np.zeros(1, dtype=np.int64),
+            np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32))
+
+
+def store(neighbors, k=TOP_K):
+    """替换这些问题的相似问题,返回写入的行数
+
+    向量化结果中可能有已经删除的问题,写入前过滤掉
+    """
+    candidates = {pk for pairs in neighbors.values() for _, pk in pairs}
+    existing = set(Question.objects.filter(
+        pk__in=candidates | set(neighbors)).values_list('pk', flat=True))
+    links = []
+    for question_id, pairs in neighbors.items():
+        if question_id not in existing:
+            continue
+        pairs = [pair for pair in sorted(pairs, reverse=True)
+                 if pair[1] in existing][:k]
+        links.extend(
+            RelatedQuestion(question_id=question_id, related_id=pk, rank=rank,
+                            score=score)
+            for rank, (score, pk) in enumerate(pairs))
+    with transaction.atomic():
+        RelatedQuestion.objects.filter(question__in=list(neighbors)).delete()
+        RelatedQuestion.objects.bulk_create(links)
+    caching.bump_versions(
+        *[caching.question_version_key(pk) for pk in neighbors])
+    return len(links)
+
+
+def rebuild(path=None, k=TOP_K, batch_size=1000):
+    """重新计算全部问题的向量和相似问题,返回 (问题数, 写入的行数)
+
+    多取一倍的候选,过滤已删除的问题后仍然有 k 个
+    """
+    corpus = Corpus.build()
+    corpus.save(path)
+    written = 0
+    for rows in chunked(range(len(corpus)), batch_size):
+        written += store(corpus.top_k(rows, 2 * k), k)
+    return len(corpus), written
+
+
+def update(path=None, k=TOP_K, batch_size=1000):
+    """增量计算新问题的相似问题,返回 (新问题数, 写入的行数)
+
+    新问题是主键大于向量化结果中最大主键的问题,没有保存的结果时全量计算
+    余弦相似度是对称的,新问题的每个相似问题也可能把新问题排进自己的前 k 个
+    这些旧问题的列表与已保存的列表合并后重新写入
+    """
+    corpus = Corpus.load(path)
+    if corpus is None:
+        return rebuild(path, k, batch_size)
+    after = int(corpus.ids[-1]) if len(corpus) else 0
+    rows = corpus.extend(iter_questions(after))
+    if not rows:
+        return 0, 0
+    corpus.save(path)
+    written = 0
+    for chunk in chunked(rows, batch_size):
+        neighbors = corpus.top_k(chunk, 2 * k)
+        written += store(neighbors, k)
+        reverse = {}
+        for question_id, pairs in neighbors.items():
+            for score, pk in pairs:
+                reverse.setdefault(pk, []).append((score, question_id))
+        # 新问题之间的关系已经在上面写入
+        for pk in neighbors:
+            reverse.pop(pk, None)
+        saved = {}
+        for pk, score, related_id in RelatedQuestion.objects.filter(
+                question__in=list(reverse)).values_list(
+                    'question_id', 'score', 'related_id'):
+            saved.setdefault(pk, []).append((score, related_id))
+        changed = {}
+        for pk, pairs in reverse.items():
+            merged = sorted(saved.get(pk, []) + pairs, reverse=True)[:k]
+            # 新问题没有进入前 k 个时,不需要重写这个问题的列表
+            if any(pair in pairs for pair in merged):
+                changed[pk] = merged
+        if changed:
+            written += store(changed, k)
+    return len(rows), written
@@ -0,0 +1,55 @@
+import hashlib
+import threading
+
+import markdown
+
+from monitoring.metrics import measure
+
+
+# 渲染器版本号,修改下面的扩展列表或渲染参数后需要将其加 1
+# 然后执行 python manage.py rerender_markdown 批量刷新已保存的 HTML
+RENDERER_VERSION = 1
+
+# 传给 markdown.markdown 的扩展列表
+MARKDOWN_EXTENSIONS = []
+
+
+def content_hash(text):
+    """计算文本内容的哈希值,用于判断已渲染的 HTML 是否过期
+    """
+    return hashlib.sha1((text or '').encode('utf-8')).hexdigest()
+
+
+# 创建 Markdown 实例需要构建整套解析器,耗时比渲染一段短文本还长
+# 每个线程复用同一个实例,渲染前调用 reset 方法清除上一次的状态
+_local = threading.local()
+
+
+def get_renderer():
+    renderer = getattr(_local, 'renderer', None)
+    if renderer is None:
+        renderer = _local.renderer = markdown.Markdown(
+            extensions=MARKDOWN_EXTENSIONS, safe_mode='escape')
+    return renderer
+
+
+@measure('markdown')
+def render_markdown(text):
+    """将文本渲染为 Markdown 格式的 HTML
+    """
+    return get_renderer().reset().convert(text or '')
+
+
+def refresh(obj, force=False):
+    """重新渲染映射类实例的 description 字段并写入 description_html
+    
+    只修改实例属性,不保存到数据库,返回值表示是否发生了渲染
+    """
+    digest = content_hash(obj.description)
+    if (not force and obj.markdown_version == RENDERER_VERSION and
+            obj.description_hash == digest):
+        return False
+    obj.description_html = render_markdown(obj.description)
+    obj.description_hash = digest
+    obj.markdown_version = RENDERER_VERSION
+    return True
@@ -0,0 +1,179 @@
+import random
+import time
+from array import array
+from collections import Counter
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from authentication.models import User
+from user_profile.models import Profile, UserStats
+from . import caching, duplicates, rendering
+from .ranking import hot_score
+from .bulk import chunked, next_id, suspend_auto_now
+from .models import Question, Answer, SimHashBand
+
+
+WORDS = (
+    'django python model view template query index cache search answer '
+    'question user profile form field migration database table join count '
+    'page cursor signal middleware session login markdown render request '
+    'response server worker thread async test benchmark latency throughput '
+    'deploy docker nginx gunicorn mysql sqlite redis celery queue task email'
+).split()
+
+
+class Seeder:
+    """批量生成用户、个人简介、问题和答案
+
+    所有随机数都来自以 seed 初始化的 random.Random 实例
+    在空数据库上使用相同的参数会得到相同的数据,时间以执行时刻为基准
+    数据分批通过 bulk_create 写入,每批一个事务
+    bulk_create 不会发送信号,所以 Markdown 渲染结果、标题指纹、
+    问题的答案数和最后活跃时间在写入前直接计算好,
+    用户的提问数和回答数在内存中累计,最后批量写入
+    """
+
+    def __init__(self, users, questions, seed=0, alpha=1.2, max_answers=500,
+                 days=365, batch_size=2000, password='password',
+                 prefix='user', log=None):
+        self.rng = random.Random(seed)
+        self.users = users
+        self.questions = questions
+        self.alpha = alpha
+        self.max_answers = max_answers
+        self.days = days
+        self.batch_size = batch_size
+        self.password = password
+        self.prefix = prefix
+        self.log = log or (lambda message: None)
+        self.now = timezone.now()
+        self.question_counts = Counter()
+        self.answer_counts = Counter()
+
+    def sentence(self, low, high):
+        rng = self.rng
+        return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(low, high)))
+
+    def answer_count(self):
+        """帕累托分布:大多数问题只有几个答案,少数问题有很多答案
+        """
+        return min(int(self.rng.paretovariate(self.alpha)) - 1, self.max_answers)
+
+    def run(self):
+        started = time.perf_counter()
+        user_ids = self.seed_users()
+        question_ids, created, counts = self.seed_questions(user_ids)
+        answers = self.seed_answers(user_ids, question_ids, created, counts)
+        self.seed_stats(user_ids)
+        caching.bump_versions(caching.LIST_VERSION)
+        elapsed = time.perf_counter() - started
+        self.log(f'{len(user_ids)} users, {len(question_ids)} questions, '
+                 f'{answers} answers in {elapsed:.1f}s')
+        return user_ids, question_ids
+
+    def seed_users(self):
+        # 所有用户使用同一个预先计算的密码哈希,避免每个用户都执行一次哈希算法
+        password = make_password(self.password)
+        start = next_id(User)
+        ids = list(range(start, start + self.users))
+        for chunk in chunked(ids, self.batch_size):
+            with transaction.atomic():
+                User.objects.bulk_create([
+                    User(id=pk, username=f'{self.prefix}{pk}',
+                         email=f'{self.prefix}{pk}@example.com',
+                         password=password)
+                    for pk in chunk])
+                # 信号接收函数 create_user_profile 不会被触发,这里批量创建
+                Profile.objects.bulk_create(
+                    [Profile(user_id=pk) for pk in chunk])
+                UserStats.objects.bulk_create(
+                    [UserStats(user_id=pk) for pk in chunk])
+            self.log(f'users: {chunk[-1] - start + 1}/{self.users}')
+        return ids
+
+    def seed_questions(self, user_ids):
+        """返回 (问题主键列表, 提问时间戳数组, 每个问题的答案数数组)
+        """
+        start = next_id(Question)
+        ids = list(range(start, start + self.questions))
+        span = self.days * 86400
+        created = array('d')
+        counts = array('I')
+        with suspend_auto_now(Question, 'create_date', 'update_date'):
+            for chunk in chunked(ids, self.batch_size):
+                objects = []
+                for pk in chunk:
+                    offset = self.rng.uniform(0, span)
+                    create_date = self.now - timedelta(seconds=offset)
+                    count = self.answer_count()
+                    # 最新答案的时间在 seed_answers 中生成,这里先估算
+                    question = Question(
+                        id=pk, user_id=self.rng.choice(user_ids),
+                        title=self.sentence(4, 12).capitalize() + '?',
+                        description=self.sentence(20, 120),
+                        create_date=create_date, update_date=create_date,
+                        answer_count=count, last_activity=create_date,
+                        hot_score=hot_score(count, create_date))
+                    rendering.refresh(question)
+                    self.question_counts[question.user_id] += 1
+                    objects.append(question)
+                    created.append(offset)
+                    counts.append(count)
+                with transaction.atomic():
+                    Question.objects.bulk_create(objects)
+                    SimHashBand.objects.bulk_create(
+                        duplicates.build_bands(objects))
+                self.log(f'questions: {chunk[-1] - start + 1}/{self.questions}')
+        return ids, created, counts
+
+    def seed_answers(self, user_ids, question_ids, created, counts):
+        total = sum(counts)
+        pk = next_id(Answer)
+        written = 0
+        batch = []
+        activity = []
+        with suspend_auto_now(Answer, 'create_date'):
+            for question_id, offset, count in zip(question_ids, created, counts):
+                latest = offset
+                for _ in range(count):
+                    # 答案时间在提问时间和当前时间之间
+                    latest = self.rng.uniform(0, latest)
+                    answer = Answer(
+                        id=pk, user_id=self.rng.choice(user_ids),
+                        question_id=question_id,
+                        description=self.sentence(10, 80),
+                        create_date=self.now - timedelta(seconds=latest))
+                    rendering.refresh(answer)
+                    self.answer_counts[answer.user_id] += 1
+                    batch.append(answer)
+                    pk += 1
+                if count:
+                    activity.append(Question(
+                        id=question_id,
+                        last_activity=self.now - timedelta(seconds=latest)))
+                if len(batch) >= self.batch_size:
+                    written += self.flush_answers(batch, activity)
+                    batch, activity = [], []
+                    self.log(f'answers: {written}/{total}')
+            written += self.flush_answers(batch, activity)
+        return written
+
+    def seed_stats(self, user_ids):
+        """写入生成的用户的提问数和回答数
+        """
+        for chunk in chunked(user_ids, self.batch_size):
+            with transaction.atomic():
+                UserStats.objects.bulk_update([
+                    UserStats(user_id=pk,
+                              question_count=self.question_counts[pk],
+                              answer_count=self.answer_counts[pk])
+                    for pk in chunk], ['question_count', 'answer_count'])
+
+    def flush_answers(self, answers, activity):
+        with transaction.atomic():
+            Answer.objects.bulk_create(answers)
+            Question.objects.bulk_update(activity, ['last_activity'])
+        return len(answers)
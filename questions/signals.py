@@ -0,0 +1,142 @@
+import threading
+from collections import defaultdict
+
+from django.db.models import Case, Count, F, Max, OuterRef, Subquery, When
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.signals import post_save, post_delete, pre_delete
+
+from authentication.models import User
+from user_profile.models import UserStats
+from . import caching, duplicates, ranking
+from .models import Question, Answer
+
+
+# 新问题的最后活跃时间与提问时间一致,同时计算热度得分
+# create_date 由 auto_now_add 在写入数据库时生成,所以只能在保存之后更新
+def question_created(sender, instance, created, **kwargs):
+    if created:
+        instance.last_activity = instance.create_date
+        instance.hot_score = ranking.hot_score(
+            instance.answer_count, instance.create_date)
+        Question.objects.filter(pk=instance.pk).update(
+            last_activity=instance.last_activity, hot_score=instance.hot_score)
+
+
+# 删除问题时会级联删除它的全部答案,每个答案的 post_delete 都会触发下面的函数
+# 问题本身马上就要删除,这些答案不需要逐个更新问题和用户统计
+# pre_delete 中记录正在删除的问题及其答案作者的答案数,由 question_uncounted 一次扣减
+# 级联删除中答案的 post_delete 在问题的 post_delete 之前发送
+_local = threading.local()
+
+
+def deleting_questions():
+    """当前线程中正在删除的问题:主键 -> {答案作者的主键: 答案数}
+    """
+    if not hasattr(_local, 'questions'):
+        _local.questions = {}
+    return _local.questions
+
+
+def question_deleting(sender, instance, **kwargs):
+    deleting_questions()[instance.pk] = dict(
+        Answer.objects.filter(question_id=instance.pk).order_by().values(
+            'user_id').annotate(n=Count('pk')).values_list('user_id', 'n'))
+
+
+# 答案创建或删除后,更新问题的答案数和最后活跃时间
+# 使用 F 表达式在数据库中完成加减,并发写入时不会丢失更新
+def answer_created(sender, instance, created, **kwargs):
+    if created:
+        Question.objects.filter(pk=instance.question_id).update(
+            answer_count=F('answer_count') + 1,
+            last_activity=Greatest('last_activity', instance.create_date))
+        ranking.update_scores([instance.question_id])
+
+
+# 删除的可能是最新的答案,最后活跃时间按剩下的答案重新计算,没有答案时为提问时间
+# 与答案数在同一条 UPDATE 中完成
+def answer_deleted(sender, instance, **kwargs):
+    if instance.question_id in deleting_questions():
+        return
+    latest = Answer.objects.filter(question_id=OuterRef('pk')).order_by(
+        ).values('question_id').annotate(latest=Max('create_date')).values(
+            'latest')
+    Question.objects.filter(pk=instance.question_id).update(
+        answer_count=Case(
+            When(answer_count__gt=0, then=F('answer_count') - 1), default=0),
+        last_activity=Coalesce(Subquery(latest), F('create_date')))
+    ranking.update_scores([instance.question_id])
+
+
+# 问题和答案创建或删除后,更新作者的提问数和回答数
+def question_counted(sender, instance, created, **kwargs):
+    if created:
+        UserStats.objects.filter(pk=instance.user_id).update(
+            question_count=F('question_count') + 1)
+
+
+# 被级联删除的答案按答案数分组扣减,每组一条 UPDATE
+# 统计值小于要扣减的数时不更新,可以执行 rebuild_user_stats 修复
+def question_uncounted(sender, instance, **kwargs):
+    UserStats.objects.filter(pk=instance.user_id, question_count__gt=0).update(
+        question_count=F('question_count') - 1)
+    groups = defaultdict(list)
+    for user_id, n in deleting_questions().pop(instance.pk, {}).items():
+        groups[n].append(user_id)
+    for n, user_ids in groups.items():
+        UserStats.objects.filter(pk__in=user_ids, answer_count__gte=n).update(
+            answer_count=F('answer_count') - n)
+
+
+def answer_counted(sender, instance, created, **kwargs):
+    if created:
+        UserStats.objects.filter(pk=instance.user_id).update(
+            answer_count=F('answer_count') + 1)
+
+
+def answer_uncounted(sender, instance, **kwargs):
+    if instance.question_id in deleting_questions():
+        return
+    UserStats.objects.filter(pk=instance.user_id, answer_count__gt=0).update(
+        answer_count=F('answer_count') - 1)
+
+
+# 问题创建或标题修改后,更新查找重复问题使用的指纹
+def question_fingerprinted(sender, instance, created, update_fields=None,
+                           **kwargs):
+    if update_fields is None or 'title' in update_fields:
+        duplicates.index(instance)
+
+
+# 问题、答案或用户名变化后,使受影响的页面片段缓存失效
+def invalidate_question(sender, instance, **kwargs):
+    caching.question_changed(instance.pk)
+
+
+def invalidate_answer(sender, instance, **kwargs):
+    # 级联删除时由问题的 post_delete 使缓存失效
+    if instance.question_id not in deleting_questions():
+        caching.question_changed(instance.question_id)
+
+
+# 片段中只显示作者的用户名,不显示个人简介
+# 登录时只更新 last_login ,不需要使片段失效
+def invalidate_user(sender, instance, created, update_fields=None, **kwargs):
+    if not created and (update_fields is None or 'username' in update_fields):
+        caching.user_changed(instance.pk)
+
+
+post_save.connect(question_created, sender=Question)
+pre_delete.connect(question_deleting, sender=Question)
+post_save.connect(answer_created, sender=Answer)
+post_delete.connect(answer_deleted, sender=Answer)
+post_save.connect(question_counted, sender=Question)
+post_delete.connect(question_uncounted, sender=Question)
+post_save.connect(answer_counted, sender=Answer)
+post_delete.connect(answer_uncounted, sender=Answer)
+post_save.connect(question_fingerprinted, sender=Question)
+post_save.connect(invalidate_question, sender=Question)
+post_delete.connect(invalidate_question, sender=Question)
+post_save.connect(invalidate_answer, sender=Answer)
+post_delete.connect(invalidate_answer, sender=Answer)
+post_save.connect(invalidate_user, sender=User)
@@ -0,0 +1,36 @@
+from django import template
+
+
+register = template.Library()
+
+
+class CacheFragmentNode(template.Node):
+
+    def __init__(self, nodelist, fragment):
+        self.nodelist = nodelist
+        self.fragment = fragment
+
+    def render(self, context):
+        fragment = self.fragment.resolve(context)
+        if fragment is None:
+            return self.nodelist.render(context)
+        if not fragment.hit:
+            fragment.store(self.nodelist.render(context))
+        return fragment.html
+
+
+@register.tag
+def cachefragment(parser, token):
+    """缓存模板片段
+
+    用法:{% cachefragment fragment %} ... {% endcachefragment %}
+    参数 fragment 是视图类通过 questions.caching.lookup 得到的 Fragment 实例
+    命中时直接输出缓存的内容,否则渲染标签内的内容并写入缓存
+    """
+    bits = token.split_contents()
+    if len(bits) != 2:
+        raise template.TemplateSyntaxError(
+            f"'{bits[0]}' tag requires exactly one argument.")
+    nodelist = parser.parse(('endcachefragment',))
+    parser.delete_first_token()
+    return CacheFragmentNode(nodelist, parser.compile_filter(bits[1]))
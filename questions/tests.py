@@ -1,3 +1,924 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.core.paginator import EmptyPage
+from django.db import connection
+from django.test import (
+    AsyncClient, TestCase, TransactionTestCase, override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from authentication.models import User
+from monitoring.explain import QueryPlanAssertions
+from search.backends import get_backend
+from search.query import parse_query
+from user_profile.models import Profile, UserStats
+from . import caching, duplicates, ranking, related
+from .management.commands.rank_questions import rank
+from user_profile.management.commands.rebuild_user_stats import (
+    rebuild as rebuild_user_stats)
+from .management.commands.reconcile_question_counters import reconcile
+from .models import Question, Answer, RelatedQuestion, SimHashBand
+from .pagination import CachedCountPaginator, CursorPaginator
+from .views import ANSWERS_PER_PAGE, related_questions
+
+
+# 测试中使用快速的哈希算法创建大量用户
+@override_settings(PASSWORD_HASHERS=[
+    'django.contrib.auth.hashers.MD5PasswordHasher'])
+class QuestionDetailQueryTest(TestCase):
+    """问题详情页的查询次数不随答案数量增长
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        asker = User.objects.create_user('asker', 'asker@example.com', 'pw')
+        cls.question = Question.objects.create(
+            user=asker, title='Title', description='Description')
+        for i in range(200):
+            user = User.objects.create_user(
+                f'user{i}', f'user{i}@example.com', 'pw')
+            Answer.objects.create(
+                user=user, question=cls.question, description=f'Answer {i}')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_query_count_is_fixed(self):
+        url = reverse('questions:question_detail', args=[self.question.pk])
+        # 一次查询问题及提问者,一次查询第一批答案及答案作者,一次查询相似问题
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['answers']), ANSWERS_PER_PAGE)
+        self.assertEqual(response.context['answers_remaining'],
+                         200 - ANSWERS_PER_PAGE)
+        self.assertContains(response, 'user0\n')
+        self.assertNotContains(response, 'user199')
+        self.assertContains(response, 'load-more-answers')
+
+    def test_answer_batches(self):
+        url = reverse('questions:answers_batch', args=[self.question.pk])
+        cursor = self.client.get(reverse(
+            'questions:question_detail', args=[self.question.pk])
+        ).context['answers_cursor']
+        seen = ANSWERS_PER_PAGE
+        while cursor:
+            with self.assertNumQueries(1):
+                data = self.client.get(url, {'cursor': cursor}).json()
+            seen += data['html'].count('answer-id=')
+            cursor = data['next']
+        self.assertEqual(seen, 200)
+        self.assertIn('user199', data['html'])
+
+        # 不带游标时返回第一批,可以直接获取 HTML ;第二次请求命中缓存
+        response = self.client.get(url, {'format': 'html'})
+        self.assertContains(response, 'user0\n')
+        self.assertTrue(response['X-Next-Cursor'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).json()['next'],
+                             response['X-Next-Cursor'])
+        self.assertEqual(
+            self.client.get(url, {'cursor': 'bad'}).status_code, 404)
+
+    def test_missing_question_returns_404(self):
+        url = reverse('questions:question_detail', args=[0])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(PASSWORD_HASHERS=[
+    'django.contrib.auth.hashers.MD5PasswordHasher'])
+class CachedCountPaginatorTest(TestCase):
+    """缓存的总数过期时的页码范围
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            'asker', 'asker@example.com', 'pw')
+        self.create(3)
+
+    def create(self, n):
+        for i in range(n):
+            Question.objects.create(
+                user=self.user, title=f'Question {i}', description='Description')
+
+    def paginator(self):
+        return CachedCountPaginator(Question.objects.order_by('pk'), 2)
+
+    def test_new_rows_reach_extra_page(self):
+        self.assertEqual(self.paginator().num_pages, 2)
+        self.create(2)
+        # 缓存的总数仍为 3 ,第三页是实际存在的最后一页
+        paginator = self.paginator()
+        self.assertEqual(paginator.count, 3)
+        self.assertEqual(len(paginator.page(3).object_list), 1)
+        with self.assertRaises(EmptyPage):
+            paginator.page(4)
+
+    def test_deleted_rows_leave_no_empty_page(self):
+        self.assertEqual(self.paginator().num_pages, 2)
+        Question.objects.order_by('-pk')[0].delete()
+        with self.assertRaises(EmptyPage):
+            self.paginator().page(2)
+        self.assertEqual(len(self.paginator().page(1).object_list), 2)
+
+
+@override_settings(PASSWORD_HASHERS=[
+    'django.contrib.auth.hashers.MD5PasswordHasher'])
+class QuestionListCursorTest(TestCase):
+    """问题列表页的游标分页
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user('asker', 'asker@example.com', 'pw')
+        cls.questions = [
+            Question.objects.create(
+                user=user, title=f'Question {i}', description='Description')
+            for i in range(25)]
+
+    def get_page(self, cursor=''):
+        response = self.client.get(
+            reverse('questions:questions_list'), {'cursor': cursor})
+        self.assertEqual(response.status_code, 200)
+        return response.context['page_obj']
+
+    def test_walks_all_pages_forward_and_back(self):
+        seen = []
+        page = self.get_page()
+        self.assertFalse(page.has_previous())
+        pages = [page]
+        while True:
+            seen.extend(q.pk for q in page)
+            if not page.has_next():
+                break
+            page = self.get_page(page.next_cursor)
+            pages.append(page)
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(seen, sorted(q.pk for q in self.questions))
+
+        previous = self.get_page(pages[-1].previous_cursor)
+        self.assertEqual([q.pk for q in previous],
+                         [q.pk for q in pages[1]])
+        self.assertTrue(previous.has_next())
+
+    def test_invalid_cursor_returns_404(self):
+        response = self.client.get(
+            reverse('questions:questions_list'), {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(PASSWORD_HASHERS=[
+    'django.contrib.auth.hashers.MD5PasswordHasher'])
+class QuestionCountersTest(TestCase):
+    """问题的冗余字段 answer_count 和 last_activity
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('asker', 'asker@example.com', 'pw')
+
+    def test_counters_follow_answers(self):
+        question = Question.objects.create(
+            user=self.user, title='Title', description='Description')
+        self.assertEqual(question.last_activity, question.create_date)
+        answers = [
+            Answer.objects.create(
+                user=self.user, question=question, description='Answer')
+            for _ in range(3)]
+        question.refresh_from_db()
+        self.assertEqual(question.answer_count, 3)
+        self.assertEqual(question.last_activity, answers[-1].create_date)
+
+        answers[0].delete()
+        Answer.objects.filter(pk=answers[1].pk).delete()
+        question.refresh_from_db()
+        self.assertEqual(question.get_answers_count(), 1)
+        self.assertEqual(question.last_activity, answers[-1].create_date)
+
+        # 删除最新的答案后,最后活跃时间回到剩下的答案或提问时间
+        Answer.objects.create(
+            user=self.user, question=question, description='Answer').delete()
+        question.refresh_from_db()
+        self.assertEqual(question.last_activity, answers[-1].create_date)
+        answers[-1].delete()
+        question.refresh_from_db()
+        self.assertEqual(question.answer_count, 0)
+        self.assertEqual(question.last_activity, question.create_date)
+
+    def test_question_delete_skips_per_answer_updates(self):
+        other = User.objects.create_user('other', 'other@example.com', 'pw')
+        question = Question.objects.create(
+            user=self.user, title='Title', description='Description')
+        for user in (self.user, other, other, other):
+            Answer.objects.create(
+                user=user, question=question, description='Answer')
+        with CaptureQueriesContext(connection) as queries:
+            question.delete()
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE')]
+        # 不再逐个答案更新问题;用户统计按答案数分组,共三条 UPDATE
+        self.assertFalse([sql for sql in updates if 'questions_question' in sql])
+        self.assertEqual(
+            len([sql for sql in updates if 'user_stats' in sql]), 3)
+        self.assertEqual(
+            [(s.question_count, s.answer_count) for s in
+             UserStats.objects.filter(user__in=[self.user, other])
+             .order_by('user_id')],
+            [(0, 0), (0, 0)])
+
+    def test_reconcile_repairs_drift(self):
+        question = Question.objects.create(
+            user=self.user, title='Title', description='Description')
+        answer = Answer.objects.create(
+            user=self.user, question=question, description='Answer')
+        Question.objects.filter(pk=question.pk).update(
+            answer_count=7, last_activity=question.create_date)
+        out = StringIO()
+        call_command('reconcile_question_counters', stdout=out)
+        self.assertIn('1 questions repaired', out.getvalue())
+        question.refresh_from_db()
+        self.assertEqual(question.answer_count, 1)
+        self.assertEqual(question.last_activity, answer.create_date)
+
+    def test_list_sorted_by_activity(self):
+        first = Question.objects.create(
+            user=self.user, title='First', description='Description')
+        second = Question.objects.create(
+            user=self.user, title='Second', description='Description')
+        Answer.objects.create(
+            user=self.user, question=first, description='Answer')
+        response = self.client.get(
+            reverse('questions:questions_list'), {'sort': 'activity'})
+        self.assertEqual(list(response.context['questions']), [first, second])
+
+
+@override_settings(PASSWORD_HASHERS=[
+    'django.contrib.auth.hashers.MD5PasswordHasher'])
+class FragmentCacheTest(TestCase):
+    """问题页面的片段缓存及其失效
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('asker', 'asker@example.com', 'pw')
+        cls.question = Question.objects.create(
+            user=cls.user, title='Title', description='Description')
+        cls.other = Question.objects.create(
+            user=cls.user, title='Other', description='Description')
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('questions:question_detail', args=[self.question.pk])
+
+    def test_detail_hit_runs_no_queries(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertContains(response, 'Title')
+
+    def test_answer_invalidates_only_its_question(self):
+        other_url = reverse('questions:question_detail', args=[self.other.pk])
+        self.client.get(self.url)
+        self.client.get(other_url)
+        Answer.objects.create(
+            user=self.user, question=self.question, description='New answer')
+        self.assertContains(self.client.get(self.url), 'New answer')
+        with self.assertNumQueries(0):
+            self.client.get(other_url)
+
+    def test_username_change_invalidates_participated_questions(self):
+        self.client.get(self.url)
+        # 片段中不显示个人简介,修改后仍然使用缓存
+        self.user.profile.job = 'Engineer'
+        self.user.profile.save()
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+        user = User.objects.get(pk=self.user.pk)
+        user.username = 'renamed'
+        user.save()
+        # 问题、第一批答案和相似问题
+        with self.assertNumQueries(3):
+            self.assertContains(self.client.get(self.url), 'renamed')
+
+    def test_list_invalidated_by_new_question(self):
+        url = reverse('questions:questions_list')
+        self.client.get(url)
+        Question.objects.create(
+            user=self.user, title='Brand new', description='Description')
+        self.assertContains(self.client.get(url), 'Brand new')
+
+    def test_stats(self):
+        self.client.get(self.url)
+        self.client.get(self.url)
+        snapshot = caching.stats.snapshot()
+        self.assertGreaterEqual(snapshot['hits'], 1)
+        self.assertGreaterEqual(snapshot['misses'], 1)
+
+
+@override_settings(PASSWORD_HASHERS=[
+    'django.contrib.auth.hashers.MD5PasswordHasher'])
+class QuestionRankingTest(TestCase):
+    """热门、活跃和未回答问题列表
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('asker', 'asker@example.com', 'pw')
+        cls.old, cls.new, cls.quiet = [
+            Question.objects.create(
+                user=cls.user, title=title, description='Description')
+            for title in ('Old', 'New', 'Quiet')]
+        # Old 比 New 早两天提问,但答案数多出很多
+        Question.objects.filter(pk=cls.old.pk).update(
+            create_date=cls.old.create_date - timedelta(days=2))
+
+    def setUp(self):
+        cache.clear()
+
+    def titles(self, **params):
+        response = self.client.get(reverse('questions:questions_list'), params)
+        self.assertEqual(response.status_code, 200)
+        return [q.title for q in response.context['questions']]
+
+    def answer(self, question, count):
+        for i in range(count):
+            Answer.objects.create(
+                user=self.user, question=question, description=f'Answer {i}')
+
+    def test_scores_follow_answers_and_age(self):
+        call_command('rank_questions', stdout=StringIO())
+        self.answer(self.new, 1)
+        self.assertEqual(self.titles(sort='hot')[0], 'New')
+        # 答案数每增加一倍,相当于晚一个半衰期提问
+        self.answer(self.old, 15)
+        self.assertEqual(self.titles(sort='hot')[0], 'Old')
+        self.assertEqual(
+            Question.objects.get(pk=self.old.pk).hot_score,
+            ranking.hot_score(15, Question.objects.get(pk=self.old.pk).create_date))
+        self.assertEqual(rank(), 0)
+
+    def test_unanswered_feed(self):
+        self.answer(self.new, 1)
+        self.assertEqual(self.titles(sort='unanswered'), ['Quiet', 'Old'])
+        self.assertEqual(
+            self.titles(sort='unanswered', cursor=''), ['Quiet', 'Old'])
+
+    def test_hot_feed_with_cursor(self):
+        self.answer(self.quiet, 2)
+        self.assertEqual(
+            self.titles(sort='hot', cursor=''), self.titles(sort='hot'))
+
+
+class QueryPlanTest(QueryPlanAssertions, TestCase):
+    """热点查询使用索引,不需要全表扫描和额外排序
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user('asker', 'asker@example.com', 'pw')
+        cls.question = Question.objects.create(
+            user=user, title='Title', description='Description')
+
+    def test_answers_of_question(self):
+        self.assertUsesIndex(
+            Answer.objects.filter(question_id=self.question.pk),
+            'answer_question_date_idx')
+
+    def test_question_feeds(self):
+        feeds = {
+            'update_date': 'question_update_date_id_idx',
+            '-update_date': 'question_update_date_id_idx',
+            '-hot_score': 'question_hot_score_id_idx',
+            '-last_activity': 'question_activity_id_idx',
+        }
+        for field, index in feeds.items():
+            with self.subTest(field=field):
+                prefix = '-' if field.startswith('-') else ''
+                self.assertUsesIndex(
+                    Question.objects.order_by(field, prefix + 'id')[:10],
+                    index)
+        self.assertUsesIndex(
+            Question.objects.filter(answer_count=0).order_by(
+                '-create_date', '-id')[:10],
+            'question_unanswered_idx')
+
+    def test_cursor_page(self):
+        # 游标分页的查询条件:hot_score < x OR (hot_score = x AND id < y)
+        paginator = CursorPaginator(
+            Question.objects.all(), 10, ordering=('-hot_score', '-id'))
+        queryset = Question.objects.filter(
+            paginator._after([1.0, 1])).order_by('-hot_score', '-id')[:11]
+        self.assertUsesIndex(queryset, 'question_hot_score_id_idx')
+
+
+class ExportTest(TestCase):
+    """问题和答案的流式导出
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('asker', 'asker@example.com', 'pw')
+        cls.questions = [
+            Question.objects.create(
+                user=cls.user, title=f'Title {i}', description='a,"b"\nc')
+            for i in range(5)]
+        # 第一个问题改为较早的日期,用于测试日期过滤
+        Question.objects.filter(pk=cls.questions[0].pk).update(
+            create_date=timezone.now() - timedelta(days=30))
+        Answer.objects.create(
+            user=cls.user, question=cls.questions[1], description='Answer')
+
+    def export(self, *args, **options):
+        out = StringIO()
+        call_command('export_qa', *args, stdout=out, **options)
+        return out.getvalue()
+
+    def test_csv(self):
+        since = (timezone.now() - timedelta(days=1)).date().isoformat()
+        rows = list(csv.reader(StringIO(
+            self.export('questions', since=since, chunk_size=2))))
+        self.assertEqual(rows[0][:4], ['id', 'user_id', 'user_username', 'title'])
+        self.assertEqual(
+            [int(row[0]) for row in rows[1:]],
+            [q.pk for q in self.questions[1:]])
+        self.assertEqual(rows[1][4], 'a,"b"\nc')
+
+    def test_jsonl(self):
+        lines = self.export('answers', format='jsonl').splitlines()
+        self.assertEqual(len(lines), 1)
+        row = json.loads(lines[0])
+        self.assertEqual(row['question_id'], self.questions[1].pk)
+        self.assertEqual(row['user_username'], 'asker')
+
+    def test_invalid_date(self):
+        with self.assertRaises(CommandError):
+            self.export('questions', until='yesterday')
+
+    def test_endpoint_requires_staff(self):
+        url = reverse('questions:export')
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        staff = User.objects.get(pk=self.user.pk)
+        staff.is_staff = True
+        staff.save()
+        response = self.client.get(url, {'type': 'answers', 'format': 'jsonl'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(
+            response['Content-Disposition'],
+            'attachment; filename="answers.jsonl"')
+        content = b''.join(response.streaming_content).decode()
+        self.assertEqual(len(content.splitlines()), 1)
+        self.assertEqual(
+            self.client.get(url, {'format': 'xml'}).status_code, 400)
+        self.assertEqual(
+            self.client.get(url, {'since': '2021-13-01'}).status_code, 400)
+
+
+@override_settings(PASSWORD_HASHERS=[
+    'django.contrib.auth.hashers.MD5PasswordHasher'])
+class ImportTest(TestCase):
+    """从 JSONL 文件批量导入
+    """
+
+    def import_records(self, records, **options):
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl') as f:
+            for record in records:
+                f.write(json.dumps(record) + '\n')
+            f.flush()
+            out = StringIO()
+            options.setdefault('no_index', True)
+            call_command('import_qa', f.name, batch_size=2,
+                         stdout=out, stderr=out, **options)
+        return out.getvalue()
+
+    def test_import(self):
+        existing = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        out = self.import_records([
+            {'type': 'user', 'username': 'carol', 'email': 'alice@example.com'},
+            {'type': 'question', 'id': 'q1', 'user': 'alice', 'title': 'Old',
+             'description': '*old*', 'create_date': '2019-05-01T08:00:00Z'},
+            {'type': 'answer', 'question': 'q1', 'user': 'bob',
+             'description': 'First', 'create_date': '2019-05-02T09:00:00Z'},
+            {'type': 'answer', 'question': 'q1', 'user': 'carol',
+             'description': 'Second', 'create_date': '2019-05-03T09:00:00Z'},
+            {'type': 'answer', 'question': 'missing', 'user': 'bob',
+             'description': 'Orphan'},
+        ])
+        self.assertIn('Imported 2 new users, 1 questions and 2 answers', out)
+        self.assertIn('1 answers skipped', out)
+
+        question = Question.objects.get()
+        self.assertEqual(question.user, existing)
+        self.assertEqual(question.create_date.isoformat(),
+                         '2019-05-01T08:00:00+00:00')
+        self.assertIn('<em>old</em>', question.description_html)
+        # 冗余数据在导入完成后统一计算
+        self.assertEqual(question.answer_count, 2)
+        self.assertEqual(question.last_activity.isoformat(),
+                         '2019-05-03T09:00:00+00:00')
+        self.assertEqual(question.hot_score, ranking.hot_score(
+            2, question.create_date))
+
+        carol = User.objects.get(username='carol')
+        # 邮箱已被其他用户使用,新用户使用占位邮箱且没有可用的密码
+        self.assertEqual(carol.email, 'carol@users.invalid')
+        self.assertFalse(carol.has_usable_password())
+        self.assertTrue(Profile.objects.filter(user=carol).exists())
+        self.assertEqual(carol.stats.answer_count, 1)
+        self.assertEqual(
+            UserStats.objects.get(user=existing).question_count, 1)
+
+    def test_import_touches_only_new_rows(self):
+        user = User.objects.create_user('dave', 'dave@example.com', 'pw')
+        old = Question.objects.create(
+            user=user, title='Old', description='Description')
+        # 已有问题的冗余字段不在导入时修复
+        Question.objects.filter(pk=old.pk).update(answer_count=7)
+        UserStats.objects.filter(user=user).update(question_count=9)
+        self.import_records([
+            {'type': 'question', 'id': 1, 'user': 'erin',
+             'title': 'Imported kumquat', 'description': 'Description'},
+            {'type': 'answer', 'question': 1, 'user': 'frank',
+             'description': 'Answer'},
+        ], no_index=False)
+        old.refresh_from_db()
+        self.assertEqual(old.answer_count, 7)
+        self.assertEqual(UserStats.objects.get(user=user).question_count, 9)
+        question = Question.objects.get(title='Imported kumquat')
+        self.assertEqual(question.answer_count, 1)
+        self.assertEqual(
+            User.objects.get(username='frank').stats.answer_count, 1)
+        # 导入的问题逐条写入搜索索引
+        self.assertEqual(
+            get_backend().search_ids(parse_query('kumquat'), 0, 10),
+            ([question.pk], 1))
+
+    def test_invalid_line(self):
+        with self.assertRaisesMessage(CommandError, 'Line 2'):
+            self.import_records([
+                {'type': 'question', 'user': 'alice', 'title': 'Title',
+                 'description': 'Description'},
+                {'type': 'question', 'user': 'alice', 'title': 'Title'},
+            ])
+
+    def test_invalid_values(self):
+        question = {'type': 'question', 'user': 'alice', 'title': 'Title',
+                    'description': 'Description'}
+        for record in (
+                {'type': 'user', 'username': 'carol', 'email': 5},
+                {'type': 'user', 'username': 'c' * 101},
+                dict(question, id={'x': 1}),
+                dict(question, title='t' * 256),
+                {'type': 'answer', 'question': [1], 'user': 'bob',
+                 'description': 'Answer'}):
+            with self.subTest(record=record):
+                with self.assertRaisesMessage(CommandError, 'Line 2'):
+                    self.import_records([question, record])
+                self.assertFalse(Question.objects.exists())
+
+    def test_invalid_line_writes_nothing(self):
+        # 错误出现在后面的批次中时,前面的批次也不会写入
+        records = [
+            {'type': 'question', 'id': n, 'user': 'alice', 'title': 'Title',
+             'description': 'Description'} for n in range(4)]
+        for value in ('2020-13-01T00:00:00', 20200101, 'yesterday'):
+            with self.subTest(value=value):
+                with self.assertRaisesMessage(CommandError, 'Line 5'):
+                    self.import_records(records + [
+                        {'type': 'answer', 'question': 0, 'user': 'bob',
+                         'description': 'Answer', 'create_date': value}])
+                self.assertFalse(Question.objects.exists())
+                self.assertFalse(User.objects.exists())
+
+
+@override_settings(PASSWORD_HASHERS=[
+    'django.contrib.auth.hashers.MD5PasswordHasher'])
+class AdminTest(TestCase):
+    """管理后台的列表页
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'pw')
+        cls.user = User.objects.create_user('asker', 'asker@example.com', 'pw')
+        cls.match = Question.objects.create(
+            user=cls.user, title='Django migrations', description='Squash?')
+        cls.other = Question.objects.create(
+            user=cls.admin, title='Flask routing', description='Blueprints')
+        for question in (cls.match, cls.other):
+            Answer.objects.create(
+                user=cls.user, question=question, description='x' * 500)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def changelist(self, model, **params):
+        return self.client.get(
+            reverse(f'admin:questions_{model}_changelist'), params)
+
+    def test_query_count_is_fixed(self):
+        # 会话、估算的总数(已缓存)、有上限的精确计数、
+        # 当前页(用户和问题通过 JOIN 一起查询)、date_hierarchy 的两次查询
+        # 当前登录的用户来自缓存
+        for model in ('question', 'answer'):
+            self.changelist(model)
+            with self.subTest(model=model), self.assertNumQueries(5):
+                response = self.changelist(model)
+            self.assertEqual(len(response.context['cl'].result_list), 2)
+        self.assertNotContains(response, 'x' * 100)
+
+    def test_search_uses_backend(self):
+        response = self.changelist('question', q='django')
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.match])
+        response = self.changelist('answer', q='django')
+        self.assertEqual(
+            [a.question_id for a in response.context['cl'].result_list],
+            [self.match.pk])
+        response = self.changelist('question', q=str(self.other.pk))
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.other])
+
+    def test_filters(self):
+        response = self.changelist('question', user__id__exact=self.user.pk)
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.match])
+        Answer.objects.filter(question=self.other).delete()
+        response = self.changelist('question', answered='no')
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.other])
+
+    def test_user_autocomplete(self):
+        response = self.client.get(
+            reverse('admin:authentication_user_autocomplete'), {'term': 'ask'})
+        self.assertEqual(
+            [r['text'] for r in response.json()['results']], ['asker'])
+
+
+class SeedCommandTest(TestCase):
+    """批量生成测试数据的 seed 命令
+    """
+
+    def seed(self):
+        call_command('seed', users=5, questions=20, seed=7, no_index=True,
+                     stdout=StringIO())
+        return list(Question.objects.order_by('pk').values_list(
+            'title', 'answer_count'))
+
+    def test_seed_is_deterministic_and_consistent(self):
+        first = self.seed()
+        self.assertEqual(User.objects.count(), 5)
+        self.assertEqual(Profile.objects.count(), 5)
+        self.assertEqual(Answer.objects.count(), sum(n for _, n in first))
+        self.assertEqual(reconcile(), 0)
+        self.assertEqual(rebuild_user_stats(), 0)
+        self.assertEqual(rank(), 0)
+
+        Question.objects.all().delete()
+        User.objects.all().delete()
+        self.assertEqual(self.seed(), first)
+
+
+# 异步视图的并发查询使用其它线程的数据库连接,测试数据需要提交后才能读到
+@override_settings(
+    ROOT_URLCONF='community.urls_asgi',
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AsyncViewsTest(TransactionTestCase):
+    """ASGI 部署使用的异步视图
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.client = AsyncClient()
+        user = User.objects.create_user('asker', 'asker@example.com', 'pw')
+        self.question = Question.objects.create(
+            user=user, title='Async title', description='Description')
+        for i in range(3):
+            Answer.objects.create(
+                user=user, question=self.question, description=f'Answer {i}')
+
+    async def test_question_detail(self):
+        url = reverse('questions:question_detail', args=[self.question.pk])
+        response = await self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['question'], self.question)
+        self.assertEqual(len(response.context['answers']), 3)
+        self.assertContains(response, 'Async title')
+
+        # 第二次请求命中片段缓存,页面内容相同
+        cached = await self.client.get(url)
+        self.assertNotIn('question', cached.context)
+        self.assertContains(cached, 'Answer 2')
+
+    async def test_missing_question_returns_404(self):
+        url = reverse('questions:question_detail', args=[0])
+        response = await self.client.get(url)
+        self.assertEqual(response.status_code, 404)
+
+    async def test_question_list(self):
+        response = await self.client.get(reverse('questions:questions_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Async title')
+
+    @override_settings(ASYNC_CONCURRENT_QUERIES=False)
+    async def test_sequential_queries(self):
+        url = reverse('questions:question_detail', args=[self.question.pk])
+        response = await self.client.get(url)
+        self.assertEqual(len(response.context['answers']), 3)
+
+
+@override_settings(PASSWORD_HASHERS=[
+    'django.contrib.auth.hashers.MD5PasswordHasher'])
+class RelatedQuestionsTest(TestCase):
+    """相似问题的全量计算、增量计算和详情页展示
+    """
+
+    topics = [
+        ('Python list comprehension', 'How to filter a list in python'),
+        ('Python dictionary comprehension', 'Build a dictionary in python'),
+        ('Python generator expression', 'Lazy comprehension in python'),
+        ('Bake sourdough bread', 'My sourdough starter is too sour'),
+        ('Sourdough bread crust', 'How to bake a crispy bread crust'),
+        ('Knead bread dough', 'How long to knead sourdough dough'),
+        ('Repair bicycle chain', 'The chain keeps slipping'),
+        ('Bicycle brake pads', 'Squeaky brake pads on my bicycle'),
+        ('Replace bicycle tyre', 'Flat tyre and chain grease'),
+        ('Learn the guitar', 'Which chords should I learn first'),
+        ('Guitar strings', 'How often should guitar strings be changed'),
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('asker', 'asker@example.com', 'pw')
+        cls.questions = [
+            Question.objects.create(
+                user=cls.user, title=title, description=description)
+            for title, description in cls.topics]
+
+    def setUp(self):
+        cache.clear()
+        # 测试数据只有十几个问题,放宽停用词的比例
+        patcher = mock.patch.object(related, 'MAX_DF', 0.5)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'model.npz')
+        # 管理命令使用默认路径,同样写入临时目录
+        patcher = mock.patch.object(related, 'MODEL_PATH', self.path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def related(self, question):
+        return [q.title for q in related_questions(question.pk)]
+
+    def test_rebuild(self):
+        self.assertEqual(related.rebuild(self.path, k=2)[0], len(self.topics))
+        self.assertEqual(
+            set(self.related(self.questions[0])),
+            {'Python dictionary comprehension', 'Python generator expression'})
+        self.assertEqual(self.related(self.questions[9])[0], 'Guitar strings')
+        scores = list(RelatedQuestion.objects.filter(
+            question=self.questions[3]).values_list('score', flat=True))
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_top_k_matches_dense_scores(self):
+        corpus = related.Corpus.build()
+        dense = np.zeros((len(corpus), len(corpus.terms)))
+        for row in range(len(corpus)):
+            start, end = corpus.indptr[row], corpus.indptr[row + 1]
+            dense[row, corpus.indices[start:end]] = corpus.data[start:end]
+        scores = dense @ dense.T
+        np.fill_diagonal(scores, 0)
+        result = corpus.top_k(range(len(corpus)), 3)
+        for row, pk in enumerate(corpus.ids):
+            expected = sorted(scores[row][scores[row] > 0], reverse=True)[:3]
+            self.assertEqual(
+                [round(score, 5) for score, _ in sorted(result[pk], reverse=True)],
+                [round(score, 5) for score in expected])
+        # 倒排列表过长的词不参与查找候选
+        with mock.patch.object(related, 'MAX_POSTINGS', 0):
+            self.assertFalse(any(corpus.top_k(range(len(corpus)), 3).values()))
+
+    def test_update_new_questions(self):
+        related.rebuild(self.path, k=2)
+        self.assertEqual(related.update(self.path, k=2), (0, 0))
+        question = Question.objects.create(
+            user=self.user, title='Guitar chords',
+            description='Learn guitar chords and strings')
+        count, written = related.update(self.path, k=2)
+        self.assertEqual(count, 1)
+        self.assertEqual(set(self.related(question)),
+                         {'Learn the guitar', 'Guitar strings'})
+        # 旧问题的列表中也出现了新问题
+        self.assertIn('Guitar chords', self.related(self.questions[10]))
+
+        # 被删除的问题不会写入
+        self.questions[9].delete()
+        Question.objects.create(
+            user=self.user, title='Guitar lessons',
+            description='Learn the guitar chords')
+        related.update(self.path, k=2)
+        self.assertFalse(RelatedQuestion.objects.filter(
+            related_id=self.questions[9].pk).exists())
+
+    def test_detail_page(self):
+        call_command('build_related_questions', '--full', stdout=StringIO())
+        url = reverse('questions:question_detail', args=[self.questions[6].pk])
+        response = self.client.get(url)
+        self.assertContains(response, 'Related questions')
+        self.assertContains(response, 'Bicycle brake pads')
+        self.assertNotContains(response, 'Guitar strings')
+
+
+@override_settings(PASSWORD_HASHERS=[
+    'django.contrib.auth.hashers.MD5PasswordHasher'])
+class DuplicateQuestionsTest(TestCase):
+    """提问时根据标题指纹查找重复的问题
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('asker', 'asker@example.com', 'pw')
+        cls.question = Question.objects.create(
+            user=cls.user, title='Sort a list of dictionaries by value',
+            description='Description')
+        Question.objects.create(
+            user=cls.user, title='Configure nginx as a reverse proxy',
+            description='Description')
+
+    def test_simhash(self):
+        title = 'How do I sort a list of dictionaries by value?'
+        self.assertEqual(duplicates.simhash(title),
+                         duplicates.simhash(self.question.title))
+        self.assertIsNone(duplicates.simhash('How do I?'))
+        value = duplicates.simhash(title)
+        self.assertEqual(len(duplicates.band_keys(value)), duplicates.BANDS)
+        self.assertLess(value, 1 << 64)
+
+    def test_find(self):
+        with self.assertNumQueries(2):
+            found = duplicates.find('how to sort a list of dictionaries by value')
+        self.assertEqual(found, [(0, self.question)])
+        self.assertEqual(duplicates.find('Install docker on windows'), [])
+        self.assertEqual(duplicates.find(
+            self.question.title, exclude=self.question.pk), [])
+
+    def test_fingerprint_follows_title(self):
+        question = Question.objects.get(pk=self.question.pk)
+        question.title = 'Merge two dictionaries'
+        question.save()
+        self.assertEqual(duplicates.find('Sort a list of dictionaries by value'),
+                         [])
+        self.assertEqual(duplicates.find('merge two dictionaries')[0][1],
+                         question)
+        question.delete()
+        self.assertFalse(SimHashBand.objects.filter(
+            question_id=question.pk).exists())
+
+    def test_rebuild(self):
+        SimHashBand.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_duplicate_index', '--batch-size', '1', stdout=out)
+        self.assertIn('2 questions fingerprinted', out.getvalue())
+        self.assertEqual(SimHashBand.objects.count(), 2 * duplicates.BANDS)
+
+    def test_endpoint(self):
+        response = self.client.get(reverse('questions:duplicates'),
+                                   {'title': 'sorting list of dictionaries by value'})
+        self.assertEqual(response.json()['questions'], [])
+        data = self.client.get(reverse('questions:duplicates'), {
+            'title': 'Sort list of dictionaries by value'}).json()
+        self.assertEqual([q['id'] for q in data['questions']],
+                         [self.question.pk])
+        self.assertEqual(data['questions'][0]['url'], reverse(
+            'questions:question_detail', args=[self.question.pk]))
+
+    def test_form_rejects_duplicate(self):
+        self.client.force_login(self.user)
+        url = reverse('questions:create_question')
+        data = {'title': 'Sort a list of dictionaries by value?',
+                'description': 'Description'}
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'A similar question has already been asked.')
+        self.assertContains(response, 'type="checkbox" name="not_duplicate"')
+        self.assertEqual(Question.objects.count(), 2)
+
+        response = self.client.post(url, dict(data, not_duplicate='on'))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Question.objects.count(), 3)
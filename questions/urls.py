@@ -1,7 +1,8 @@
 from django.urls import include, path
 
 from .views import CreateQuestionView, QuestionDetailView, QuestionListView
-from .views import create_answer
+from .views import (
+    answers_batch, cache_stats, create_answer, duplicate_questions, export_data)
 
 
 app_name = 'questions'    # 指定路由的命名空间
@@ -11,7 +12,11 @@ urlpatterns = [
     path('questions/', include(([
         path('', QuestionListView.as_view(), name='questions_list'),
         path('add/', CreateQuestionView.as_view(), name='create_question'),
+        path('duplicates/', duplicate_questions, name='duplicates'),
         path('<int:pk>/', QuestionDetailView.as_view(), name='question_detail'),
         path('<int:pk>/add', create_answer, name='create_answer'),
+        path('<int:pk>/answers/', answers_batch, name='answers_batch'),
+        path('cache-stats/', cache_stats, name='cache_stats'),
+        path('export/', export_data, name='export'),
     ])))
 ]
\ No newline at end of file
@@ -0,0 +1,24 @@
+from django.urls import include, path
+
+from .async_views import question_detail, question_list
+from .views import CreateQuestionView, answers_batch, cache_stats
+from .views import create_answer, duplicate_questions, export_data
+
+
+app_name = 'questions'    # 指定路由的命名空间
+
+
+# ASGI 部署使用的路由,与 questions.urls 相同
+# 只是问题列表和问题详情换成了 questions.async_views 中的异步视图
+urlpatterns = [
+    path('questions/', include(([
+        path('', question_list, name='questions_list'),
+        path('add/', CreateQuestionView.as_view(), name='create_question'),
+        path('duplicates/', duplicate_questions, name='duplicates'),
+        path('<int:pk>/', question_detail, name='question_detail'),
+        path('<int:pk>/add', create_answer, name='create_answer'),
+        path('<int:pk>/answers/', answers_batch, name='answers_batch'),
+        path('cache-stats/', cache_stats, name='cache_stats'),
+        path('export/', export_data, name='export'),
+    ])))
+]
@@ -1,11 +1,50 @@
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
-from django.shortcuts import render, redirect
+from django.shortcuts import get_object_or_404, render, redirect
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import (
+    Http404, HttpResponse, HttpResponseBadRequest, JsonResponse,
+    StreamingHttpResponse)
+from django.template.loader import render_to_string
+from django.urls import reverse
 from django.views.generic import CreateView, ListView
 
-from .models import Question, Answer
+from . import caching, duplicates, export
+from .models import Question, Answer, RelatedQuestion
 from .forms import QuestionForm, AnswerForm
+from .pagination import CachedCountPaginator, CursorPaginator, InvalidCursor
+
+
+# 问题详情页直接渲染的答案数量,其余答案通过 answers_batch 视图分批加载
+ANSWERS_PER_PAGE = getattr(settings, 'QUESTIONS_ANSWERS_PER_PAGE', 30)
+
+
+def answer_page(question_id, cursor=None):
+    """按创建时间顺序返回问题的一批答案,参数 cursor 为空表示第一批
+
+    游标分页使用 (create_date, id) 作为排序键
+    配合 (question_id, create_date) 索引,任意一批都只是一次索引范围扫描
+    """
+    paginator = CursorPaginator(
+        Answer.objects.filter(question_id=question_id).select_related(
+            'user', 'user__profile'),
+        ANSWERS_PER_PAGE, ordering=('create_date', 'id'))
+    return paginator.page(cursor)
+
+
+def related_questions(question_id):
+    """问题的相似问题,按相似度从高到低排列
+
+    相似问题是预先计算的,这里只是一次 (question, rank) 唯一索引的范围扫描
+    JOIN 问题表时只读取标题和答案数,不读取正文
+    """
+    links = RelatedQuestion.objects.filter(
+        question_id=question_id).select_related('related').only(
+            'related__id', 'related__title', 'related__answer_count'
+        ).order_by('rank')
+    return [link.related for link in links]
 
 
 @method_decorator([login_required], name='dispatch')
@@ -60,6 +99,87 @@ class QuestionListView(ListView):
     # get_context_data 方法会对此增加一组键值对
     # key 为 'page_size' ,value 为 paginate_by ,即每页展示问题的数量
     paginate_by = 10
+    # 普通分页模式下,"Page X of Y" 中的总数来自缓存而不是每次执行 COUNT(*)
+    paginator_class = CachedCountPaginator
+
+    # 请求参数 sort 可选的排序方式,未提供时使用 ordering 属性
+    # hot 按热度得分排序,得分的计算方法见 questions.ranking 模块
+    # activity 按最后活跃时间排序,有新答案的问题排在前面
+    # unanswered 只包含没有答案的问题,新问题排在前面
+    # 每种排序都有对应的复合索引,游标分页时每页数据是一次索引范围扫描
+    sort_orderings = {
+        'hot': ('-hot_score', '-id'),
+        'activity': ('-last_activity', '-id'),
+        'unanswered': ('-create_date', '-id'),
+    }
+    sort_filters = {
+        'unanswered': {'answer_count': 0},
+    }
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        sort = self.request.GET.get('sort')
+        if sort in self.sort_filters:
+            queryset = queryset.filter(**self.sort_filters[sort])
+        return queryset
+
+    def get_ordering(self):
+        sort = self.request.GET.get('sort')
+        if sort in self.sort_orderings:
+            return self.sort_orderings[sort]
+        return super().get_ordering()
+
+    def use_cursor(self):
+        """是否使用游标分页
+
+        settings.QUESTIONS_PAGINATION 为 'cursor' 时默认启用
+        否则请求参数中带有 cursor(可以为空)时启用
+        """
+        return (getattr(settings, 'QUESTIONS_PAGINATION', 'offset') == 'cursor'
+                or 'cursor' in self.request.GET)
+
+    def get_cursor_ordering(self):
+        """游标分页的排序键,在视图类的排序字段后追加 id 保证唯一
+        """
+        ordering = self.get_ordering()
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        ordering = tuple(ordering)
+        if ordering[-1].lstrip('-') not in ('id', 'pk'):
+            prefix = '-' if ordering[0].startswith('-') else ''
+            ordering += (prefix + 'id',)
+        return ordering
+
+    # 父类 MultipleObjectMixin 的 get_context_data 方法调用此方法完成分页
+    # 返回值是 (分页器, 当前页, 当前页的数据, 是否分页) 四元元组
+    def paginate_queryset(self, queryset, page_size):
+        if not self.use_cursor():
+            return super().paginate_queryset(queryset, page_size)
+        paginator = CursorPaginator(
+            queryset, page_size, ordering=self.get_cursor_ordering())
+        try:
+            page = paginator.page(self.request.GET.get('cursor'))
+        except InvalidCursor:
+            raise Http404('Invalid cursor.')
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+    # 命中片段缓存时返回 None 表示不分页,也就不会查询数据库
+    def get_paginate_by(self, queryset):
+        if self.fragment.hit:
+            return None
+        return super().get_paginate_by(queryset)
+
+    def get_context_data(self, **kwargs):
+        # 列表片段与分页方式和请求参数 page 、cursor 、sort 有关
+        self.fragment = caching.lookup(caching.list_fragment_key(
+            [self.use_cursor()] + [self.request.GET.get(name, '')
+                                   for name in ('page', 'cursor', 'sort')]))
+        kwargs['fragment'] = self.fragment
+        context = super().get_context_data(**kwargs)
+        context['cursor_mode'] = self.use_cursor()
+        sort = self.request.GET.get('sort')
+        context['sort'] = sort if sort in self.sort_orderings else ''
+        return context
 
 
 # 问题详情页面需要提供编写答案的表单
@@ -89,17 +209,63 @@ class QuestionDetailView(CreateView):
         # view 函数内部调用视图类实例的 setup 方法设置当前类的实例属性
         # self.request = request ,self.kwargs = kwargs
         question_id = self.kwargs.get('pk')
-        # 以下 4 行代码为前端模板文件增加了 question 和 answers 对象
-        # 因为问题的详情页不仅要展示问题,还要展示问题的答案
-        question = Question.objects.get(pk=question_id)
-        kwargs['question'] = question
-        if Answer.objects.filter(question=question):
-            kwargs['answers'] = Answer.objects.filter(question=question)
+        kwargs['question_id'] = question_id
+        # 问题和答案部分的页面片段与当前用户无关,可以缓存
+        # 命中缓存时不需要查询数据库,问题被删除时缓存会失效
+        fragment = caching.lookup(caching.question_fragment_key(question_id))
+        kwargs['fragment'] = fragment
+        if not fragment.hit:
+            # 以下代码为前端模板文件增加了 question 和 answers 对象
+            # 因为问题的详情页不仅要展示问题,还要展示问题的答案
+            # select_related 方法使用 JOIN 语句一次查出问题、提问者及其个人简介
+            # 答案及答案作者同理,这样无论答案有多少,查询次数都是固定的
+            question = get_object_or_404(
+                Question.objects.select_related('user', 'user__profile'),
+                pk=question_id)
+            kwargs['question'] = question
+            # 只渲染第一批答案,页面大小不随答案数量增长
+            page = answer_page(question_id)
+            kwargs['answers'] = page.object_list
+            kwargs['answers_cursor'] = page.next_cursor
+            kwargs['answers_remaining'] = max(
+                question.answer_count - len(page.object_list), 0)
+            kwargs['related_questions'] = related_questions(question_id)
 
         context = super().get_context_data(**kwargs)
         return context
 
 
+def answers_batch(request, pk):
+    """问题详情页 "加载更多答案" 请求的一批答案
+
+    默认返回 JSON:{"html": 答案的 HTML, "next": 下一批的游标或 null}
+    请求参数 format=html 时直接返回 HTML ,下一批的游标在响应头 X-Next-Cursor 中
+    结果按问题的版本号缓存,问题或答案变化时失效
+    """
+    cursor = request.GET.get('cursor') or None
+    cache = caching.get_cache()
+    key = caching.answers_batch_key(pk, cursor)
+    data = cache.get(key)
+    caching.stats.record(data is not None)
+    if data is None:
+        try:
+            page = answer_page(pk, cursor)
+        except InvalidCursor:
+            raise Http404('Invalid cursor.')
+        data = {
+            'html': render_to_string(
+                'questions/answers_batch.html', {'answers': page.object_list}),
+            'next': page.next_cursor,
+        }
+        cache.set(key, data, caching.TIMEOUT)
+
+    if request.GET.get('format') == 'html':
+        response = HttpResponse(data['html'])
+        response['X-Next-Cursor'] = data['next'] or ''
+        return response
+    return JsonResponse(data)
+
+
 @login_required
 def create_answer(request, pk):
     if request.method == 'POST':
@@ -125,4 +291,52 @@ def create_answer(request, pk):
     # 通常只有 POST 请求会访问此函数对应的 URL
     # 就是用户点击 "问题详情页" 提供的 "回答表单" 下面的提交按钮
     # 如果有 get 请求的话,就跳转到对应的问题详情页面
-    return redirect('questions:question_detail', pk)
\ No newline at end of file
+    return redirect('questions:question_detail', pk)
+
+
+def duplicate_questions(request):
+    """提问页面输入标题时查找相似的已有问题,返回 JSON
+
+    请求参数 title 为当前输入的标题,返回 {"questions": [...]} ,按相似度排列
+    每次请求是两次索引查询,与问题总数无关
+    """
+    title = request.GET.get('title', '')[:255]
+    return JsonResponse({'questions': [{
+        'id': question.pk,
+        'title': question.title,
+        'answers': question.answer_count,
+        'distance': distance,
+        'url': reverse('questions:question_detail', args=[question.pk]),
+    } for distance, question in duplicates.find(title)]})
+
+
+@staff_member_required
+def cache_stats(request):
+    """页面片段缓存的命中率,仅管理员可以访问
+    """
+    return JsonResponse(caching.stats.snapshot())
+
+
+@staff_member_required
+def export_data(request):
+    """以流式响应导出问题或答案,仅管理员可以访问
+
+    请求参数:type 为 questions 或 answers ,format 为 csv 或 jsonl
+    since 和 until 为可选的日期范围,例如 ?type=answers&since=2021-01-01
+    数据分批查询并逐行写入响应,内存占用与数据量无关
+    """
+    kind = request.GET.get('type', 'questions')
+    fmt = request.GET.get('format', 'csv')
+    if kind not in export.EXPORTS or fmt not in export.FORMATS:
+        return HttpResponseBadRequest('Unknown type or format.')
+    try:
+        since = export.parse_bound(request.GET.get('since'))
+        until = export.parse_bound(request.GET.get('until'), end=True)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+
+    response = StreamingHttpResponse(
+        export.stream(kind, fmt, since, until),
+        content_type=export.CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{kind}.{fmt}"'
+    return response
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class SearchConfig(AppConfig):
     name = 'search'
+
+    def ready(self):
+        # 导入模块时连接信号,问题和答案保存后自动更新搜索索引
+        from . import signals  # noqa
@@ -0,0 +1,24 @@
+from questions.async_views import rendered
+
+from .views import search as search_view, typeahead as typeahead_view
+
+
+# 搜索后端的查询是同步的,在线程中执行,等待期间事件循环可以处理其它请求
+# 路由见 search.urls_async 模块,只在 ASGI 部署中使用
+_search = rendered(search_view)
+
+
+async def search(request):
+    """搜索功能的异步视图
+    """
+    return await _search(request)
+
+
+# 输入提示通常直接命中进程内的索引,偶尔需要查询数据库读取变化,同样在线程中执行
+_typeahead = rendered(typeahead_view)
+
+
+async def typeahead(request):
+    """搜索框输入提示的异步视图
+    """
+    return await _typeahead(request)
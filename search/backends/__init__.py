@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+
+
+# 数据库类型与默认搜索后端的对应关系
+DEFAULT_BACKENDS = {
+    'sqlite': 'search.backends.sqlite_fts.SQLiteFTSBackend',
+    'mysql': 'search.backends.mysql_fulltext.MySQLFulltextBackend',
+}
+
+_backend = None
+
+
+def get_backend():
+    """获取当前使用的搜索后端实例
+
+    settings.SEARCH_BACKEND 为后端类的导入路径,为空时根据数据库类型选择
+    """
+    global _backend
+    if _backend is None:
+        path = getattr(settings, 'SEARCH_BACKEND', None) or DEFAULT_BACKENDS.get(
+            connection.vendor,
+            'search.backends.database.DatabaseSearchBackend')
+        _backend = import_string(path)()
+    return _backend
+
+
+def reset_backend():
+    """清除缓存的后端实例,修改 SEARCH_BACKEND 配置后调用
+    """
+    global _backend
+    _backend = None
@@ -0,0 +1,95 @@
+import math
+
+from questions.models import Question
+
+
+def question_rowid(pk):
+    """问题和答案作为同一个索引中的文档,用文档编号的奇偶区分
+    """
+    return pk * 2
+
+
+def answer_rowid(pk):
+    return pk * 2 + 1
+
+
+class SearchResults:
+    """搜索结果的一页数据
+
+    接口与 django.core.paginator.Page 类似,前端模板可以直接用来翻页
+    """
+
+    def __init__(self, object_list, total, page, per_page):
+        self.object_list = object_list
+        self.total = total
+        self.number = page
+        self.per_page = per_page
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    @property
+    def num_pages(self):
+        return max(1, math.ceil(self.total / self.per_page))
+
+    def has_next(self):
+        return self.number < self.num_pages
+
+    def has_previous(self):
+        return self.number > 1
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+
+class BaseSearchBackend:
+    """搜索后端的基类
+
+    子类需要实现 search_ids 方法返回按相关度排序的问题 ID 和匹配总数
+    索引需要额外维护的后端还要实现 index_* 、remove_* 和 rebuild 方法
+    """
+
+    def search(self, groups, page=1, per_page=10):
+        """执行搜索,参数 groups 是 search.query.parse_query 的返回值
+        """
+        page = max(1, page)
+        if not groups:
+            return SearchResults([], 0, page, per_page)
+        ids, total = self.search_ids(
+            groups, offset=(page - 1) * per_page, limit=per_page)
+        questions = Question.objects.select_related(
+            'user', 'user__profile').in_bulk(ids)
+        object_list = [questions[pk] for pk in ids if pk in questions]
+        return SearchResults(object_list, total, page, per_page)
+
+    def search_ids(self, groups, offset, limit):
+        raise NotImplementedError
+
+    def index_question(self, question):
+        pass
+
+    def index_answer(self, answer):
+        pass
+
+    def remove_question(self, question):
+        pass
+
+    def remove_answer(self, answer):
+        pass
+
+    def rebuild(self):
+        """重建全部索引,返回值为写入索引的文档数
+        """
+        return 0
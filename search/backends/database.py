@@ -0,0 +1,27 @@
+from functools import reduce
+from operator import and_, or_
+
+from django.db.models import Q
+
+from questions.models import Question
+from .base import BaseSearchBackend
+
+
+class DatabaseSearchBackend(BaseSearchBackend):
+    """不支持全文索引的数据库使用的后端
+
+    使用 LIKE '%x%' 匹配问题的标题和描述,没有相关度,按更新时间排序
+    """
+
+    def term_condition(self, term):
+        return (Q(title__icontains=term.text) |
+                Q(description__icontains=term.text))
+
+    def search_ids(self, groups, offset, limit):
+        condition = reduce(or_, [
+            reduce(and_, [self.term_condition(term) for term in group])
+            for group in groups])
+        queryset = Question.objects.filter(condition).order_by(
+            '-update_date', '-id')
+        ids = list(queryset.values_list('id', flat=True)[offset:offset + limit])
+        return ids, queryset.count()
@@ -0,0 +1,60 @@
+import os
+
+from django.conf import settings
+from django.db import transaction
+
+from questions.models import Question, Answer
+from ..inverted_index import InvertedIndex
+from .base import BaseSearchBackend, answer_rowid, question_rowid
+
+
+# 索引文件路径,同一台机器上的所有 worker 进程共享这个文件
+INDEX_PATH = getattr(settings, 'SEARCH_INDEX_PATH', None) or os.path.join(
+    settings.BASE_DIR, 'var', 'search', 'questions.idx')
+
+
+class InProcessBM25Backend(BaseSearchBackend):
+    """纯 Python 实现的搜索后端,用于不支持全文索引的数据库
+
+    倒排索引保存在 mmap 映射的文件中,查询在当前进程内完成并按 BM25 排序
+    索引文件由 rebuild_search_index 命令生成,增量更新写入日志文件
+    """
+
+    def __init__(self, path=INDEX_PATH):
+        self.index = InvertedIndex(path)
+
+    def search_ids(self, groups, offset, limit):
+        ranked = self.index.search(groups)
+        return [pk for pk, _ in ranked[offset:offset + limit]], len(ranked)
+
+    # 增量更新在事务提交之后写入日志,回滚的修改不会进入索引
+    def index_question(self, question):
+        transaction.on_commit(lambda: self.index.put(
+            question_rowid(question.pk), question.pk,
+            question.title, question.description))
+
+    def index_answer(self, answer):
+        transaction.on_commit(lambda: self.index.put(
+            answer_rowid(answer.pk), answer.question_id,
+            '', answer.description))
+
+    def remove_question(self, question):
+        rowid = question_rowid(question.pk)
+        transaction.on_commit(lambda: self.index.delete(rowid))
+
+    def remove_answer(self, answer):
+        rowid = answer_rowid(answer.pk)
+        transaction.on_commit(lambda: self.index.delete(rowid))
+
+    def rebuild(self, batch_size=1000):
+        def documents():
+            rows = Question.objects.values_list(
+                'id', 'title', 'description').order_by().iterator(batch_size)
+            for pk, title, description in rows:
+                yield question_rowid(pk), pk, title, description
+            rows = Answer.objects.values_list(
+                'id', 'question_id', 'description').order_by().iterator(batch_size)
+            for pk, question_id, description in rows:
+                yield answer_rowid(pk), question_id, '', description
+
+        return self.index.rebuild(documents())
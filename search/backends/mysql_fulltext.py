@@ -0,0 +1,51 @@
+from django.db import connection
+
+from .base import BaseSearchBackend
+
+
+def compile_query(groups):
+    """将 parse_query 的返回值转换为 MySQL 布尔模式的查询语句
+
+    组内的词都加上 + 表示必须出现,多个组之间是 OR 的关系
+    """
+    compiled = []
+    for group in groups:
+        terms = ' '.join(
+            f'+"{term.text}"' if term.phrase else f'+{term.text}'
+            for term in group)
+        compiled.append(terms if len(groups) == 1 else f'({terms})')
+    return ' '.join(compiled)
+
+
+class MySQLFulltextBackend(BaseSearchBackend):
+    """基于 MySQL FULLTEXT 索引的搜索后端,用于生产环境
+
+    全文索引由 search 应用的迁移文件创建,InnoDB 在写入数据时自动维护
+    所以这里不需要实现 index_* 和 remove_* 方法
+    """
+
+    def search_ids(self, groups, offset, limit):
+        against = compile_query(groups)
+        matches = (
+            'SELECT id AS question_id, '
+            'MATCH (title, description) AGAINST (%s IN BOOLEAN MODE) AS score '
+            'FROM questions_question '
+            'WHERE MATCH (title, description) AGAINST (%s IN BOOLEAN MODE) '
+            'UNION ALL '
+            'SELECT question_id, '
+            'MATCH (description) AGAINST (%s IN BOOLEAN MODE) AS score '
+            'FROM questions_answer '
+            'WHERE MATCH (description) AGAINST (%s IN BOOLEAN MODE)'
+        )
+        params = [against] * 4
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT question_id, MAX(score) AS score FROM ({matches}) AS m '
+                f'GROUP BY question_id ORDER BY score DESC, question_id '
+                f'LIMIT %s OFFSET %s', params + [limit, offset])
+            ids = [row[0] for row in cursor.fetchall()]
+            cursor.execute(
+                f'SELECT COUNT(DISTINCT question_id) FROM ({matches}) AS m',
+                params)
+            total = cursor.fetchone()[0]
+        return ids, total
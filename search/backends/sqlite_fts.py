@@ -0,0 +1,105 @@
+from django.db import connection, transaction
+
+from questions.models import Question, Answer
+from .base import BaseSearchBackend, answer_rowid, question_rowid
+
+
+# FTS5 虚拟表名,由 search 应用的迁移文件创建
+TABLE = 'search_document'
+
+# bm25 函数的列权重,依次对应 title 、body 、question_id 三列
+# 标题中出现的词比正文中出现的词更重要
+WEIGHTS = (10.0, 1.0, 0.0)
+
+
+def quote(text):
+    """FTS5 查询语法中的字符串需要用双引号包裹,内部双引号写两次
+    """
+    return '"' + text.replace('"', '""') + '"'
+
+
+def compile_query(groups):
+    """将 parse_query 的返回值转换为 FTS5 的 MATCH 表达式
+    """
+    return ' OR '.join(
+        '(' + ' AND '.join(quote(term.text) for term in group) + ')'
+        for group in groups)
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """基于 SQLite FTS5 的搜索后端,用于本地开发
+
+    每个问题和每个答案都是表中的一个文档,以问题为单位按 bm25 得分排序
+    """
+
+    def search_ids(self, groups, offset, limit):
+        match = compile_query(groups)
+        # bm25 不能直接放在聚合函数里,子查询中的 LIMIT -1 阻止 SQLite 将其展开
+        weights = ', '.join(str(w) for w in WEIGHTS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT question_id, MIN(score) AS best FROM ('
+                f'SELECT question_id, bm25({TABLE}, {weights}) AS score '
+                f'FROM {TABLE} WHERE {TABLE} MATCH %s LIMIT -1) '
+                f'GROUP BY question_id ORDER BY best, question_id '
+                f'LIMIT %s OFFSET %s', [match, limit, offset])
+            ids = [row[0] for row in cursor.fetchall()]
+            cursor.execute(
+                f'SELECT COUNT(DISTINCT question_id) FROM {TABLE} '
+                f'WHERE {TABLE} MATCH %s', [match])
+            total = cursor.fetchone()[0]
+        return ids, total
+
+    def _write(self, cursor, rowid, title, body, question_id):
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [rowid])
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, title, body, question_id) '
+            f'VALUES (%s, %s, %s, %s)', [rowid, title, body, question_id])
+
+    def index_question(self, question):
+        with connection.cursor() as cursor:
+            self._write(cursor, question_rowid(question.pk), question.title,
+                        question.description, question.pk)
+
+    def index_answer(self, answer):
+        with connection.cursor() as cursor:
+            self._write(cursor, answer_rowid(answer.pk), '',
+                        answer.description, answer.question_id)
+
+    def remove_question(self, question):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s',
+                           [question_rowid(question.pk)])
+
+    def remove_answer(self, answer):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s',
+                           [answer_rowid(answer.pk)])
+
+    def rebuild(self, batch_size=1000):
+        count = 0
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TABLE}')
+            sql = (f'INSERT INTO {TABLE} (rowid, title, body, question_id) '
+                   f'VALUES (%s, %s, %s, %s)')
+            rows = Question.objects.values_list(
+                'id', 'title', 'description').order_by().iterator(batch_size)
+            batch = []
+            for pk, title, description in rows:
+                batch.append((question_rowid(pk), title, description, pk))
+                if len(batch) >= batch_size:
+                    cursor.executemany(sql, batch)
+                    count += len(batch)
+                    batch = []
+            rows = Answer.objects.values_list(
+                'id', 'description', 'question_id').order_by().iterator(batch_size)
+            for pk, description, question_id in rows:
+                batch.append((answer_rowid(pk), '', description, question_id))
+                if len(batch) >= batch_size:
+                    cursor.executemany(sql, batch)
+                    count += len(batch)
+                    batch = []
+            if batch:
+                cursor.executemany(sql, batch)
+                count += len(batch)
+        return count
@@ -0,0 +1,359 @@
+import bisect
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+from array import array
+from collections import Counter
+
+from .query import WORD_RE
+
+
+# 索引文件格式:文件头之后依次是若干个 uint32 数组,最后是词典字符串
+# 文件头:魔数、格式版本、文档数、词数、全部文档的加权长度之和
+MAGIC = b'QAIX'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sIIIQ')
+
+# 标题中的词按出现次数的若干倍计入词频
+TITLE_BOOST = 3
+
+# BM25 参数
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text):
+    """将文本拆分为小写的词
+    """
+    return WORD_RE.findall((text or '').lower())
+
+
+def analyze(title, body):
+    """计算一篇文档的加权词频和加权长度
+    """
+    title_tokens = tokenize(title)
+    body_tokens = tokenize(body)
+    counts = Counter(body_tokens)
+    for token in title_tokens:
+        counts[token] += TITLE_BOOST
+    return counts, len(body_tokens) + TITLE_BOOST * len(title_tokens)
+
+
+def _uint_array(values=()):
+    result = array('I', values)
+    assert result.itemsize == 4
+    return result
+
+
+def write_segment(path, documents):
+    """将文档写入索引文件
+
+    参数 documents 是可迭代对象,每个元素为 (rowid, question_id, counts, length)
+    先写入临时文件再替换,正在读取旧文件的进程不受影响
+    """
+    documents = sorted(documents, key=lambda doc: doc[0])
+    rowids = _uint_array(doc[0] for doc in documents)
+    questions = _uint_array(doc[1] for doc in documents)
+    lengths = _uint_array(doc[3] for doc in documents)
+
+    postings = {}
+    for index, (_, _, counts, _) in enumerate(documents):
+        for term, tf in counts.items():
+            postings.setdefault(term, []).append((index, tf))
+
+    terms = sorted(postings)
+    term_offsets = _uint_array([0])
+    posting_offsets = _uint_array([0])
+    posting_docs = _uint_array()
+    posting_tfs = _uint_array()
+    blob = bytearray()
+    for term in terms:
+        blob += term.encode('utf-8')
+        term_offsets.append(len(blob))
+        for index, tf in postings[term]:
+            posting_docs.append(index)
+            posting_tfs.append(tf)
+        posting_offsets.append(len(posting_docs))
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(documents), len(terms),
+                            sum(lengths)))
+        for values in (rowids, questions, lengths, term_offsets,
+                       posting_offsets, posting_docs, posting_tfs):
+            values.tofile(f)
+        f.write(blob)
+    os.replace(tmp_path, path)
+    return len(documents)
+
+
+class Segment:
+    """只读的索引段,通过 mmap 映射索引文件
+
+    多个进程映射同一个文件时共享操作系统的页缓存
+    所有数组都是 memoryview ,读取时不会复制数据
+    """
+
+    def __init__(self, path=None):
+        self.doc_count = self.term_count = self.total_length = 0
+        self.rowids = self.questions = self.lengths = ()
+        self.term_offsets = self.posting_offsets = (0,)
+        self.posting_docs = self.posting_tfs = ()
+        self.blob = b''
+        self._mmap = None
+        self.stat = None
+        if path and os.path.exists(path):
+            self._open(path)
+
+    def _open(self, path):
+        with open(path, 'rb') as f:
+            self.stat = os.fstat(f.fileno())
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        magic, version, doc_count, term_count, total_length = \
+            HEADER.unpack_from(view)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f'{path} is not a search index file.')
+        self.doc_count = doc_count
+        self.term_count = term_count
+        self.total_length = total_length
+
+        offset = HEADER.size
+
+        def take(count):
+            nonlocal offset
+            values = view[offset:offset + count * 4].cast('I')
+            offset += count * 4
+            return values
+
+        self.rowids = take(doc_count)
+        self.questions = take(doc_count)
+        self.lengths = take(doc_count)
+        self.term_offsets = take(term_count + 1)
+        self.posting_offsets = take(term_count + 1)
+        posting_count = self.posting_offsets[-1]
+        self.posting_docs = take(posting_count)
+        self.posting_tfs = take(posting_count)
+        self.blob = view[offset:offset + self.term_offsets[-1]]
+
+    def _term_at(self, i):
+        return bytes(
+            self.blob[self.term_offsets[i]:self.term_offsets[i + 1]])
+
+    def postings(self, term):
+        """二分查找词典,返回 (文档序号, 词频) 的迭代器
+        """
+        key = term.encode('utf-8')
+        low, high = 0, self.term_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._term_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low == self.term_count or self._term_at(low) != key:
+            return iter(())
+        start = self.posting_offsets[low]
+        end = self.posting_offsets[low + 1]
+        return zip(self.posting_docs[start:end], self.posting_tfs[start:end])
+
+    def find(self, rowid):
+        """根据 rowid 查找文档序号,不存在时返回 None
+        """
+        index = bisect.bisect_left(self.rowids, rowid)
+        if index < self.doc_count and self.rowids[index] == rowid:
+            return index
+        return None
+
+
+class InvertedIndex:
+    """带增量更新的倒排索引
+
+    索引由两部分组成:管理命令重建的只读索引段(mmap 文件)
+    以及增量更新写入的日志文件(每行一个 JSON 对象)
+    每个进程在查询前读取日志文件新增的内容,所以各个进程看到的索引一致
+    被更新或删除的旧文档记录在 tombstones 中,查询时跳过
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.journal_path = path + '.journal'
+        self._lock = threading.Lock()
+        self._reset(Segment(path))
+
+    def _reset(self, segment):
+        self.segment = segment
+        self.tombstones = set()
+        # rowid -> (question_id, counts, length)
+        self.delta = {}
+        self.delta_postings = {}
+        self.doc_count = segment.doc_count
+        self.total_length = segment.total_length
+        self._journal_offset = 0
+
+    def refresh(self):
+        """索引文件被替换时重新映射,然后回放日志文件中的新内容
+        """
+        with self._lock:
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                stat = None
+            current = self.segment.stat
+            if stat is not None and (
+                    current is None or
+                    (stat.st_ino, stat.st_mtime_ns) !=
+                    (current.st_ino, current.st_mtime_ns)):
+                self._reset(Segment(self.path))
+            self._replay()
+
+    def _replay(self):
+        try:
+            with open(self.journal_path, 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                size = f.tell()
+                if size < self._journal_offset:
+                    # 日志文件被重建命令清空,从头读取
+                    self._journal_offset = 0
+                if size == self._journal_offset:
+                    return
+                f.seek(self._journal_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        # 只处理完整的行,写了一半的行留到下一次处理
+        end = data.rfind(b'\n') + 1
+        self._journal_offset += end
+        for line in data[:end].splitlines():
+            entry = json.loads(line)
+            if entry['op'] == 'put':
+                self._put(entry['r'], entry['q'], entry['c'], entry['l'])
+            else:
+                self._delete(entry['r'])
+
+    def _delete(self, rowid):
+        previous = self.delta.pop(rowid, None)
+        if previous is not None:
+            _, counts, length = previous
+            for term in counts:
+                self.delta_postings[term].discard(rowid)
+            self.doc_count -= 1
+            self.total_length -= length
+        elif rowid not in self.tombstones:
+            index = self.segment.find(rowid)
+            if index is not None:
+                self.tombstones.add(rowid)
+                self.doc_count -= 1
+                self.total_length -= self.segment.lengths[index]
+
+    def _put(self, rowid, question_id, counts, length):
+        self._delete(rowid)
+        self.delta[rowid] = (question_id, counts, length)
+        for term in counts:
+            self.delta_postings.setdefault(term, set()).add(rowid)
+        self.doc_count += 1
+        self.total_length += length
+
+    def _append(self, entry):
+        directory = os.path.dirname(self.journal_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        line = json.dumps(entry, separators=(',', ':')) + '\n'
+        # O_APPEND 模式下单次写入较短的行不会与其它进程交错
+        with open(self.journal_path, 'ab') as f:
+            f.write(line.encode('utf-8'))
+
+    def put(self, rowid, question_id, title, body):
+        """新增或更新一篇文档
+        """
+        counts, length = analyze(title, body)
+        self._append({'op': 'put', 'r': rowid, 'q': question_id,
+                      'c': dict(counts), 'l': length})
+
+    def delete(self, rowid):
+        self._append({'op': 'del', 'r': rowid})
+
+    def rebuild(self, documents):
+        """用全部文档重建索引段并清空日志文件
+
+        参数 documents 的元素为 (rowid, question_id, title, body)
+        """
+        count = write_segment(self.path, (
+            (rowid, question_id) + analyze(title, body)
+            for rowid, question_id, title, body in documents))
+        open(self.journal_path, 'wb').close()
+        with self._lock:
+            self._reset(Segment(self.path))
+        return count
+
+    def _term_postings(self, term):
+        """返回 {rowid: 词频},合并索引段和增量部分
+        """
+        segment = self.segment
+        result = {}
+        for index, tf in segment.postings(term):
+            rowid = segment.rowids[index]
+            if rowid not in self.tombstones:
+                result[rowid] = tf
+        for rowid in self.delta_postings.get(term, ()):
+            result[rowid] = self.delta[rowid][1][term]
+        return result
+
+    def _document(self, rowid):
+        """返回 (question_id, length)
+        """
+        if rowid in self.delta:
+            question_id, _, length = self.delta[rowid]
+            return question_id, length
+        index = self.segment.find(rowid)
+        return self.segment.questions[index], self.segment.lengths[index]
+
+    def search(self, groups):
+        """执行查询,返回按 BM25 得分降序排列的 [(question_id, score)]
+
+        参数 groups 是 search.query.parse_query 的返回值
+        短语按 "全部词都出现" 处理,索引中没有保存词的位置
+        一个问题的得分取问题本身及其所有答案中的最高分
+        """
+        self.refresh()
+        with self._lock:
+            postings = {}
+            matched = set()
+            for group in groups:
+                words = [word for term in group for word in term.words]
+                for word in words:
+                    if word not in postings:
+                        postings[word] = self._term_postings(word)
+                lists = sorted((postings[word] for word in words), key=len)
+                candidates = set(lists[0])
+                for other in lists[1:]:
+                    candidates.intersection_update(other)
+                    if not candidates:
+                        break
+                matched |= candidates
+
+            if not matched:
+                return []
+            n = max(self.doc_count, 1)
+            average = self.total_length / n or 1
+            idf = {
+                word: math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+                for word, docs in postings.items()}
+            best = {}
+            for rowid in matched:
+                question_id, length = self._document(rowid)
+                norm = K1 * (1 - B + B * length / average)
+                score = 0.0
+                for word, docs in postings.items():
+                    tf = docs.get(rowid)
+                    if tf:
+                        score += idf[word] * tf * (K1 + 1) / (tf + norm)
+                if score > best.get(question_id, -1.0):
+                    best[question_id] = score
+        return sorted(best.items(), key=lambda item: (-item[1], item[0]))
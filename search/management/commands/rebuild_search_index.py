@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from search.backends import get_backend
+
+
+class Command(BaseCommand):
+    """重建搜索索引
+
+    修改搜索后端或者批量导入数据后执行:python manage.py rebuild_search_index
+    """
+
+    help = 'Rebuild the search index for all questions and answers.'
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        count = backend.rebuild()
+        self.stdout.write(
+            f'{type(backend).__name__}: {count} documents indexed')
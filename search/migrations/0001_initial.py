@@ -0,0 +1,52 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    """根据数据库类型创建全文索引
+
+    SQLite 使用 FTS5 虚拟表,MySQL 在问题表和答案表上创建 FULLTEXT 索引
+    其它数据库不创建索引,搜索时退回到 LIKE 查询
+    """
+    vendor = schema_editor.connection.vendor
+    question = apps.get_model('questions', 'Question')._meta.db_table
+    answer = apps.get_model('questions', 'Answer')._meta.db_table
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE IF NOT EXISTS search_document USING fts5('
+            'title, body, question_id UNINDEXED)')
+        schema_editor.execute(
+            f'INSERT INTO search_document (rowid, title, body, question_id) '
+            f'SELECT id * 2, title, description, id FROM {question}')
+        schema_editor.execute(
+            f'INSERT INTO search_document (rowid, title, body, question_id) '
+            f"SELECT id * 2 + 1, '', description, question_id FROM {answer}")
+    elif vendor == 'mysql':
+        schema_editor.execute(
+            f'CREATE FULLTEXT INDEX question_fulltext '
+            f'ON {question} (title, description)')
+        schema_editor.execute(
+            f'CREATE FULLTEXT INDEX answer_fulltext ON {answer} (description)')
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    question = apps.get_model('questions', 'Question')._meta.db_table
+    answer = apps.get_model('questions', 'Answer')._meta.db_table
+    if vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS search_document')
+    elif vendor == 'mysql':
+        schema_editor.execute(f'DROP INDEX question_fulltext ON {question}')
+        schema_editor.execute(f'DROP INDEX answer_fulltext ON {answer}')
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('questions', '0003_question_update_date_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,52 @@
+import re
+
+
+# 匹配双引号中的短语或者单个词
+TOKEN_RE = re.compile(r'"([^"]*)"|(\S+)')
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class Term:
+    """查询语句中的一个词或短语
+    """
+
+    def __init__(self, words, phrase=False):
+        self.words = words
+        self.phrase = phrase
+
+    @property
+    def text(self):
+        return ' '.join(self.words)
+
+    def __eq__(self, other):
+        return (isinstance(other, Term) and self.words == other.words and
+                self.phrase == other.phrase)
+
+    def __repr__(self):
+        return f'<Term: {self.text!r}{" phrase" if self.phrase else ""}>'
+
+
+def parse_query(querystring):
+    """将搜索框中的查询语句解析为 "OR 连接的若干组,每组内 AND 连接的若干词"
+
+    语法与常见搜索引擎一致:
+        python django       两个词都要出现
+        python OR django    出现任意一个即可
+        "class based view"  短语,词序必须一致
+    AND 的优先级高于 OR ,返回值是二维列表,例如 [[Term], [Term, Term]]
+    """
+    groups = [[]]
+    for match in TOKEN_RE.finditer(querystring):
+        phrase, word = match.groups()
+        if word == 'OR':
+            if groups[-1]:
+                groups.append([])
+            continue
+        if word == 'AND':
+            continue
+        words = WORD_RE.findall((phrase if phrase is not None else word).lower())
+        if not words:
+            continue
+        # 带连字符的词(例如 class-based)按短语处理
+        groups[-1].append(Term(words, phrase=len(words) > 1))
+    return [group for group in groups if group]
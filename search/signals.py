@@ -0,0 +1,43 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+
+from questions.models import Question, Answer
+from . import tasks, typeahead
+
+
+# 问题和答案保存或删除后,通过任务队列增量更新搜索索引
+# 索引的更新不占用请求的时间,由 python manage.py run_worker 执行
+# 这些函数在 apps.py 中 SearchConfig 类的 ready 方法里导入并连接
+def index_question(sender, instance, **kwargs):
+    tasks.index_question.enqueue(instance.pk)
+
+
+def index_answer(sender, instance, **kwargs):
+    tasks.index_answer.enqueue(instance.pk)
+
+
+def remove_question(sender, instance, **kwargs):
+    tasks.remove_question.enqueue(instance.pk)
+
+
+def remove_answer(sender, instance, **kwargs):
+    tasks.remove_answer.enqueue(instance.pk)
+
+
+# 本进程的标题前缀索引在事务提交后立即更新,其它进程定期读取变化
+def update_typeahead(sender, instance, **kwargs):
+    transaction.on_commit(lambda: typeahead.index.update(
+        instance.pk, instance.title, instance.answer_count))
+
+
+def remove_typeahead(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: typeahead.index.remove(pk))
+
+
+post_save.connect(index_question, sender=Question)
+post_save.connect(index_answer, sender=Answer)
+post_delete.connect(remove_question, sender=Question)
+post_delete.connect(remove_answer, sender=Answer)
+post_save.connect(update_typeahead, sender=Question)
+post_delete.connect(remove_typeahead, sender=Question)
@@ -0,0 +1,29 @@
+from questions.models import Question, Answer
+from tasks.queue import task
+from .backends import get_backend
+
+
+# 索引任务只传主键,执行时读取最新的数据,重复执行的结果相同
+# 执行前数据已被删除时什么也不做,删除任务会移除对应的文档
+@task('search.index_question')
+def index_question(question_id):
+    question = Question.objects.filter(pk=question_id).first()
+    if question is not None:
+        get_backend().index_question(question)
+
+
+@task('search.index_answer')
+def index_answer(answer_id):
+    answer = Answer.objects.filter(pk=answer_id).first()
+    if answer is not None:
+        get_backend().index_answer(answer)
+
+
+@task('search.remove_question')
+def remove_question(question_id):
+    get_backend().remove_question(Question(pk=question_id))
+
+
+@task('search.remove_answer')
+def remove_answer(answer_id):
+    get_backend().remove_answer(Answer(pk=answer_id))
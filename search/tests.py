@@ -1,3 +1,233 @@
-from django.test import TestCase
+import os
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from authentication.models import User
+from questions.models import Question, Answer
+from . import typeahead
+from .backends.memory import InProcessBM25Backend
+from .backends.base import answer_rowid, question_rowid
+from .backends.sqlite_fts import SQLiteFTSBackend
+from .query import Term, parse_query
+
+
+class ParseQueryTest(TestCase):
+
+    def test_terms_are_grouped_by_or(self):
+        groups = parse_query('Django views OR "class based" orm')
+        self.assertEqual(groups, [
+            [Term(['django']), Term(['views'])],
+            [Term(['class', 'based'], phrase=True), Term(['orm'])],
+        ])
+
+    def test_empty_groups_are_dropped(self):
+        self.assertEqual(parse_query('OR !! OR'), [])
+
+
+@override_settings(PASSWORD_HASHERS=[
+    'django.contrib.auth.hashers.MD5PasswordHasher'])
+class SQLiteFTSBackendTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('asker', 'asker@example.com', 'pw')
+        cls.title_match = Question.objects.create(
+            user=cls.user, title='Django migrations',
+            description='How do I squash them?')
+        cls.body_match = Question.objects.create(
+            user=cls.user, title='Database question',
+            description='Are django migrations reversible?')
+        cls.other = Question.objects.create(
+            user=cls.user, title='Flask routing',
+            description='Blueprints and views')
+
+    def search(self, querystring, **kwargs):
+        results = SQLiteFTSBackend().search(parse_query(querystring), **kwargs)
+        return [q.pk for q in results], results.total
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(self.search('django migrations'),
+                         ([self.title_match.pk, self.body_match.pk], 2))
+
+    def test_or_and_phrase_queries(self):
+        ids, total = self.search('"migrations reversible" OR blueprints')
+        self.assertEqual(sorted(ids), [self.body_match.pk, self.other.pk])
+        self.assertEqual(self.search('"reversible migrations"'), ([], 0))
+
+    def test_pagination(self):
+        ids, total = self.search('django OR flask', page=2, per_page=2)
+        self.assertEqual(len(ids), 1)
+        self.assertEqual(total, 3)
+
+    def test_index_follows_saves_and_deletes(self):
+        answer = Answer.objects.create(
+            user=self.user, question=self.other, description='Use werkzeug')
+        self.assertEqual(self.search('werkzeug'), ([self.other.pk], 1))
+        answer.delete()
+        self.assertEqual(self.search('werkzeug'), ([], 0))
+
+        self.other.title = 'Flask blueprints'
+        self.other.save()
+        self.assertEqual(self.search('routing'), ([], 0))
+
+    def test_view_uses_backend(self):
+        response = self.client.get(reverse('search:search'), {'q': 'squash'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['count'], 1)
+        self.assertContains(response, 'Django migrations')
+
+
+@override_settings(PASSWORD_HASHERS=[
+    'django.contrib.auth.hashers.MD5PasswordHasher'])
+class InProcessBM25BackendTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('asker', 'asker@example.com', 'pw')
+        cls.title_match = Question.objects.create(
+            user=cls.user, title='Django migrations',
+            description='How do I squash them?')
+        cls.body_match = Question.objects.create(
+            user=cls.user, title='Database question',
+            description='Are django migrations reversible?')
+        cls.other = Question.objects.create(
+            user=cls.user, title='Flask routing',
+            description='Blueprints and views')
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'test.idx')
+        self.backend = InProcessBM25Backend(self.path)
+        self.backend.rebuild()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def search(self, querystring, backend=None, **kwargs):
+        backend = backend or self.backend
+        results = backend.search(parse_query(querystring), **kwargs)
+        return [q.pk for q in results], results.total
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(self.search('django migrations'),
+                         ([self.title_match.pk, self.body_match.pk], 2))
+
+    def test_incremental_updates_are_shared_through_the_journal(self):
+        # 另一个进程中的后端实例映射同一个索引文件
+        reader = InProcessBM25Backend(self.path)
+        self.backend.index.put(answer_rowid(1000), self.other.pk,
+                               '', 'Use werkzeug')
+        self.assertEqual(self.search('werkzeug', reader), ([self.other.pk], 1))
+
+        self.backend.index.delete(question_rowid(self.title_match.pk))
+        self.assertEqual(self.search('django', reader),
+                         ([self.body_match.pk], 1))
+
+        # 重建之后日志被清空,新的索引段只包含数据库中的数据
+        self.backend.rebuild()
+        self.assertEqual(self.search('werkzeug', reader), ([], 0))
+        self.assertEqual(self.search('django', reader)[1], 2)
+
+
+@override_settings(PASSWORD_HASHERS=[
+    'django.contrib.auth.hashers.MD5PasswordHasher'])
+class TypeaheadTest(TestCase):
+    """搜索框输入提示的前缀索引
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('asker', 'asker@example.com', 'pw')
+        cls.questions = {}
+        for title, count in [('Django migrations', 5), ('Django models', 9),
+                             ('django  Admin', 1), ('Docker compose', 3),
+                             ('Djangoism', 0), ('Flask blueprints', 7)]:
+            question = Question.objects.create(
+                user=cls.user, title=title, description='Description')
+            Question.objects.filter(pk=question.pk).update(answer_count=count)
+            cls.questions[title] = question.pk
+
+    def setUp(self):
+        self.index = typeahead.TypeaheadIndex(cache_size=2)
+        patcher = mock.patch.object(typeahead, 'index', self.index)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def titles(self, text):
+        return [title for pk, title in self.index.suggest(text)]
+
+    def test_prefix_ordered_by_answers(self):
+        self.assertEqual(self.titles('DJANGO'), [
+            'Django models', 'Django migrations', 'django  Admin', 'Djangoism'])
+        self.assertEqual(self.titles('django '), [
+            'Django models', 'Django migrations', 'django  Admin'])
+        self.assertEqual(self.titles('django a'), ['django  Admin'])
+        self.assertEqual(self.titles('d')[-1], 'Djangoism')
+        self.assertEqual(self.titles('python'), [])
+        self.assertEqual(self.titles('  '), [])
+        self.assertEqual(self.index.suggest('django', limit=1),
+                         [(self.questions['Django models'], 'Django models')])
+
+    def test_snapshot_top_k(self):
+        rows = [(pk, f'title {pk % 7}', pk % 10) for pk in range(1, 500)]
+        snapshot = typeahead.Snapshot(rows)
+        expected = sorted(((count, pk, title) for pk, title, count in rows
+                           if title.startswith('title 3')), reverse=True)
+        self.assertEqual(snapshot.top('title 3', 20, set()), expected[:20])
+        skip = {pk for _, pk, _ in expected[:5]}
+        self.assertEqual(snapshot.top('title 3', 3, skip), expected[5:8])
+
+    def test_snapshot_astral_characters(self):
+        # U+FFFF 以上的字符排在 '\uffff' 之后,仍然属于同一个前缀
+        snapshot = typeahead.Snapshot([
+            (1, 'party \U0001F389', 2), (2, 'party \uffff', 1),
+            (3, 'partz', 3)])
+        self.assertEqual([pk for _, pk, _ in snapshot.top('party', 5, set())],
+                         [1, 2])
+
+    def test_hot_prefixes_are_cached(self):
+        self.titles('django')
+        with self.assertNumQueries(0):
+            self.titles('django')
+        self.titles('docker')
+        self.titles('flask')
+        # 缓存只保留最近使用的两个前缀
+        self.assertEqual(list(self.index.cache), ['docker', 'flask'])
+
+    def test_updates(self):
+        self.titles('django')
+        self.index.update(self.questions['Djangoism'], 'Djangoism', 20)
+        self.assertEqual(self.titles('django')[0], 'Djangoism')
+        self.index.update(self.questions['Django models'], 'Flask models', 9)
+        self.assertNotIn('Django models', self.titles('django'))
+        self.assertEqual(self.titles('flask'),
+                         ['Flask models', 'Flask blueprints'])
+        self.index.remove(self.questions['Docker compose'])
+        self.assertEqual(self.titles('do'), [])
+
+    def test_refresh_reads_other_processes(self):
+        self.titles('django')
+        # 测试中的事务不会提交,信号注册的 on_commit 不会执行,与其它进程写入相同
+        question = Question.objects.create(
+            user=self.user, title='Django signals', description='Description')
+        Question.objects.filter(pk=self.questions['Djangoism']).update(
+            answer_count=10, last_activity=timezone.now())
+        self.assertNotIn('Django signals', self.titles('django'))
+        with self.assertNumQueries(1):
+            self.index.refresh(force=True)
+        self.assertEqual(self.titles('django sig'), ['Django signals'])
+        self.assertEqual(self.titles('django')[0], 'Djangoism')
+        self.assertEqual(self.index.delta[question.pk][1], 0)
+
+    def test_endpoint(self):
+        response = self.client.get(reverse('search:typeahead'), {'q': 'fla'})
+        pk = self.questions['Flask blueprints']
+        self.assertEqual(response.json(), {'questions': [{
+            'id': pk, 'title': 'Flask blueprints',
+            'url': reverse('questions:question_detail', args=[pk])}]})
+        with self.assertNumQueries(0):
+            self.client.get(reverse('search:typeahead'), {'q': 'dj'})
@@ -0,0 +1,261 @@
+import bisect
+import heapq
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from questions.models import Question
+
+
+# 前缀索引中的问题数,按答案数从多到少选取,内存占用与问题总数无关
+SIZE = getattr(settings, 'TYPEAHEAD_SIZE', 100000)
+# 每次返回的标题数
+LIMIT = 8
+# 每个进程缓存的热门前缀数
+CACHE_SIZE = getattr(settings, 'TYPEAHEAD_CACHE_SIZE', 10000)
+# 每隔 REFRESH_INTERVAL 秒查询一次其它进程写入的新问题和答案数的变化
+# 增量超过 MAX_DELTA 个或者距离上次重建超过 REBUILD_INTERVAL 秒时重建索引
+REFRESH_INTERVAL = getattr(settings, 'TYPEAHEAD_REFRESH_INTERVAL', 30)
+REBUILD_INTERVAL = 3600
+MAX_DELTA = 5000
+
+
+def normalize(text):
+    """转为小写并合并空白字符,末尾的空格表示上一个词已经输入完
+    """
+    key = ' '.join(text.lower().split())
+    if key and text[-1:].isspace():
+        key += ' '
+    return key
+
+
+class Snapshot:
+    """只读的前缀索引:按标题排序的数组和按热度查询区间最大值的稀疏表
+
+    前缀相同的标题在排序后的数组中是连续的一段,用 bisect 找到这一段
+    稀疏表 table[j][i] 是区间 [i, i + 2^j) 中最高的排名,任意区间的最大值
+    都可以用两个重叠的子区间 O(1) 得到,取前 k 个只需要 O(k log k)
+    """
+
+    def __init__(self, rows):
+        # rows 为 (主键, 标题, 答案数),答案数相同时较新的问题优先
+        rows = sorted(rows, key=lambda row: (row[2], row[0]))
+        entries = sorted(
+            (normalize(title), rank, pk, title, count)
+            for rank, (pk, title, count) in enumerate(rows))
+        self.keys = [entry[0] for entry in entries]
+        self.ranks = array('l', (entry[1] for entry in entries))
+        self.ids = array('q', (entry[2] for entry in entries))
+        self.titles = [entry[3] for entry in entries]
+        self.counts = array('l', (entry[4] for entry in entries))
+        self.positions = {pk: i for i, pk in enumerate(self.ids)}
+        # 排名 -> 数组中的位置
+        self.by_rank = array('l', bytes(self.ranks.itemsize * len(entries)))
+        for position, rank in enumerate(self.ranks):
+            self.by_rank[rank] = position
+        # 稀疏表中保存的是排名,排名越大越热门,每一层用 map(max, ...) 生成
+        self.table = [self.ranks]
+        width = 1
+        while width * 2 <= len(entries):
+            previous = self.table[-1]
+            self.table.append(array('l', map(
+                max, previous[:len(previous) - width], previous[width:])))
+            width *= 2
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _range_max(self, low, high):
+        """区间 [low, high) 中最热门的位置
+        """
+        level = (high - low).bit_length() - 1
+        row = self.table[level]
+        return self.by_rank[max(row[low], row[high - (1 << level)])]
+
+    def key_of(self, pk):
+        position = self.positions.get(pk)
+        return None if position is None else self.keys[position]
+
+    def top(self, key, limit, skip):
+        """前缀为 key 的最热门的 limit 个标题,跳过 skip 中的问题
+
+        返回 [(答案数, 主键, 标题), ...] ,按答案数和主键从大到小排列
+        """
+        low = bisect.bisect_left(self.keys, key)
+        # 前缀之后可能是 U+FFFF 以上的字符(emoji 等),上界使用最大的码位
+        high = bisect.bisect_left(self.keys, key + chr(0x10FFFF), low)
+        heap = []
+        if low < high:
+            best = self._range_max(low, high)
+            heap.append((-self.ranks[best], best, low, high))
+        result = []
+        while heap and len(result) < limit:
+            _, best, low, high = heapq.heappop(heap)
+            if self.ids[best] not in skip:
+                result.append((self.counts[best], self.ids[best],
+                               self.titles[best]))
+            for start, end in ((low, best), (best + 1, high)):
+                if start < end:
+                    other = self._range_max(start, end)
+                    heapq.heappush(
+                        heap, (-self.ranks[other], other, start, end))
+        return result
+
+
+class TypeaheadIndex:
+    """每个进程一个的标题前缀索引
+
+    由只读的 Snapshot 和少量增量组成:
+    本进程中保存或删除的问题由 search.signals 立即写入增量
+    其它进程的写入每隔 REFRESH_INTERVAL 秒按 last_activity 查询一次
+    (新问题和新答案都会更新这个字段,查询使用它的索引,删除答案时这个字段会回退,
+    其它进程中答案数的减少要等到重建时才读到)
+    增量太多或者时间太久后重建,同一时间只有一个线程重建,其它线程继续使用旧的索引
+    热门前缀的结果保存在 LRU 缓存中,增量更新时只清除受影响的前缀
+    """
+
+    def __init__(self, size=SIZE, cache_size=CACHE_SIZE):
+        self.size = size
+        self.cache_size = cache_size
+        self.lock = threading.Lock()
+        self.snapshot = None
+        self.building = False
+        self.built_at = self.refreshed_at = 0
+        self.watermark = None
+        self._reset()
+
+    def _reset(self):
+        # 主键 -> (标准化的标题, 答案数, 标题) ,覆盖 Snapshot 中的同一个问题
+        self.delta = {}
+        self.removed = set()
+        self.cache = OrderedDict()
+
+    def rebuild(self):
+        """读取最热门的 size 个问题,替换当前的索引
+        """
+        started = time.monotonic()
+        # 提前一段时间作为起点,重建期间提交的修改会在下次刷新时读到
+        watermark = timezone.now() - timedelta(seconds=REFRESH_INTERVAL)
+        snapshot = Snapshot(Question.objects.order_by(
+            '-answer_count', '-create_date', '-id').values_list(
+                'id', 'title', 'answer_count')[:self.size])
+        with self.lock:
+            self.snapshot = snapshot
+            self._reset()
+            self.watermark = watermark
+            self.built_at = self.refreshed_at = started
+
+    def refresh(self, force=False):
+        """读取其它进程写入的变化,需要时重建
+
+        参数 force 为真时不检查时间间隔,用于测试和管理命令
+        """
+        now = time.monotonic()
+        if self.snapshot is None or now - self.built_at > REBUILD_INTERVAL:
+            self.rebuild()
+            return
+        if not force and now - self.refreshed_at < REFRESH_INTERVAL:
+            return
+        self.refreshed_at = now
+        watermark = timezone.now() - timedelta(seconds=REFRESH_INTERVAL)
+        rows = list(Question.objects.filter(
+            last_activity__gt=self.watermark).order_by().values_list(
+                'id', 'title', 'answer_count')[:MAX_DELTA])
+        if len(rows) + len(self.delta) >= MAX_DELTA:
+            self.rebuild()
+            return
+        for pk, title, count in rows:
+            self.update(pk, title, count)
+        self.watermark = watermark
+
+    def _maybe_refresh(self):
+        if self.building:
+            return
+        now = time.monotonic()
+        if self.snapshot is not None and \
+                now - self.refreshed_at < REFRESH_INTERVAL:
+            return
+        with self.lock:
+            if self.building:
+                return
+            self.building = True
+        try:
+            self.refresh()
+        finally:
+            self.building = False
+
+    def _invalidate(self, key):
+        for end in range(1, len(key) + 1):
+            self.cache.pop(key[:end], None)
+
+    def _key_of(self, pk):
+        old = self.delta.get(pk)
+        if old is not None:
+            return old[0]
+        return self.snapshot.key_of(pk) if self.snapshot else None
+
+    def update(self, pk, title, answer_count):
+        """问题保存后更新增量,新旧标题的每个前缀的缓存都失效
+
+        索引还没有构建时不需要记录,构建时会读到最新的数据
+        """
+        if self.snapshot is None:
+            return
+        key = normalize(title)
+        with self.lock:
+            old_key = self._key_of(pk)
+            self.delta[pk] = (key, answer_count, title)
+            self.removed.discard(pk)
+            self._invalidate(key)
+            if old_key and old_key != key:
+                self._invalidate(old_key)
+
+    def remove(self, pk):
+        """问题删除后不再出现在结果中
+        """
+        if self.snapshot is None:
+            return
+        with self.lock:
+            old_key = self._key_of(pk)
+            self.delta.pop(pk, None)
+            self.removed.add(pk)
+            if old_key:
+                self._invalidate(old_key)
+
+    def suggest(self, text, limit=LIMIT):
+        """前缀为 text 的最热门的问题,返回 [(主键, 标题), ...] ,最多 LIMIT 个
+
+        第一次调用时构建索引,之后按需读取其它进程的变化
+        """
+        key = normalize(text)
+        if not key:
+            return []
+        self._maybe_refresh()
+        with self.lock:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.cache.move_to_end(key)
+                return cached[:limit]
+            skip = self.removed.union(self.delta)
+            candidates = self.snapshot.top(key, LIMIT, skip) \
+                if self.snapshot else []
+            # 增量中的问题与索引中的问题一样按答案数和主键排序
+            candidates.extend(
+                (count, pk, title)
+                for pk, (other, count, title) in self.delta.items()
+                if other.startswith(key))
+            candidates.sort(reverse=True)
+            result = [(pk, title) for _, pk, title in candidates[:LIMIT]]
+            self.cache[key] = result
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return result[:limit]
+
+
+# 每个进程一个索引,由 search.views.typeahead 和 search.signals 使用
+index = TypeaheadIndex()
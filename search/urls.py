@@ -1,9 +1,10 @@
 from django.urls import include, path
 
-from .views import search
+from .views import search, typeahead
 
 app_name = 'search'
 
 urlpatterns = [
     path('search/', search, name='search'),
+    path('search/typeahead/', typeahead, name='typeahead'),
 ]
\ No newline at end of file
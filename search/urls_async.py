@@ -0,0 +1,11 @@
+from django.urls import path
+
+from .async_views import search, typeahead
+
+app_name = 'search'
+
+# ASGI 部署使用的路由,与 search.urls 相同,只是视图换成了异步版本
+urlpatterns = [
+    path('search/', search, name='search'),
+    path('search/typeahead/', typeahead, name='typeahead'),
+]
@@ -1,7 +1,14 @@
+from django.http import JsonResponse
 from django.shortcuts import render, redirect
-from django.db.models import Q
+from django.urls import reverse
 
-from questions.models import Question
+from . import typeahead as typeahead_index
+from .backends import get_backend
+from .query import parse_query
+
+
+# 搜索结果每页展示的问题数量
+RESULTS_PER_PAGE = 10
 
 
 def search(request):
@@ -20,20 +27,36 @@ def search(request):
     if len(querystring) == 0:
         return redirect('home')
 
-    # 利用 Question 映射类查询数据库,Q 类可以实现一些高级的查询方式
-    # 在 django.db.models.query_unilts 模块中定义了 Q 类
-    # filter 方法中有两个 Q 类的实例作为参数,用或符号 | 连接
-    # 意为查询数据库中符合任一条件的数据
-    results = {'questions': Question.objects.filter(
-        Q(title__icontains=querystring) |
-        Q(description__icontains=querystring))}
+    # 将查询语句解析为 OR 连接的若干组关键词,交给搜索后端执行
+    # 搜索后端使用全文索引,根据数据库类型自动选择
+    # 具体实现在 search.backends 包中
+    try:
+        page = int(request.GET.get('page', 1))
+    except ValueError:
+        page = 1
+    results = get_backend().search(
+        parse_query(querystring), page=page, per_page=RESULTS_PER_PAGE)
 
-    count = {'questions': results['questions'].count()}
     # 创建字典对象传给前端模板文件
     context = {
         'querystring': querystring,
-        'count': count['questions'],
-        'results': results['questions']
+        'count': results.total,
+        'results': results,
+        'page_obj': results,
     }
 
-    return render(request, 'search/results.html', context)
\ No newline at end of file
+    return render(request, 'search/results.html', context)
+
+
+def typeahead(request):
+    """搜索框的输入提示,返回标题以 q 开头的最热门的问题
+
+    返回 {"questions": [{"id": 1, "title": "...", "url": "..."}, ...]}
+    结果来自进程内的前缀索引,通常不需要查询数据库
+    """
+    prefix = request.GET.get('q', '')[:100]
+    return JsonResponse({'questions': [{
+        'id': pk,
+        'title': title,
+        'url': reverse('questions:question_detail', args=[pk]),
+    } for pk, title in typeahead_index.index.suggest(prefix)]})
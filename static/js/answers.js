@@ -0,0 +1,31 @@
+// 问题详情页的 "加载更多答案" 按钮
+// 每次点击请求下一批答案的 HTML ,追加到答案列表末尾
+// 服务器返回 {"html": "...", "next": "下一批的游标或 null"}
+document.addEventListener('click', function (event) {
+  var button = event.target.closest('.load-more-answers');
+  if (!button || button.disabled) {
+    return;
+  }
+  button.disabled = true;
+  var url = button.dataset.url + '?cursor=' + encodeURIComponent(button.dataset.cursor);
+  fetch(url, {headers: {'Accept': 'application/json'}, credentials: 'same-origin'})
+    .then(function (response) {
+      if (!response.ok) {
+        throw new Error(response.statusText);
+      }
+      return response.json();
+    })
+    .then(function (data) {
+      document.querySelector(button.dataset.target)
+        .insertAdjacentHTML('beforeend', data.html);
+      if (data.next) {
+        button.dataset.cursor = data.next;
+        button.disabled = false;
+      } else {
+        button.remove();
+      }
+    })
+    .catch(function () {
+      button.disabled = false;
+    });
+});
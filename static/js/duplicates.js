@@ -0,0 +1,49 @@
+// 提问页面输入标题时,在标题下方列出相似的已有问题
+// 停止输入 300 毫秒后请求一次,只显示最后一次请求的结果
+// 服务器返回 {"questions": [{"title": "...", "url": "...", "answers": 3}, ...]}
+document.addEventListener('DOMContentLoaded', function () {
+  var list = document.querySelector('.duplicate-questions');
+  var input = list && document.querySelector(list.dataset.input);
+  if (!input) {
+    return;
+  }
+  var timer = null;
+  var latest = 0;
+
+  function render(questions) {
+    list.textContent = '';
+    questions.forEach(function (question) {
+      var item = document.createElement('li');
+      var link = document.createElement('a');
+      link.href = question.url;
+      link.target = '_blank';
+      link.textContent = question.title;
+      item.appendChild(link);
+      item.appendChild(document.createTextNode(' (' + question.answers + ')'));
+      list.appendChild(item);
+    });
+  }
+
+  function lookup() {
+    var request = ++latest;
+    var url = list.dataset.url + '?title=' + encodeURIComponent(input.value);
+    fetch(url, {headers: {'Accept': 'application/json'}, credentials: 'same-origin'})
+      .then(function (response) {
+        if (!response.ok) {
+          throw new Error(response.statusText);
+        }
+        return response.json();
+      })
+      .then(function (data) {
+        if (request === latest) {
+          render(data.questions);
+        }
+      })
+      .catch(function () {});
+  }
+
+  input.addEventListener('input', function () {
+    clearTimeout(timer);
+    timer = setTimeout(lookup, 300);
+  });
+});
@@ -0,0 +1,56 @@
+// 导航栏搜索框的输入提示
+// 停止输入 150 毫秒后请求一次,只显示最后一次请求的结果,点击提示直接打开问题
+// 服务器返回 {"questions": [{"title": "...", "url": "..."}, ...]}
+(function () {
+  var input = document.querySelector('input[data-typeahead-url]');
+  var menu = input && input.parentNode.querySelector('.typeahead-menu');
+  if (!menu) {
+    return;
+  }
+  var timer = null;
+  var latest = 0;
+
+  function render(questions) {
+    menu.textContent = '';
+    questions.forEach(function (question) {
+      var item = document.createElement('li');
+      var link = document.createElement('a');
+      link.href = question.url;
+      link.textContent = question.title;
+      item.appendChild(link);
+      menu.appendChild(item);
+    });
+    menu.style.display = questions.length ? 'block' : 'none';
+  }
+
+  function lookup() {
+    var request = ++latest;
+    if (!input.value.trim()) {
+      render([]);
+      return;
+    }
+    var url = input.dataset.typeaheadUrl + '?q=' + encodeURIComponent(input.value);
+    fetch(url, {headers: {'Accept': 'application/json'}, credentials: 'same-origin'})
+      .then(function (response) {
+        if (!response.ok) {
+          throw new Error(response.statusText);
+        }
+        return response.json();
+      })
+      .then(function (data) {
+        if (request === latest) {
+          render(data.questions);
+        }
+      })
+      .catch(function () {});
+  }
+
+  input.addEventListener('input', function () {
+    clearTimeout(timer);
+    timer = setTimeout(lookup, 150);
+  });
+  input.addEventListener('blur', function () {
+    // 等待点击提示的事件处理完再隐藏
+    setTimeout(function () { menu.style.display = 'none'; }, 200);
+  });
+})();
@@ -0,0 +1,15 @@
+from django.contrib import admin
+
+from .models import Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'run_at',
+                    'finished_at', 'worker')
+    list_filter = ('status',)
+    search_fields = ('=key',)
+    ordering = ('-id',)
+    show_full_result_count = False
+    readonly_fields = ('create_date', 'started_at', 'finished_at', 'worker',
+                       'last_error')
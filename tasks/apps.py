@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class TasksConfig(AppConfig):
+    name = 'tasks'
+
+    def ready(self):
+        # 导入每个应用的 tasks 模块,其中用 @task 装饰的函数会被注册
+        autodiscover_modules('tasks')
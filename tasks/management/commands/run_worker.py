@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from tasks.worker import Worker
+
+
+class Command(BaseCommand):
+    """启动任务队列的 worker
+
+    python manage.py run_worker --concurrency 8
+    python manage.py run_worker --processes --concurrency 2
+    可以在多台服务器上同时运行多个 worker
+    """
+
+    help = 'Run queued background tasks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=4,
+            help='Number of tasks executed at the same time.')
+        parser.add_argument(
+            '--processes', action='store_true',
+            help='Use a process pool instead of a thread pool.')
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help='Seconds to wait when the queue is empty.')
+        parser.add_argument(
+            '--stats-interval', type=float, default=60.0,
+            help='Seconds between throughput reports, 0 to disable.')
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit when no task is due instead of waiting for more.')
+
+    def handle(self, *args, **options):
+        worker = Worker(
+            concurrency=options['concurrency'],
+            processes=options['processes'],
+            poll_interval=options['poll_interval'],
+            stats_interval=options['stats_interval'],
+            log=self.stdout.write)
+        try:
+            worker.run(once=options['once'])
+        except KeyboardInterrupt:
+            self.stdout.write(worker.stats.summary())
@@ -0,0 +1,232 @@
+import logging
+import random
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Task
+
+
+logger = logging.getLogger(__name__)
+
+# 任务默认的最大执行次数,包括第一次执行
+MAX_ATTEMPTS = getattr(settings, 'TASKS_MAX_ATTEMPTS', 5)
+# 失败后第 n 次重试前等待 BACKOFF_BASE * 2 ^ (n - 1) 秒,最多 BACKOFF_MAX 秒
+BACKOFF_BASE = getattr(settings, 'TASKS_BACKOFF_BASE', 5)
+BACKOFF_MAX = getattr(settings, 'TASKS_BACKOFF_MAX', 3600)
+# 执行时间超过这么多秒的任务认为 worker 已经退出,重新放回队列
+STALE_AFTER = getattr(settings, 'TASKS_STALE_AFTER', 600)
+# 执行成功的任务保留的天数,在此期间相同的幂等键不会再次写入
+KEEP_DAYS = getattr(settings, 'TASKS_KEEP_DAYS', 7)
+
+# 任务注册名 -> TaskFunction
+registry = {}
+
+
+class TaskFunction:
+    """用 @task 装饰后的函数
+
+    直接调用时同步执行原函数,调用 enqueue 方法时写入任务队列
+    """
+
+    def __init__(self, func, name, max_attempts):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, *args, key=None, delay=0, **kwargs):
+        return enqueue(self.name, args, kwargs, key=key, delay=delay,
+                       max_attempts=self.max_attempts)
+
+    def enqueue_many(self, calls, delay=0):
+        return enqueue_many(self.name, calls, delay=delay,
+                            max_attempts=self.max_attempts)
+
+    def __repr__(self):
+        return f'<TaskFunction {self.name}>'
+
+
+def task(name=None, max_attempts=MAX_ATTEMPTS):
+    """装饰器,将函数注册为任务
+
+    参数必须可以序列化为 JSON ,通常只传主键,执行时再从数据库读取最新的数据
+    任务可能因为重试而执行多次,函数需要保证重复执行的结果相同
+    """
+    def decorator(func):
+        task_name = name or f'{func.__module__}.{func.__name__}'
+        registry[task_name] = TaskFunction(func, task_name, max_attempts)
+        return registry[task_name]
+    return decorator
+
+
+def is_eager(delay=0):
+    """settings.TASKS_EAGER 为真时不写入队列,在调用 enqueue 时直接执行
+    用于开发环境和测试,不需要启动 worker
+
+    延迟执行的任务(例如合并一段时间内通知的摘要邮件)仍然写入队列
+    立即执行会失去延迟的意义,需要时用 run_worker --once 执行
+    """
+    return not delay and getattr(settings, 'TASKS_EAGER', False)
+
+
+def enqueue(name, args=(), kwargs=None, key=None, delay=0,
+            max_attempts=MAX_ATTEMPTS):
+    """将任务写入队列,返回 Task 实例
+
+    任务与调用者的其它修改在同一个事务中写入,事务回滚时任务也不存在
+    事务提交之前 worker 看不到这个任务,不会读到未提交的数据
+    参数 key 为幂等键,已有相同键的任务时不再写入,返回 None
+    """
+    if name not in registry:
+        raise LookupError(f'Unknown task: {name}')
+    kwargs = kwargs or {}
+    if is_eager(delay):
+        registry[name](*args, **kwargs)
+        return None
+    try:
+        with transaction.atomic():
+            return Task.objects.create(
+                name=name, args=list(args), kwargs=kwargs, key=key,
+                max_attempts=max_attempts,
+                run_at=timezone.now() + timedelta(seconds=delay))
+    except IntegrityError:
+        if key is None or not Task.objects.filter(key=key).exists():
+            raise
+        return None
+
+
+def enqueue_many(name, calls, delay=0, max_attempts=MAX_ATTEMPTS):
+    """用一条 INSERT 语句写入多个同名任务,calls 是 (参数元组, 幂等键) 的列表
+
+    幂等键已存在的任务被忽略,用于批量发送通知等场景
+    """
+    if name not in registry:
+        raise LookupError(f'Unknown task: {name}')
+    if is_eager(delay):
+        for args, key in calls:
+            registry[name](*args)
+        return
+    # 先查询已存在的幂等键,突发的大量重复任务不需要构造和发送
+    existing = set(Task.objects.filter(
+        key__in=[key for args, key in calls if key is not None]).values_list(
+            'key', flat=True))
+    run_at = timezone.now() + timedelta(seconds=delay)
+    Task.objects.bulk_create([
+        Task(name=name, args=list(args), key=key, run_at=run_at,
+             max_attempts=max_attempts)
+        for args, key in calls if key is None or key not in existing],
+        ignore_conflicts=True)
+
+
+def backoff(attempts):
+    """第 attempts 次执行失败后到下一次执行之间的秒数,带随机抖动
+    """
+    seconds = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+    return seconds * random.uniform(0.5, 1.0)
+
+
+def claim(worker, limit):
+    """领取最多 limit 个到期的任务,返回任务的主键列表
+
+    数据库支持 SKIP LOCKED 时,在一个事务中锁定并领取,多个 worker 互不等待
+    否则(例如 SQLite)每个任务用带状态条件的 UPDATE 领取,不会被领取两次
+    """
+    now = timezone.now()
+    queryset = Task.objects.filter(
+        status=Task.PENDING, run_at__lte=now).order_by('run_at', 'id')
+    changes = {'status': Task.RUNNING, 'worker': worker, 'started_at': now,
+               'attempts': F('attempts') + 1}
+    if connections[queryset.db].features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(queryset.select_for_update(skip_locked=True).values_list(
+                'pk', flat=True)[:limit])
+            Task.objects.filter(pk__in=ids).update(**changes)
+        return ids
+    ids = list(queryset.values_list('pk', flat=True)[:limit])
+    return [pk for pk in ids if Task.objects.filter(
+        pk=pk, status=Task.PENDING).update(**changes)]
+
+
+def execute(task_id):
+    """执行一个已领取的任务,返回 (任务名, 是否成功, 耗时秒数)
+
+    任务函数在事务中执行,其中写入的后续任务在成功时才会提交
+    失败时按 backoff 推迟后重试,达到最大次数后标记为失败
+    """
+    task = Task.objects.get(pk=task_id)
+    started = time.perf_counter()
+    try:
+        function = registry.get(task.name)
+        if function is None:
+            raise LookupError(f'Unknown task: {task.name}')
+        with transaction.atomic():
+            function(*task.args, **task.kwargs)
+    except Exception:
+        elapsed = time.perf_counter() - started
+        error = traceback.format_exc()
+        now = timezone.now()
+        if task.attempts < task.max_attempts:
+            logger.warning('Task %s failed, attempt %s of %s', task,
+                           task.attempts, task.max_attempts)
+            Task.objects.filter(pk=task.pk).update(
+                status=Task.PENDING, last_error=error,
+                run_at=now + timedelta(seconds=backoff(task.attempts)))
+        else:
+            logger.error('Task %s failed permanently:\n%s', task, error)
+            Task.objects.filter(pk=task.pk).update(
+                status=Task.FAILED, last_error=error, finished_at=now)
+        return task.name, False, elapsed
+    elapsed = time.perf_counter() - started
+    Task.objects.filter(pk=task.pk).update(
+        status=Task.DONE, finished_at=timezone.now())
+    return task.name, True, elapsed
+
+
+def run_pending(worker='inline', limit=None):
+    """在当前线程中依次执行全部到期的任务,返回执行的任务数
+
+    用于测试和 run_worker --once 以外的一次性场景
+    """
+    count = 0
+    while limit is None or count < limit:
+        ids = claim(worker, 100 if limit is None else min(100, limit - count))
+        if not ids:
+            break
+        for pk in ids:
+            execute(pk)
+        count += len(ids)
+    return count
+
+
+def requeue_stale(timeout=STALE_AFTER):
+    """将执行时间过长的任务放回队列,返回任务数
+
+    worker 进程被杀死时,它领取的任务会一直停留在 running 状态
+    """
+    deadline = timezone.now() - timedelta(seconds=timeout)
+    return Task.objects.filter(
+        status=Task.RUNNING, started_at__lt=deadline).update(
+            status=Task.PENDING, run_at=timezone.now())
+
+
+def prune(days=KEEP_DAYS):
+    """删除已经执行成功超过 days 天的任务,返回删除的任务数
+    """
+    deadline = timezone.now() - timedelta(days=days)
+    count, _ = Task.objects.filter(
+        status=Task.DONE, finished_at__lt=deadline).delete()
+    return count
+
+
+def pending_count():
+    return Task.objects.filter(
+        status=Task.PENDING, run_at__lte=timezone.now()).count()
@@ -0,0 +1,146 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.db import close_old_connections, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from authentication.models import User
+from questions.models import Question
+from search.backends import get_backend
+from search.query import parse_query
+from . import queue
+from .models import Task
+from .worker import Worker
+
+
+calls = []
+
+
+@queue.task('tests.record')
+def record(value):
+    calls.append(value)
+
+
+@queue.task('tests.fail', max_attempts=2)
+def fail():
+    raise RuntimeError('boom')
+
+
+def inherits_connection():
+    """在进程池的子进程中执行,返回是否继承了父进程的数据库连接
+    """
+    inherited = connection.connection is not None
+    close_old_connections()
+    return inherited
+
+
+@override_settings(TASKS_EAGER=False)
+class QueueTest(TestCase):
+    """任务的写入、领取、重试和幂等键
+    """
+
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_and_run(self):
+        task = record.enqueue(1)
+        self.assertEqual((task.name, task.args, task.status),
+                         ('tests.record', [1], Task.PENDING))
+        self.assertEqual(calls, [])
+        self.assertEqual(queue.run_pending(), 1)
+        self.assertEqual(calls, [1])
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (Task.DONE, 1))
+        self.assertEqual(queue.run_pending(), 0)
+
+    def test_idempotency_key(self):
+        self.assertIsNotNone(record.enqueue(1, key='answer:1'))
+        self.assertIsNone(record.enqueue(1, key='answer:1'))
+        queue.run_pending()
+        self.assertIsNone(record.enqueue(1, key='answer:1'))
+        self.assertEqual(calls, [1])
+
+    def test_delay(self):
+        record.enqueue(1, delay=60)
+        self.assertEqual(queue.run_pending(), 0)
+
+    def test_retry_with_backoff(self):
+        task = fail.enqueue()
+        with self.assertLogs('tasks.queue', 'WARNING'):
+            queue.run_pending()
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (Task.PENDING, 1))
+        self.assertIn('RuntimeError: boom', task.last_error)
+        self.assertGreater(task.run_at, timezone.now())
+
+        Task.objects.filter(pk=task.pk).update(run_at=timezone.now())
+        with self.assertLogs('tasks.queue', 'ERROR'):
+            queue.run_pending()
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (Task.FAILED, 2))
+
+    def test_backoff_grows(self):
+        with mock.patch('random.uniform', return_value=1.0):
+            self.assertEqual(
+                [queue.backoff(n) for n in (1, 2, 3)],
+                [queue.BACKOFF_BASE * k for k in (1, 2, 4)])
+            self.assertEqual(queue.backoff(100), queue.BACKOFF_MAX)
+
+    def test_stale_tasks_are_requeued(self):
+        task = record.enqueue(1)
+        self.assertEqual(queue.claim('dead', 10), [task.pk])
+        self.assertEqual(queue.claim('other', 10), [])
+        Task.objects.filter(pk=task.pk).update(
+            started_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(queue.requeue_stale(timeout=60), 1)
+        self.assertEqual(queue.run_pending(), 1)
+
+    @override_settings(TASKS_EAGER=True)
+    def test_eager(self):
+        self.assertIsNone(record.enqueue(2))
+        self.assertEqual(calls, [2])
+        self.assertFalse(Task.objects.exists())
+
+    def test_search_index_is_deferred(self):
+        user = User.objects.create_user('asker', 'asker@example.com', 'pw')
+        question = Question.objects.create(
+            user=user, title='Deferred indexing', description='Description')
+        groups = parse_query('deferred')
+        self.assertEqual(get_backend().search_ids(groups, 0, 10), ([], 0))
+        queue.run_pending()
+        self.assertEqual(
+            get_backend().search_ids(groups, 0, 10), ([question.pk], 1))
+
+
+@override_settings(TASKS_EAGER=False)
+class WorkerTest(TransactionTestCase):
+    """worker 在线程池中执行任务
+    """
+
+    def test_run_once(self):
+        calls.clear()
+        for value in range(20):
+            record.enqueue(value)
+        fail.enqueue()
+        # 测试使用的 SQLite 内存数据库不允许多个线程同时写入
+        worker = Worker(concurrency=1, poll_interval=0.01)
+        with self.assertLogs('tasks.queue', 'WARNING'):
+            self.assertEqual(worker.run(once=True), 21)
+        self.assertEqual(sorted(calls), list(range(20)))
+        self.assertEqual(worker.stats.done['tests.record'], 20)
+        self.assertEqual(worker.stats.failed['tests.fail'], 1)
+        self.assertEqual(
+            Task.objects.filter(status=Task.DONE).count(), 20)
+
+    def test_process_pool_drops_inherited_connection(self):
+        # 子进程在父进程领取任务之后才 fork ,不能使用父进程已打开的连接
+        # 测试使用的 SQLite 内存数据库在子进程中是空的,所以不在子进程中执行任务
+        worker = Worker(concurrency=1, processes=True)
+        with worker.executor() as executor:
+            self.assertFalse(Task.objects.exists())
+            parent = connection.connection
+            self.assertIsNotNone(parent)
+            self.assertFalse(executor.submit(inherits_connection).result())
+        self.assertIs(connection.connection, parent)
+        self.assertFalse(Task.objects.exists())
@@ -0,0 +1,152 @@
+import logging
+import multiprocessing
+import os
+import socket
+import time
+from collections import defaultdict
+from concurrent.futures import (
+    FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait)
+
+from django.db import DatabaseError, close_old_connections, connections
+
+from . import queue
+
+
+logger = logging.getLogger(__name__)
+
+# 进程池的子进程从父进程继承的数据库连接,保存到子进程退出
+_inherited = []
+
+
+def _initialize_process():
+    """进程池子进程的初始化函数
+
+    进程池在第一次 submit 时才 fork ,此时父进程领取任务已经打开了数据库连接
+    子进程复制的连接对象与父进程共用同一个 socket ,在子进程中关闭或释放它
+    都会结束父进程的会话(MySQL 会发送 COM_QUIT)
+    所以只把它们从连接包装对象上取下并保留引用,子进程之后建立自己的连接
+    子进程由 os._exit 结束,这些对象不会被释放
+    """
+    for conn in connections.all():
+        if conn.connection is not None:
+            _inherited.append(conn.connection)
+            conn.connection = None
+
+
+def _execute(task_id):
+    """在线程池或进程池中执行任务,结束后关闭这个线程或进程的数据库连接
+    """
+    try:
+        return queue.execute(task_id)
+    finally:
+        close_old_connections()
+
+
+class Stats:
+    """worker 的吞吐量统计,按任务名累计
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.done = defaultdict(int)
+        self.failed = defaultdict(int)
+        self.seconds = defaultdict(float)
+
+    def record(self, name, ok, seconds):
+        (self.done if ok else self.failed)[name] += 1
+        self.seconds[name] += seconds
+
+    @property
+    def total(self):
+        return sum(self.done.values()) + sum(self.failed.values())
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        lines = [f'{self.total} tasks in {elapsed:.1f}s '
+                 f'({self.total / elapsed if elapsed else 0:.1f} tasks/s), '
+                 f'{sum(self.failed.values())} failed']
+        for name in sorted(self.seconds):
+            count = self.done[name] + self.failed[name]
+            lines.append(
+                f'  {name}: {self.done[name]} done, {self.failed[name]} '
+                f'failed, mean {self.seconds[name] / count * 1000:.1f} ms')
+        return '\n'.join(lines)
+
+
+class Worker:
+    """从任务队列领取任务,在线程池或进程池中并发执行
+
+    参数 processes 为真时使用进程池,适合 CPU 密集的任务(例如生成缩略图)
+    子进程由 fork 创建,继承已注册的任务函数,不继承父进程的数据库连接
+    """
+
+    def __init__(self, concurrency=4, processes=False, poll_interval=1.0,
+                 stats_interval=60.0, log=None):
+        self.concurrency = concurrency
+        self.processes = processes
+        self.poll_interval = poll_interval
+        self.stats_interval = stats_interval
+        self.log = log or (lambda message: None)
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+        self.stats = Stats()
+
+    def executor(self):
+        if self.processes:
+            return ProcessPoolExecutor(
+                self.concurrency,
+                mp_context=multiprocessing.get_context('fork'),
+                initializer=_initialize_process)
+        return ThreadPoolExecutor(self.concurrency, thread_name_prefix='task')
+
+    def maintain(self):
+        requeued = queue.requeue_stale()
+        pruned = queue.prune()
+        if requeued or pruned:
+            self.log(f'{requeued} stale tasks requeued, '
+                     f'{pruned} finished tasks pruned')
+
+    def run(self, once=False):
+        """持续执行任务,once 为真时队列中没有到期的任务后退出
+
+        返回执行的任务数
+        """
+        self.log(f'Worker {self.name} started, concurrency '
+                 f'{self.concurrency} ({"processes" if self.processes else "threads"})')
+        running = set()
+        last_stats = last_maintain = time.monotonic()
+        self.maintain()
+        with self.executor() as executor:
+            while True:
+                free = self.concurrency - len(running)
+                try:
+                    ids = queue.claim(self.name, free) if free else []
+                except DatabaseError:
+                    # 例如 SQLite 的写锁冲突,等待后重新领取
+                    logger.exception('Failed to claim tasks')
+                    ids = []
+                for pk in ids:
+                    running.add(executor.submit(_execute, pk))
+                if not running:
+                    if once:
+                        break
+                    time.sleep(self.poll_interval)
+                else:
+                    # 任意一个任务完成后立即领取新的任务填满空闲的线程
+                    done, running = wait(
+                        running, timeout=self.poll_interval,
+                        return_when=FIRST_COMPLETED)
+                    for future in done:
+                        try:
+                            self.stats.record(*future.result())
+                        except Exception:
+                            logger.exception('Failed to execute a task')
+
+                now = time.monotonic()
+                if now - last_maintain > queue.STALE_AFTER / 2:
+                    self.maintain()
+                    last_maintain = now
+                if self.stats_interval and now - last_stats > self.stats_interval:
+                    self.log(self.stats.summary())
+                    last_stats = now
+        self.log(self.stats.summary())
+        return self.stats.total
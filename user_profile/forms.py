@@ -0,0 +1,24 @@
+from django import forms
+from django.core.files.uploadedfile import UploadedFile
+
+from . import thumbnails
+from .models import Profile
+
+
+class ProfileForm(forms.ModelForm):
+    """编辑个人简介使用的表单类
+    """
+
+    class Meta:
+        model = Profile
+        fields = ['avatar', 'url', 'location', 'job']
+
+    def clean_avatar(self):
+        """只检查新上传的头像
+
+        没有上传新文件时字段的值是已保存的头像,不需要重新读取和解码
+        """
+        avatar = self.cleaned_data.get('avatar')
+        if isinstance(avatar, UploadedFile):
+            thumbnails.validate_avatar(avatar)
+        return avatar
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from user_profile import thumbnails
+from user_profile.models import Profile
+
+
+class Command(BaseCommand):
+    """为还没有缩略图的头像生成缩略图
+
+    用于处理缩略图功能上线前上传的头像,以及后台线程处理失败的头像
+    python manage.py generate_avatar_thumbnails
+    """
+
+    help = 'Create avatar thumbnails for profiles that do not have them yet.'
+
+    def handle(self, *args, **options):
+        default = Profile._meta.get_field('avatar').default
+        pending = Profile.objects.filter(avatar_hash='').exclude(
+            avatar=default).exclude(avatar='').values_list('pk', 'avatar')
+        count = 0
+        for pk, name in pending.iterator():
+            thumbnails.process(pk, name)
+            count += 1
+        self.stdout.write(f'{count} avatars processed')
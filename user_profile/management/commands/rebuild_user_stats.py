@@ -0,0 +1,83 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from authentication.models import User
+from questions.bulk import chunked
+from questions.models import Question, Answer
+from user_profile.models import UserStats
+
+
+class Command(BaseCommand):
+    """重新计算用户统计表中的提问数和回答数
+
+    信号接收函数在正常情况下保证数据一致
+    批量导入数据或直接修改数据库后执行:
+    python manage.py rebuild_user_stats
+    """
+
+    help = 'Recompute question_count and answer_count for all users.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of users checked per batch.')
+
+    def handle(self, *args, **options):
+        repaired = rebuild(options['batch_size'])
+        self.stdout.write(f'{repaired} user stats repaired')
+
+
+def count_by_user(model, user_ids):
+    return dict(
+        model.objects.filter(user__in=user_ids).order_by().values(
+            'user').annotate(n=Count('pk')).values_list('user', 'n'))
+
+
+def all_user_ids(batch_size):
+    """按主键顺序分批返回全部用户的主键
+    """
+    last_pk = 0
+    while True:
+        user_ids = list(
+            User.objects.filter(pk__gt=last_pk).order_by('pk').values_list(
+                'pk', flat=True)[:batch_size])
+        if not user_ids:
+            return
+        last_pk = user_ids[-1]
+        yield user_ids
+
+
+def rebuild(batch_size=1000, user_ids=None):
+    """分批计算用户的提问数和回答数,只写入缺失或不一致的行
+
+    参数 user_ids 只检查这些用户,批量导入后只检查导入数据中出现的用户
+    """
+    repaired = 0
+    if user_ids is None:
+        batches = all_user_ids(batch_size)
+    else:
+        batches = chunked(sorted(user_ids), batch_size)
+    for batch in batches:
+        questions = count_by_user(Question, batch)
+        answers = count_by_user(Answer, batch)
+        existing = UserStats.objects.in_bulk(batch)
+
+        created, changed = [], []
+        for pk in batch:
+            counts = (questions.get(pk, 0), answers.get(pk, 0))
+            stats = existing.get(pk)
+            if stats is None:
+                created.append(UserStats(
+                    user_id=pk, question_count=counts[0],
+                    answer_count=counts[1]))
+            elif (stats.question_count, stats.answer_count) != counts:
+                stats.question_count, stats.answer_count = counts
+                changed.append(stats)
+        if created or changed:
+            with transaction.atomic():
+                UserStats.objects.bulk_create(created)
+                UserStats.objects.bulk_update(
+                    changed, ['question_count', 'answer_count'])
+            repaired += len(created) + len(changed)
+    return repaired
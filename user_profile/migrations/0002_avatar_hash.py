@@ -0,0 +1,24 @@
+# Generated by Django 3.1.14 on 2026-10-17 18:02
+
+from django.db import migrations, models
+import user_profile.thumbnails
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_profile', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='avatar_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=40),
+        ),
+        migrations.AlterField(
+            model_name='profile',
+            name='avatar',
+            field=models.ImageField(default='img/user.png', upload_to='pic_folder', validators=[user_profile.thumbnails.validate_avatar]),
+        ),
+    ]
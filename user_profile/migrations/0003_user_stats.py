@@ -0,0 +1,49 @@
+# Generated by Django 3.1.14 on 2026-10-17 18:03
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def fill_stats(apps, schema_editor):
+    User = apps.get_model('authentication', 'User')
+    UserStats = apps.get_model('user_profile', 'UserStats')
+    Question = apps.get_model('questions', 'Question')
+    Answer = apps.get_model('questions', 'Answer')
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=pk) for pk in User.objects.values_list('pk', flat=True)],
+        batch_size=1000)
+
+    def count(model):
+        return Coalesce(Subquery(
+            model.objects.filter(user=OuterRef('pk')).order_by().values(
+                'user').annotate(n=Count('pk')).values('n'),
+            output_field=IntegerField()), 0)
+
+    UserStats.objects.update(
+        question_count=count(Question), answer_count=count(Answer))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0001_initial'),
+        ('user_profile', '0002_avatar_hash'),
+        ('questions', '0004_question_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='authentication.user')),
+                ('question_count', models.PositiveIntegerField(default=0)),
+                ('answer_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'user_stats',
+            },
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.1.14 on 2026-10-17 18:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_profile', '0003_user_stats'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='profile',
+            name='avatar',
+            field=models.ImageField(default='img/user.png', upload_to='pic_folder'),
+        ),
+    ]
@@ -1,7 +1,10 @@
 from django.db import models
 from django.db.models.signals import post_save
+from django.core.files.storage import default_storage
+from django.templatetags.static import static
 
 from authentication.models import User
+from . import thumbnails
 
 
 # 父类是 django.db.models.base.Model 类
@@ -13,14 +16,58 @@ class Profile(models.Model):
     url = models.CharField(max_length=50, null=True, blank=True)
     location = models.CharField(max_length=50, null=True, blank=True)
     job = models.CharField(max_length=50, null=True, blank=True)
+    # 上传文件的检查在 ProfileForm.clean_avatar 中,只对新上传的文件执行
     avatar = models.ImageField(upload_to='pic_folder', default='img/user.png')
+    # 头像原图内容的哈希值,缩略图生成后才会写入,为空表示使用默认头像
+    avatar_hash = models.CharField(max_length=40, blank=True, default='',
+                                   editable=False)
+
     class Meta:
         db_table = 'user_profile'
 
+    def get_picture(self, size=thumbnails.DEFAULT_SIZE, fmt='jpeg'):
+        """返回指定尺寸的头像地址
+
+        地址由 avatar_hash 拼接而成,不需要访问存储后端
+        模板中 {{ profile.get_picture }} 得到中等尺寸的 JPEG 头像
+        """
+        if not self.avatar_hash:
+            return static('img/user.png')
+        return default_storage.url(
+            thumbnails.thumbnail_name(self.avatar_hash, size, fmt))
+
+    @property
+    def pictures(self):
+        """全部尺寸和格式的头像地址
+
+        模板中使用 {{ profile.pictures.large.webp }} 这样的写法
+        """
+        return {size: {fmt: self.get_picture(size, fmt)
+                       for fmt in thumbnails.FORMATS}
+                for size in thumbnails.SIZES}
+
+
+class UserStats(models.Model):
+    """用户的活动统计
+
+    提问数和回答数是冗余数据,在问题和答案创建、删除时由 questions.signals 维护
+    个人主页不需要在问题表和答案表上执行 COUNT 查询
+    可以使用 python manage.py rebuild_user_stats 修复
+    """
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE,
+                                primary_key=True, related_name='stats')
+    question_count = models.PositiveIntegerField(default=0)
+    answer_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'user_stats'
+
 
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
         Profile.objects.create(user=instance)
+        UserStats.objects.create(user=instance)
 
 
 # 使用信号，在创建 user 时同时创建 profile
@@ -0,0 +1,9 @@
+from tasks.queue import task
+from . import thumbnails
+
+
+@task('user_profile.generate_thumbnails')
+def generate_thumbnails(profile_id, name):
+    """头像已被再次修改时 process 不会更新 Profile ,重复执行没有影响
+    """
+    thumbnails.process(profile_id, name)
@@ -1,3 +1,191 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from PIL import Image
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from authentication.models import User
+from questions.models import Question, Answer
+from . import thumbnails
+from .management.commands.rebuild_user_stats import rebuild
+from .models import Profile, UserStats
+
+
+def make_image(size=(400, 300), fmt='JPEG', exif=True):
+    image = Image.new('RGB', size, (200, 30, 30))
+    buffer = io.BytesIO()
+    options = {}
+    if exif:
+        data = Image.Exif()
+        data[0x010f] = 'Camera maker'
+        options['exif'] = data.tobytes()
+    image.save(buffer, fmt, **options)
+    return buffer.getvalue()
+
+
+class MediaRootMixin:
+    """每个测试使用临时的 MEDIA_ROOT
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, True)
+
+
+@override_settings(PASSWORD_HASHERS=[
+    'django.contrib.auth.hashers.MD5PasswordHasher'])
+class ThumbnailTest(MediaRootMixin, TestCase):
+    """头像缩略图的生成和验证
+    """
+
+    def test_render_strips_metadata(self):
+        data = make_image()
+        digest, outputs = thumbnails.render(data)
+        self.assertEqual(len(outputs), len(thumbnails.SIZES) * 2)
+        for name, content in outputs.items():
+            self.assertIn(digest, name)
+            with Image.open(io.BytesIO(content)) as image:
+                self.assertEqual(image.width, image.height)
+                self.assertEqual(len(image.getexif()), 0)
+        # 内容相同时文件名相同
+        self.assertEqual(thumbnails.render(data)[0], digest)
+
+    def test_process_replaces_original(self):
+        user = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        name = default_storage.save(
+            'pic_folder/photo.jpg', ContentFile(make_image()))
+        Profile.objects.filter(user=user).update(avatar=name)
+        profile = Profile.objects.get(user=user)
+        self.assertEqual(profile.get_picture(), '/static/img/user.png')
+
+        thumbnails.process(profile.pk, name)
+        profile.refresh_from_db()
+        self.assertEqual(len(profile.avatar_hash), 40)
+        self.assertFalse(default_storage.exists(name))
+        self.assertTrue(default_storage.exists(profile.avatar.name))
+        self.assertEqual(
+            profile.pictures['small']['webp'],
+            f'/media/avatars/{profile.avatar_hash[:2]}/'
+            f'{profile.avatar_hash}-48.webp')
+
+    def test_validator_limits(self):
+        upload = SimpleUploadedFile('a.png', make_image((64, 64), 'PNG', False))
+        thumbnails.validate_avatar(upload)
+        with mock.patch.object(thumbnails, 'MAX_PIXELS', 63 * 63):
+            with self.assertRaises(ValidationError):
+                thumbnails.validate_avatar(upload)
+        with mock.patch.object(thumbnails, 'MAX_BYTES', 10):
+            with self.assertRaises(ValidationError):
+                thumbnails.validate_avatar(upload)
+        with self.assertRaises(ValidationError):
+            thumbnails.validate_avatar(SimpleUploadedFile('a.png', b'text'))
+
+    def test_edit_without_upload_skips_validation(self):
+        # 保存的头像文件不存在时,只修改其它字段也不会出错
+        user = User.objects.create_user('carol', 'carol@example.com', 'pw')
+        Profile.objects.filter(user=user).update(avatar='pic_folder/gone.jpg')
+        self.client.force_login(user)
+        url = reverse('user_profile:update_profile', args=[user.pk])
+        response = self.client.post(
+            url, {'url': '', 'location': 'Paris', 'job': ''})
+        self.assertEqual(response.status_code, 302)
+        profile = Profile.objects.get(user=user)
+        self.assertEqual(profile.location, 'Paris')
+        self.assertEqual(profile.avatar.name, 'pic_folder/gone.jpg')
+
+        # 新上传的文件仍然会检查
+        response = self.client.post(url, {
+            'avatar': SimpleUploadedFile('a.png', b'text'),
+            'url': '', 'location': '', 'job': ''})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].errors['avatar'])
+
+
+# 缩略图在事务提交后生成,需要真正提交事务
+@override_settings(PASSWORD_HASHERS=[
+    'django.contrib.auth.hashers.MD5PasswordHasher'])
+class AvatarUploadTest(MediaRootMixin, TransactionTestCase):
+
+    def test_upload_creates_thumbnails(self):
+        user = User.objects.create_user('bob', 'bob@example.com', 'pw')
+        self.client.force_login(user)
+        upload = SimpleUploadedFile(
+            'me.jpg', make_image(), content_type='image/jpeg')
+        with mock.patch.object(thumbnails, 'PROCESSING', 'sync'):
+            response = self.client.post(
+                reverse('user_profile:update_profile', args=[user.pk]),
+                {'avatar': upload, 'url': '', 'location': '', 'job': ''})
+        self.assertEqual(response.status_code, 302)
+        profile = Profile.objects.get(user=user)
+        self.assertTrue(profile.avatar_hash)
+        response = self.client.get(
+            reverse('user_profile:profile', args=[user.pk]))
+        self.assertContains(response, profile.pictures['large']['webp'])
+
+
+@override_settings(PASSWORD_HASHERS=[
+    'django.contrib.auth.hashers.MD5PasswordHasher'])
+class UserStatsTest(TestCase):
+    """用户统计表中的提问数和回答数
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        cls.bob = User.objects.create_user('bob', 'bob@example.com', 'pw')
+
+    def counts(self, user):
+        stats = UserStats.objects.get(user=user)
+        return stats.question_count, stats.answer_count
+
+    def test_signals_keep_counts(self):
+        question = Question.objects.create(
+            user=self.alice, title='Title', description='Description')
+        answer = Answer.objects.create(
+            user=self.bob, question=question, description='Answer')
+        Answer.objects.create(
+            user=self.alice, question=question, description='Answer')
+        self.assertEqual(self.counts(self.alice), (1, 1))
+        self.assertEqual(self.counts(self.bob), (0, 1))
+
+        answer.delete()
+        self.assertEqual(self.counts(self.bob), (0, 0))
+        # 删除问题时其答案也被删除
+        question.delete()
+        self.assertEqual(self.counts(self.alice), (0, 0))
+
+    def test_rebuild_repairs_counts(self):
+        Question.objects.create(
+            user=self.alice, title='Title', description='Description')
+        UserStats.objects.filter(user=self.alice).update(question_count=5)
+        UserStats.objects.filter(user=self.bob).delete()
+        self.assertEqual(rebuild(batch_size=1), 2)
+        self.assertEqual(self.counts(self.alice), (1, 0))
+        self.assertEqual(self.counts(self.bob), (0, 0))
+        self.assertEqual(rebuild(), 0)
+
+    def test_profile_page_loads_in_one_query(self):
+        Question.objects.create(
+            user=self.alice, title='Title', description='Description')
+        self.client.force_login(self.bob)
+        url = reverse('user_profile:profile', args=[self.alice.pk])
+        # 会话、当前登录用户、用户、个人简介和统计数据的一次 JOIN 查询,
+        # 以及导航栏的未读通知数
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+        self.assertEqual(response.context['stats'].question_count, 1)
+        self.assertContains(response, 'QUESTIONS : 1')
+        response = self.client.get(
+            reverse('user_profile:profile', args=[0]))
+        self.assertEqual(response.status_code, 404)
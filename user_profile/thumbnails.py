@@ -0,0 +1,167 @@
+import hashlib
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+
+
+logger = logging.getLogger(__name__)
+
+# 头像缩略图的尺寸(正方形边长,像素)
+SIZES = {'small': 48, 'medium': 128, 'large': 256}
+DEFAULT_SIZE = 'medium'
+
+# 每个尺寸生成两种格式,支持 WebP 的浏览器优先使用 WebP
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+
+# 上传文件的字节数和像素数上限,像素数只读取文件头判断,不会解码整张图片
+MAX_BYTES = getattr(settings, 'AVATAR_MAX_BYTES', 5 * 1024 * 1024)
+MAX_PIXELS = getattr(settings, 'AVATAR_MAX_PIXELS', 4096 * 4096)
+
+# 'thread' 在后台线程中生成缩略图,'sync' 在当前线程中生成(用于测试)
+# 'queue' 写入任务队列,由 python manage.py run_worker 生成
+PROCESSING = getattr(settings, 'AVATAR_PROCESSING', 'thread')
+WORKERS = getattr(settings, 'AVATAR_WORKERS', 2)
+
+DIRECTORY = 'avatars'
+
+
+def thumbnail_name(digest, size, fmt):
+    """缩略图的存储路径,文件名包含原图内容的哈希值
+
+    内容不变文件名就不变,浏览器和 CDN 可以永久缓存
+    """
+    return f'{DIRECTORY}/{digest[:2]}/{digest}-{SIZES[size]}.{fmt}'
+
+
+def validate_avatar(file):
+    """检查上传的头像的文件大小和像素数,由 ProfileForm.clean_avatar 调用
+
+    文件无法读取时与无法识别的图片一样返回表单错误
+    """
+    try:
+        size = file.size
+    except OSError:
+        raise ValidationError('Upload a valid image.', code='invalid_image')
+    if size > MAX_BYTES:
+        raise ValidationError(
+            'The image file is too large (maximum %(max)s MB).',
+            code='file_too_large', params={'max': MAX_BYTES // 1024 // 1024})
+    try:
+        position = file.tell()
+        try:
+            with Image.open(file) as image:
+                width, height = image.size
+        finally:
+            file.seek(position)
+    except (UnidentifiedImageError, OSError):
+        raise ValidationError('Upload a valid image.', code='invalid_image')
+    if width * height > MAX_PIXELS:
+        raise ValidationError(
+            'The image is too large (maximum %(max)s pixels).',
+            code='too_many_pixels', params={'max': MAX_PIXELS})
+
+
+def render(data):
+    """根据原图生成全部缩略图,返回 (哈希值, {存储路径: 文件内容})
+
+    先按 EXIF 中的方向旋转,再去掉透明通道裁剪成正方形
+    保存时不写入 EXIF 等元数据
+    """
+    digest = hashlib.sha1(data).hexdigest()
+    with Image.open(io.BytesIO(data)) as image:
+        if image.width * image.height > MAX_PIXELS:
+            raise ValueError('The image has too many pixels.')
+        image = ImageOps.exif_transpose(image)
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        outputs = {}
+        for size, edge in SIZES.items():
+            thumbnail = ImageOps.fit(
+                image, (edge, edge), method=Image.LANCZOS)
+            for fmt, (pil_format, options) in FORMATS.items():
+                buffer = io.BytesIO()
+                thumbnail.save(buffer, pil_format, **options)
+                outputs[thumbnail_name(digest, size, fmt)] = buffer.getvalue()
+    return digest, outputs
+
+
+def process(profile_id, name):
+    """读取上传的原图,生成缩略图后更新 Profile
+
+    缩略图全部写入后才更新 avatar_hash ,页面不会引用不存在的文件
+    原图可能带有 GPS 等元数据,处理完成后删除,avatar 字段改为最大的缩略图
+    """
+    from authentication.backends import invalidate_user
+    from .models import Profile
+
+    try:
+        with default_storage.open(name, 'rb') as f:
+            data = f.read()
+        digest, outputs = render(data)
+        for path, content in outputs.items():
+            if not default_storage.exists(path):
+                default_storage.save(path, ContentFile(content))
+        avatar = thumbnail_name(digest, 'large', 'jpeg')
+        profiles = Profile.objects.filter(pk=profile_id, avatar=name)
+        user_id = profiles.values_list('user_id', flat=True).first()
+        updated = profiles.update(avatar=avatar, avatar_hash=digest)
+        if updated:
+            # update 不会发送信号,手动删除缓存的用户对象
+            invalidate_user(user_id)
+            if name != avatar:
+                default_storage.delete(name)
+    except Exception:
+        logger.exception('Failed to create thumbnails for %s', name)
+
+
+def _process_in_thread(profile_id, name):
+    try:
+        process(profile_id, name)
+    finally:
+        close_old_connections()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                WORKERS, thread_name_prefix='avatar')
+        return _executor
+
+
+def schedule(profile):
+    """事务提交后在后台线程中生成 profile 的头像缩略图
+
+    请求不等待图片处理,处理完成前页面仍显示之前的头像
+    PROCESSING 为 'queue' 时写入任务队列,web 进程重启也不会丢失
+    """
+    profile_id, name = profile.pk, profile.avatar.name
+    if PROCESSING == 'queue':
+        from .tasks import generate_thumbnails
+
+        generate_thumbnails.enqueue(profile_id, name)
+        return
+
+    def submit():
+        if PROCESSING == 'sync':
+            process(profile_id, name)
+        else:
+            get_executor().submit(_process_in_thread, profile_id, name)
+
+    transaction.on_commit(submit)
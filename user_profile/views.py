@@ -1,10 +1,12 @@
-from django.shortcuts import render, redirect, reverse
+from django.shortcuts import get_object_or_404, render, redirect, reverse
 from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
 from django.views.generic import TemplateView, UpdateView
 
 from authentication.models import User
-from .models import Profile
+from . import thumbnails
+from .forms import ProfileForm
+from .models import Profile, UserStats
 
 
 # 我们知道装饰器就是一种高阶函数（类装饰器除外），通常作用于函数上为其增加功能
@@ -41,8 +43,14 @@ class ProfileDetailView(TemplateView):
         context = super(ProfileDetailView, self).get_context_data(**kwargs)
         # 这个 self.kwargs 是解析请求路径时得到的
         user_id = self.kwargs.get('user_id')
-        context['user_'] = User.objects.get(id=user_id)
-        context['profile'] = Profile.objects.get(user_id=user_id)
+        # select_related 使用 JOIN 语句一次查出用户、个人简介和活动统计
+        # 提问数和回答数来自 UserStats 表中的冗余字段,不需要 COUNT 查询
+        user = get_object_or_404(
+            User.objects.select_related('profile', 'stats'), id=user_id)
+        context['user_'] = user
+        context['profile'] = user.profile
+        # 统计数据缺失时显示为 0 ,可以执行 rebuild_user_stats 补齐
+        context['stats'] = getattr(user, 'stats', None) or UserStats(user=user)
         return context
 
 
@@ -54,11 +62,11 @@ class UpdateProfileView(UpdateView):
     """
 
     model = Profile
-    # UpdateView 的父类 ModelFormMixin 的 get_form_class 方法用到了 fields 属性
-    # 此方法的返回值是 django.forms.models 模块中 modelform_factory 函数的调用
-    # modelform_factory 的返回值是一个根据 fields 属性创建的表单类
-    # 也就是说 get_form_class 方法的返回值是利用 fields 创建的表单类
-    fields = ['avatar', 'url', 'location', 'job']
+    # UpdateView 的父类 ModelFormMixin 的 get_form_class 方法
+    # 在设置了 form_class 属性时直接返回该表单类
+    # 否则根据 fields 属性调用 modelform_factory 创建表单类
+    # ProfileForm 只在上传新头像时检查图片
+    form_class = ProfileForm
     template_name = 'user_profile/profile_update.html'
 
     def dispatch(self, request, *args, **kwargs):
@@ -99,6 +107,9 @@ class UpdateProfileView(UpdateView):
         profile = form.save(commit=False)
         profile.save()
         form.save_m2m()
+        # 上传了新头像时,缩略图在后台线程中生成,请求不必等待图片处理完成
+        if 'avatar' in form.changed_data:
+            thumbnails.schedule(profile)
         # 重定向到路由的命名空间 user 下面的 profile 路径
         # 即 user/urls.py 的 urlpatterns 列表里 name 参数值为 profile 的 path
         # 第二个参数为 Pattern 映射类实例的 user_id 属性值